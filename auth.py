@@ -1,25 +1,39 @@
 import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Any
+from typing import NamedTuple, Optional, Any
 
 from fastapi import Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import get_history
 
 import models
 import schemas
-from database import SessionLocal
+from cache import LRUCache
+from database import SessionLocal, AsyncSessionLocal
 
 # --- Konfigurasi dari Environment Variables ---
 SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key_change_me")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Lama (detik) user hasil verifikasi token disimpan di cache; 0 untuk menonaktifkan.
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+# Jumlah thread untuk bcrypt; membatasi CPU yang dipakai login/registrasi bersamaan.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+
 # --- Konfigurasi Hashing Password ---
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# bcrypt (~200 ms CPU) dijalankan di thread pool terbatas agar tidak memblokir event loop
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 
 router = APIRouter()
 
@@ -30,6 +44,11 @@ def get_db():
     finally:
         db.close()
 
+# Dependensi sesi async untuk route `async def` (tidak memblokir event loop saat menunggu database)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # --- FIX: Tambahkan penanganan batas 72-byte bcrypt ---
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -50,6 +69,63 @@ def get_password_hash(password: str) -> str:
         password_bytes = password_bytes[:72]
     return pwd_context.hash(password_bytes)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, get_password_hash, password)
+
+
+# --- Cache User Hasil Verifikasi Token ---
+class AuthenticatedUser(NamedTuple):
+    """Data user ringan yang dibutuhkan endpoint (tanpa hash password & relasi ORM)."""
+    id: int
+    email: str
+    created_at: Optional[datetime] = None
+
+class TokenUserCache:
+    """
+    Cache `sub` (email) token yang sudah terverifikasi -> AuthenticatedUser, dengan TTL.
+    Tanda tangan & masa berlaku JWT tetap diperiksa di setiap request; yang dilewati hanya
+    query user ke database. Entri dihapus otomatis saat baris user diubah/dihapus lewat ORM.
+    """
+
+    def __init__(self, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        # Setiap entri dihitung berukuran 1, sehingga batasnya berupa jumlah entri
+        self.entries = LRUCache(max_entries, sizeof=lambda _: 1, name="auth_users")
+
+    def get(self, email: str) -> Optional[AuthenticatedUser]:
+        if self.ttl_seconds <= 0:
+            return None
+        entry = self.entries.get(email)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.entries.pop(email)
+            return None
+        return user
+
+    def put(self, user: models.User) -> AuthenticatedUser:
+        cached = AuthenticatedUser(id=user.id, email=user.email, created_at=user.created_at)
+        if self.ttl_seconds > 0:
+            self.entries.put(user.email, (cached, time.monotonic() + self.ttl_seconds))
+        return cached
+
+    def invalidate(self, email: str):
+        self.entries.pop(email)
+
+token_user_cache = TokenUserCache()
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: models.User):
+    token_user_cache.invalidate(target.email)
+    # Email lama juga dihapus jika email user diganti
+    for email in get_history(target, "email").deleted:
+        token_user_cache.invalidate(email)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -60,18 +136,19 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user(db: Session, email: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email == email).first()
+async def get_user(db: AsyncSession, email: str) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[models.User]:
-    user = get_user(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[models.User]:
+    user = await get_user(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
 
-def get_current_user_from_token(db: Session, token: str) -> models.User:
+async def get_current_user_from_token(db: AsyncSession, token: str) -> AuthenticatedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -85,34 +162,40 @@ def get_current_user_from_token(db: Session, token: str) -> models.User:
     except JWTError:
         raise credentials_exception
     
-    user = get_user(db, email=email)
+    cached = token_user_cache.get(email)
+    if cached is not None:
+        return cached
+    user = await get_user(db, email=email)
     if user is None:
         raise credentials_exception
-    return user
+    return token_user_cache.put(user)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    return get_current_user_from_token(db, token)
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Sesi sendiri yang langsung ditutup: koneksi tidak ditahan sampai request selesai,
+    # sehingga route yang membuka sesi lain (mis. antrian penilaian) tidak menahan dua koneksi.
+    async with AsyncSessionLocal() as db:
+        return await get_current_user_from_token(db, token)
 
 
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email sudah terdaftar")
     
     # Fungsi ini sekarang sudah aman karena menggunakan get_password_hash yang baru
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     new_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     # Fungsi ini sudah aman karena authenticate_user memanggil verify_password yang baru
-    user = authenticate_user(db, email=form_data.username, password=form_data.password)
+    user = await authenticate_user(db, email=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
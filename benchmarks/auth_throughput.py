@@ -0,0 +1,107 @@
+"""
+Benchmark autentikasi: login per detik dan request terautentikasi per detik.
+
+Aplikasi dijalankan di dalam proses (ASGI, tanpa jaringan) dengan database SQLite sementara.
+Selama login berjalan, sebuah heartbeat mengukur jeda terlama event loop: bcrypt yang dijalankan
+langsung di event loop membuat semua request lain ikut tertahan.
+
+Mode pembanding:
+- login: bcrypt di thread pool (sekarang) vs bcrypt langsung di event loop (sebelumnya)
+- request terautentikasi: cache user dari token aktif vs nonaktif (query user di setiap request)
+
+Contoh:
+    python benchmarks/auth_throughput.py --logins 40 --requests 2000 --concurrency 16
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--logins", type=int, default=40)
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--concurrency", type=int, default=16)
+args = parser.parse_args()
+
+workdir = tempfile.mkdtemp(prefix="mentora-auth-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'auth.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import auth
+import main
+
+EMAIL, PASSWORD = "bench@mentora.example.com", "kata-sandi-rahasia"
+
+
+async def run_concurrently(total: int, concurrency: int, call) -> float:
+    """Menjalankan `call` sebanyak `total` kali dengan `concurrency` pekerja; mengembalikan durasi (detik)."""
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            await call()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def max_loop_stall(task: asyncio.Future, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not task.done():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def bench_logins(client: httpx.AsyncClient, label: str):
+    async def login():
+        response = await client.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+
+    task = asyncio.ensure_future(run_concurrently(args.logins, args.concurrency, login))
+    stall = await max_loop_stall(task)
+    elapsed = await task
+    print(f"{label:<32} {args.logins / elapsed:>8.1f} login/s   jeda event loop maks {stall * 1000:>6.0f} ms")
+
+
+async def bench_requests(client: httpx.AsyncClient, token: str, label: str):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def request():
+        response = await client.get("/score/tidak-ada", headers=headers)
+        assert response.status_code == 404, response.text
+
+    elapsed = await run_concurrently(args.requests, args.concurrency, request)
+    print(f"{label:<32} {args.requests / elapsed:>8.1f} request/s")
+
+
+async def main_async():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/auth/register", json={"email": EMAIL, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        token = (await client.post("/auth/token", data={"username": EMAIL, "password": PASSWORD})).json()["access_token"]
+
+        await bench_logins(client, "login, bcrypt di thread pool")
+        offloaded = auth.verify_password_async
+        async def verify_on_loop(plain_password, hashed_password):
+            return auth.verify_password(plain_password, hashed_password)
+        auth.verify_password_async = verify_on_loop
+        await bench_logins(client, "login, bcrypt di event loop")
+        auth.verify_password_async = offloaded
+
+        await bench_requests(client, token, "request, cache user aktif")
+        ttl, auth.token_user_cache.ttl_seconds = auth.token_user_cache.ttl_seconds, 0
+        await bench_requests(client, token, "request, tanpa cache user")
+        auth.token_user_cache.ttl_seconds = ttl
+        print(f"Statistik cache: {auth.token_user_cache.entries.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,179 @@
+"""
+Ukuran penyimpanan context_data dan latensi /history, sebelum & sesudah kompresi.
+
+Database SQLite sementara diisi --sessions sesi selesai (dibagi ke --users pengguna) dengan
+context_data dalam format lama (JSON mentah), memakai context_blocks asli hasil ingestion PDF
+di Data/. Lalu diukur:
+  byte/baris      rata-rata ukuran context_data yang tersimpan
+  ukuran DB       ukuran file SQLite setelah VACUUM
+  /history        latensi satu halaman endpoint (HISTORY_MAX_PAGE_SIZE item; context_data di-defer)
+  muat penuh      semua sesi selesai satu pengguna dengan context_data ikut dimuat (perilaku sebelum di-defer)
+  sesi WS         memuat satu sesi beserta context_data seperti handler WebSocket
+Setelah itu migrasi `compress_legacy_rows` dijalankan atas data yang sama dan semua diukur ulang.
+
+Contoh:
+    python benchmarks/context_storage.py --sessions 10000 --users 10
+"""
+import os
+import sys
+import glob
+import time
+import json
+import uuid
+import asyncio
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sessions", type=int, default=10000, help="Jumlah sesi yang diisi")
+parser.add_argument("--users", type=int, default=10, help="Sesi dibagi rata ke sejumlah pengguna")
+parser.add_argument("--requests", type=int, default=30, help="Pengulangan setiap pengukuran latensi")
+parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data"))
+args = parser.parse_args()
+
+# Konfigurasi harus di-set sebelum modul aplikasi di-import
+workdir = tempfile.mkdtemp(prefix="mentora-context-")
+db_path = os.path.join(workdir, "context.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+os.environ["PROVIDER_BACKEND"] = "fake"
+os.environ["FAKE_GCS_LATENCY_MS"] = "0"
+os.environ["GCS_BUCKET_NAME"] = "mentora-context-bench"
+os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+os.environ["IMAGE_STORE_BACKEND"] = "local"
+os.environ["IMAGE_STORE_DIR"] = os.path.join(workdir, "image_store")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, Text, column, insert, select, table
+from sqlalchemy.orm import undefer
+
+import auth
+import main
+import models
+import ingestion
+from compressed_text import compress_legacy_rows
+from database import SessionLocal, AsyncSessionLocal, engine
+
+# Tabel tanpa tipe CompressedText: menulis context_data persis seperti versi lama (JSON mentah)
+legacy_sessions = table(
+    "simulation_sessions",
+    column("id", String), column("user_id", Integer), column("title", String), column("filename", String),
+    column("context_data", Text), column("final_score", Float), column("feedback", Text),
+    column("pdf_gcs_path", String), column("is_completed", Boolean), column("created_at", DateTime),
+)
+
+
+async def load_contexts() -> list[str]:
+    contexts = []
+    for path in sorted(glob.glob(os.path.join(args.data_dir, "*.pdf"))):
+        result = await ingestion.ingest_pdf(path)
+        if result["abstract"] or result["metodologi"]:
+            contexts.append(json.dumps(result["context_blocks"]))
+    ingestion.shutdown_pool()
+    if not contexts:
+        raise SystemExit(f"Tidak ada PDF proposal yang bisa diekstrak di {args.data_dir}")
+    return contexts
+
+
+def seed(contexts: list[str]) -> list[tuple[str, str, str]]:
+    """Mengembalikan (token, email, id satu sesi) per pengguna."""
+    hashed_password = auth.get_password_hash("rahasia123")
+    users = []
+    started_at = datetime.now(timezone.utc) - timedelta(days=365)
+    with SessionLocal() as db:
+        for user_index in range(args.users):
+            user = models.User(email=f"riwayat{user_index}@mentora.example.com", hashed_password=hashed_password)
+            db.add(user)
+            db.flush()
+            rows = []
+            for index in range(user_index, args.sessions, args.users):
+                rows.append({
+                    "id": str(uuid.uuid4()), "user_id": user.id, "title": f"Proposal Uji {index}",
+                    "filename": f"proposal-{index}.pdf", "context_data": contexts[index % len(contexts)],
+                    "final_score": 60 + index % 40, "feedback": "Umpan balik singkat untuk sesi ini.",
+                    "pdf_gcs_path": f"user_{user.id}/report_{index}.pdf", "is_completed": True,
+                    "created_at": started_at + timedelta(minutes=index),
+                })
+            db.execute(insert(legacy_sessions), rows)
+            users.append((auth.create_access_token({"sub": user.email}, timedelta(hours=1)), user.email, rows[0]["id"]))
+        db.commit()
+    return users
+
+
+def storage_stats() -> tuple[float, float]:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM")
+        bytes_per_row = conn.exec_driver_sql("SELECT avg(length(CAST(context_data AS BLOB))) FROM simulation_sessions").scalar()
+    return bytes_per_row, os.path.getsize(db_path) / (1024 * 1024)
+
+
+async def timed(call, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def measure(client: httpx.AsyncClient, token: str, user_id: int, session_id: str) -> dict:
+    async def history():
+        response = await client.get(
+            "/history", params={"limit": main.HISTORY_MAX_PAGE_SIZE}, headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+
+    async def full_rows():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(models.SimulationSession).options(
+                undefer(models.SimulationSession.context_data)
+            ).where(
+                models.SimulationSession.user_id == user_id,
+                models.SimulationSession.is_completed == True
+            ).order_by(models.SimulationSession.created_at.desc()))
+            result.scalars().all()
+
+    async def websocket_load():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(models.SimulationSession).options(
+                undefer(models.SimulationSession.context_data)
+            ).where(models.SimulationSession.id == session_id))
+            json.loads(result.scalars().first().context_data)
+
+    await history()  # pemanasan (signed URL cache, cache user token)
+    bytes_per_row, db_mb = storage_stats()
+    return {
+        "byte/baris": bytes_per_row,
+        "ukuran DB (MB)": db_mb,
+        "/history (ms)": await timed(history, args.requests),
+        "muat penuh (ms)": await timed(full_rows, args.requests),
+        "sesi WS (ms)": await timed(websocket_load, args.requests * 10),
+    }
+
+
+async def run():
+    contexts = await load_contexts()
+    users = seed(contexts)
+    token, email, session_id = users[0]
+    with SessionLocal() as db:
+        user_id = db.execute(select(models.User.id).where(models.User.email == email)).scalar_one()
+    print(f"{args.sessions} sesi untuk {args.users} pengguna ({args.sessions // args.users} sesi per pengguna); "
+          f"/history mengembalikan {main.HISTORY_MAX_PAGE_SIZE} baris per halaman")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mentora") as client:
+        before = await measure(client, token, user_id, session_id)
+        started = time.perf_counter()
+        migrated = await compress_legacy_rows(AsyncSessionLocal, models.SimulationSession.__table__.c.context_data)
+        print(f"Migrasi: {migrated} baris dikompresi dalam {time.perf_counter() - started:.1f} detik")
+        after = await measure(client, token, user_id, session_id)
+
+    print(f"{'':<18} {'JSON mentah':>12} {'terkompresi':>12}")
+    for key in before:
+        print(f"{key:<18} {before[key]:>12.1f} {after[key]:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,177 @@
+"""
+Latensi /history per halaman (keyset pagination) pada database berisi banyak sesi.
+
+Database SQLite sementara diisi --sessions sesi; satu pengguna "berat" memiliki --heavy-sessions
+sesi selesai, sisanya dibagi ke --users pengguna lain (sebagian belum selesai). Beberapa sesi
+sengaja memiliki created_at yang sama persis untuk menguji pemutus urutan.
+
+Skrip menelusuri seluruh halaman riwayat pengguna berat lewat `X-Next-Cursor`, memastikan
+hasilnya sama persis dengan urutan lengkap (tanpa duplikat/terlewat), lalu melaporkan median
+latensi halaman di beberapa kedalaman. Sebagai pembanding: query lama tanpa paginasi, dan
+halaman pertama/terdalam tanpa indeks riwayat.
+
+Contoh:
+    python benchmarks/history_pagination.py --sessions 100000 --heavy-sessions 50000 --limit 20
+"""
+import os
+import sys
+import time
+import json
+import uuid
+import asyncio
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sessions", type=int, default=100000, help="Jumlah total sesi di database")
+parser.add_argument("--heavy-sessions", type=int, default=50000, help="Sesi selesai milik pengguna berat")
+parser.add_argument("--users", type=int, default=100, help="Jumlah pengguna lain")
+parser.add_argument("--limit", type=int, default=20, help="Ukuran halaman /history")
+parser.add_argument("--repeat", type=int, default=20, help="Pengulangan setiap pengukuran pembanding")
+args = parser.parse_args()
+
+# Konfigurasi harus di-set sebelum modul aplikasi di-import
+workdir = tempfile.mkdtemp(prefix="mentora-history-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'history.db')}"
+os.environ["PROVIDER_BACKEND"] = "fake"
+os.environ["FAKE_GCS_LATENCY_MS"] = "0"
+os.environ["GCS_BUCKET_NAME"] = "mentora-history-bench"
+os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+os.environ["HISTORY_MAX_PAGE_SIZE"] = str(max(100, args.limit))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import insert, select
+
+import auth
+import main
+import models
+from database import SessionLocal, AsyncSessionLocal, engine
+
+CONTEXT = json.dumps([{"type": "text", "content": "[JUDUL]\nProposal Uji Riwayat"}])
+DEPTHS = [1, 10, 100, 1000]
+
+
+def seed() -> tuple[str, int]:
+    """Mengembalikan token dan id pengguna berat."""
+    hashed_password = auth.get_password_hash("rahasia123")
+    started_at = datetime.now(timezone.utc) - timedelta(days=365)
+    table = models.SimulationSession.__table__
+    with SessionLocal() as db:
+        users = [models.User(email=f"riwayat{index}@mentora.example.com", hashed_password=hashed_password) for index in range(args.users + 1)]
+        db.add_all(users)
+        db.flush()
+        heavy, others = users[0], users[1:]
+        rows = []
+        for index in range(args.sessions):
+            is_heavy = index < args.heavy_sessions
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "user_id": heavy.id if is_heavy else others[index % len(others)].id,
+                "title": f"Proposal Uji {index}", "filename": f"proposal-{index}.pdf", "context_data": CONTEXT,
+                "final_score": 60 + index % 40, "feedback": "Umpan balik singkat.",
+                "pdf_gcs_path": f"user_{heavy.id}/report_{index}.pdf",
+                "is_completed": is_heavy or index % 3 != 0,
+                # Tiga sesi per detik: created_at kembar diurutkan dengan id
+                "created_at": started_at + timedelta(seconds=index // 3),
+            })
+            if len(rows) == 5000:
+                db.execute(insert(table), rows)
+                rows = []
+        if rows:
+            db.execute(insert(table), rows)
+        db.commit()
+        return auth.create_access_token({"sub": heavy.email}, timedelta(hours=1)), heavy.id
+
+
+def expected_ids(user_id: int) -> list[str]:
+    with SessionLocal() as db:
+        return list(db.execute(select(models.SimulationSession.id).where(
+            models.SimulationSession.user_id == user_id,
+            models.SimulationSession.is_completed == True
+        ).order_by(models.SimulationSession.created_at.desc(), models.SimulationSession.id.desc())).scalars())
+
+
+def query_plan(user_id: int) -> str:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id, title, filename, created_at, final_score, pdf_gcs_path "
+            "FROM simulation_sessions WHERE user_id = ? AND is_completed = 1 "
+            "ORDER BY created_at DESC, id DESC LIMIT ?", (user_id, args.limit + 1)
+        ).all()
+    return "; ".join(row[-1] for row in rows)
+
+
+async def run():
+    started = time.perf_counter()
+    token, user_id = seed()
+    print(f"{args.sessions} sesi diisi dalam {time.perf_counter() - started:.1f} detik; "
+          f"pengguna berat: {args.heavy_sessions} sesi selesai, {args.limit} per halaman")
+    print(f"Rencana query: {query_plan(user_id)}")
+    headers = {"Authorization": f"Bearer {token}"}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mentora") as client:
+        async def page(cursor: str = None) -> tuple[list[dict], str, float]:
+            params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+            page_started = time.perf_counter()
+            response = await client.get("/history", params=params, headers=headers)
+            elapsed = (time.perf_counter() - page_started) * 1000
+            response.raise_for_status()
+            return response.json(), response.headers.get("X-Next-Cursor"), elapsed
+
+        await page()  # pemanasan (signed URL cache, cache user token)
+
+        # Telusuri semua halaman sambil mencatat cursor & latensi setiap halaman
+        seen, cursors, latencies, cursor = [], [None], [], None
+        while True:
+            items, cursor, elapsed = await page(cursor)
+            seen.extend(item["session_id"] for item in items)
+            latencies.append(elapsed)
+            if not cursor:
+                break
+            cursors.append(cursor)
+        expected = expected_ids(user_id)
+        status = "OK" if seen == expected else f"BERBEDA ({len(seen)} item vs {len(expected)} diharapkan)"
+        print(f"Penelusuran: {len(latencies)} halaman, {len(seen)} sesi, urutan & kelengkapan {status}")
+
+        async def page_latency(number: int) -> float:
+            samples = [(await page(cursors[number - 1]))[2] for _ in range(args.repeat)]
+            return statistics.median(samples)
+
+        depths = [depth for depth in DEPTHS if depth < len(cursors)] + [len(cursors)]
+        print(f"{'halaman':>10} {'median ms':>10}")
+        for depth in depths:
+            print(f"{depth:>10} {await page_latency(depth):>10.2f}")
+
+        async def unpaginated():
+            # Query /history sebelum paginasi: semua sesi selesai, entitas lengkap
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(select(models.SimulationSession).where(
+                    models.SimulationSession.user_id == user_id,
+                    models.SimulationSession.is_completed == True
+                ).order_by(models.SimulationSession.created_at.desc()))
+                result.scalars().all()
+
+        samples = []
+        for _ in range(max(3, args.repeat // 4)):
+            query_started = time.perf_counter()
+            await unpaginated()
+            samples.append((time.perf_counter() - query_started) * 1000)
+        print(f"Tanpa paginasi (query lama, {len(seen)} baris, tanpa serialisasi respons): {statistics.median(samples):.1f} ms")
+
+        index = next(index for index in models.SimulationSession.__table__.indexes if index.name == "ix_simulation_sessions_history")
+        index.drop(bind=engine)
+        # Koneksi pool lama masih menyimpan statement yang disiapkan dengan indeks
+        engine.dispose()
+        try:
+            print(f"Tanpa indeks riwayat (rencana: {query_plan(user_id)}):")
+            print(f"  halaman 1 {await page_latency(1):.1f} ms, halaman {len(cursors)} {await page_latency(len(cursors)):.1f} ms")
+        finally:
+            index.create(bind=engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
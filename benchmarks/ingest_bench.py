@@ -0,0 +1,272 @@
+"""
+Benchmark & uji regresi ingestion PDF atas korpus Data/ dan tesis sintetis besar.
+
+Setiap dokumen diproses di proses anak tersendiri (agar peak RSS per dokumen terukur),
+melalui tahap yang sama dengan /upload, tanpa process pool:
+  open         membuka PDF & menghitung halaman (`_count_pages`)
+  pages        teks setiap halaman + pemindaian gambar bab metodologi (`_extract_page_range`)
+  image_store  menyimpan gambar unik ke image store lokal sementara
+  locator      membangun indeks `SectionLocator` atas teks lengkap
+  title        `SectionLocator.title()`
+  sections     `SectionLocator.section()` untuk semua bagian di SECTION_KEYWORDS
+Selain itu `ingestion.ingest_pdf` sendiri diukur end-to-end (kolom ingest_pdf) dengan process pool
+--ingest-workers worker yang sudah dipanaskan, seperti di /upload. Tesis sintetis selalu dipecah
+per rentang halaman (INGEST_SHARD_MIN_PAGES=1), sehingga jalur shard ikut diuji.
+Dengan --legacy, `extract_title`/`extract_section` lama (legacy_extraction.py) juga diukur dan hasilnya dibandingkan
+(exit 1 jika ada bagian yang berbeda).
+
+Tesis sintetis dibuat dengan mengulang halaman PDF terbesar di Data/ sampai --synthetic-pages.
+Untuk setiap dokumen dicatat waktu per tahap (median dari --repeat), peak RSS, dan checksum
+SHA-256 setiap bagian hasil ekstraksi, daftar referensi gambar, serta `context_blocks` hasil
+`ingest_pdf` yang diserialisasi.
+
+Baseline:
+    python benchmarks/ingest_bench.py --save-baseline benchmarks/ingest_baseline.json
+    python benchmarks/ingest_bench.py --baseline benchmarks/ingest_baseline.json --threshold 0.25
+Perbandingan gagal (exit 1) jika checksum hasil ekstraksi berubah, atau jika total waktu
+dokumen, waktu ingest_pdf, atau waktu sebuah tahap (yang di baseline >= --min-ms) lebih lambat
+dari --threshold.
+Waktu hanya sebanding di mesin yang sama; gunakan --no-timing untuk memeriksa hasil saja.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+import warnings
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ["open", "pages", "image_store", "locator", "title", "sections"]
+LEGACY_STAGES = ["legacy_title", "legacy_sections"]
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_synthetic(source_path: str, target_pages: int, out_dir: str) -> str:
+    import fitz
+    path = os.path.join(out_dir, f"sintetis-{target_pages}-halaman.pdf")
+    with fitz.open(source_path) as source, fitz.open() as doc:
+        while len(doc) < target_pages:
+            doc.insert_pdf(source, to_page=min(len(source), target_pages - len(doc)) - 1)
+        doc.save(path)
+    return path
+
+
+async def time_ingest_pdf(ingestion, path: str, repeat: int, store_dir: str) -> tuple[list[float], dict]:
+    # Satu kali tanpa diukur: worker process pool dinyalakan sesuai kebutuhan
+    result = await ingestion.ingest_pdf(path)
+    samples = []
+    for _ in range(repeat):
+        shutil.rmtree(store_dir, ignore_errors=True)
+        started = time.perf_counter()
+        result = await ingestion.ingest_pdf(path)
+        samples.append(time.perf_counter() - started)
+    return samples, result
+
+
+def run_document(path: str, repeat: int, legacy: bool, store_dir: str, ingest_workers: int, force_shards: bool) -> dict:
+    """Dijalankan di proses anak: mengukur setiap tahap dan menghitung checksum hasil."""
+    os.environ["IMAGE_STORE_BACKEND"] = "local"
+    os.environ["IMAGE_STORE_DIR"] = store_dir
+    os.environ["INGEST_MAX_WORKERS"] = str(max(2, ingest_workers) if force_shards else ingest_workers)
+    if force_shards:
+        os.environ["INGEST_SHARD_MIN_PAGES"] = "1"
+    warnings.simplefilter("ignore", FutureWarning)
+    # Worker process pool ingest_pdf adalah interpreter baru (spawn): filter diteruskan lewat environment
+    os.environ["PYTHONWARNINGS"] = "ignore::FutureWarning"
+    import ingestion
+    import legacy_extraction
+    from image_store import get_image_store
+
+    timings = {stage: [] for stage in STAGES + (LEGACY_STAGES if legacy else [])}
+    for _ in range(repeat):
+        shutil.rmtree(store_dir, ignore_errors=True)
+        started = time.perf_counter()
+        page_count = ingestion._count_pages(path)
+        timings["open"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        pages, blobs = ingestion._extract_page_range(path, 0, page_count)
+        timings["pages"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        store = get_image_store()
+        for ref, (image_bytes, mime_type) in blobs.items():
+            store.save(ref, image_bytes, mime_type)
+        timings["image_store"].append(time.perf_counter() - started)
+
+        full_text = "".join(page_text for page_text, _ in pages)
+        started = time.perf_counter()
+        locator = ingestion.SectionLocator(full_text)
+        timings["locator"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        sections = {"title": locator.title()}
+        timings["title"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for name, (start_keys, end_keys) in ingestion.SECTION_KEYWORDS.items():
+            sections[name] = locator.section(start_keys, end_keys)
+        timings["sections"].append(time.perf_counter() - started)
+
+        if legacy:
+            started = time.perf_counter()
+            legacy_sections = {"title": legacy_extraction.extract_title(full_text)}
+            timings["legacy_title"].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            for name, (start_keys, end_keys) in ingestion.SECTION_KEYWORDS.items():
+                legacy_sections[name] = legacy_extraction.extract_section(full_text, start_keys, end_keys)
+            timings["legacy_sections"].append(time.perf_counter() - started)
+
+    ingest_samples, ingested = asyncio.run(time_ingest_pdf(ingestion, path, repeat, store_dir))
+    ingestion.shutdown_pool()
+
+    image_refs = [image["ref"] for _, images in pages for image in images]
+    checksums = {name: sha256(value) for name, value in sections.items()}
+    checksums["images"] = sha256("\n".join(image_refs))
+    checksums["context_blocks"] = sha256(json.dumps(ingested["context_blocks"], sort_keys=True, ensure_ascii=False))
+    result = {
+        "pages": page_count,
+        "shards": len(ingestion._page_ranges(page_count)),
+        "text_chars": len(full_text),
+        "images": len(image_refs),
+        "unique_images": len(blobs),
+        "stages_ms": {stage: statistics.median(values) * 1000 for stage, values in timings.items()},
+        # ru_maxrss dalam KiB di Linux, byte di macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+        "checksums": checksums,
+    }
+    result["total_ms"] = sum(result["stages_ms"][stage] for stage in STAGES)
+    result["ingest_ms"] = statistics.median(ingest_samples) * 1000
+    # Hasil jalur ingest_pdf (dengan shard) harus sama dengan ekstraksi bertahap tanpa shard
+    result["ingest_matches_stages"] = all(ingested[name] == value for name, value in sections.items())
+    if legacy:
+        result["legacy_matches"] = [name for name in sections if sections[name] == legacy_sections[name]]
+        result["legacy_mismatches"] = [name for name in sections if sections[name] != legacy_sections[name]]
+    return result
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_ms: float, timing: bool) -> list[str]:
+    problems = []
+    for name, result in results.items():
+        base = baseline["documents"].get(name)
+        if base is None:
+            print(f"  (baru) {name}: tidak ada di baseline")
+            continue
+        if not result["ingest_matches_stages"]:
+            problems.append(f"{name}: hasil ingest_pdf berbeda dari ekstraksi bertahap")
+        for key, checksum in result["checksums"].items():
+            if base["checksums"].get(key) != checksum:
+                problems.append(f"{name}: hasil '{key}' berubah")
+        if not timing:
+            continue
+        if result["total_ms"] > base["total_ms"] * (1 + threshold):
+            problems.append(f"{name}: total {result['total_ms']:.0f} ms vs baseline {base['total_ms']:.0f} ms")
+        if "ingest_ms" in base and result["ingest_ms"] > base["ingest_ms"] * (1 + threshold):
+            problems.append(f"{name}: ingest_pdf {result['ingest_ms']:.0f} ms vs baseline {base['ingest_ms']:.0f} ms")
+        for stage in STAGES:
+            before, after = base["stages_ms"].get(stage, 0), result["stages_ms"][stage]
+            if before >= min_ms and after > before * (1 + threshold):
+                problems.append(f"{name}: tahap {stage} {after:.0f} ms vs baseline {before:.0f} ms")
+    for name in baseline["documents"]:
+        if name not in results:
+            print(f"  (hilang) {name}: ada di baseline tetapi tidak diproses")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data"))
+    parser.add_argument("--synthetic-pages", type=int, nargs="*", default=[500, 1000], help="Jumlah halaman tesis sintetis")
+    parser.add_argument("--repeat", type=int, default=3, help="Pengulangan per dokumen; waktu yang dilaporkan median")
+    parser.add_argument("--ingest-workers", type=int, default=4, help="INGEST_MAX_WORKERS untuk pengukuran ingest_pdf")
+    parser.add_argument("--legacy", action="store_true", help="Ukur juga extract_title/extract_section lama")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Bandingkan dengan baseline; exit 1 jika ada regresi")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Batas perlambatan relatif (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=20.0, help="Tahap yang di baseline lebih cepat dari ini tidak dibandingkan waktunya")
+    parser.add_argument("--no-timing", action="store_true", help="Hanya bandingkan checksum hasil ekstraksi")
+    args = parser.parse_args()
+
+    pdfs = sorted(glob.glob(os.path.join(args.data_dir, "*.pdf")))
+    if not pdfs:
+        raise SystemExit(f"Tidak ada PDF di {args.data_dir}")
+    workdir = tempfile.mkdtemp(prefix="mentora-ingest-bench-")
+    largest = max(pdfs, key=os.path.getsize)
+    # nama -> (path, paksa shard)
+    documents = {os.path.basename(path): (path, False) for path in pdfs}
+    for pages in args.synthetic_pages:
+        path = build_synthetic(largest, pages, workdir)
+        documents[os.path.basename(path)] = (path, True)
+
+    results = {}
+    legacy_differs = False
+    header = (f"{'dokumen':<44} {'hal':>5} " + " ".join(f"{stage:>11}" for stage in STAGES)
+              + f" {'total':>9} {'ingest_pdf':>11} {'shard':>5} {'RSS MB':>7}")
+    print("Waktu per tahap dalam ms (median):")
+    print(header)
+    for name, (path, force_shards) in documents.items():
+        # Satu proses anak per dokumen: peak RSS tidak tercampur dokumen lain
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(
+                run_document, path, args.repeat, args.legacy, os.path.join(workdir, "image_store"),
+                args.ingest_workers, force_shards,
+            ).result()
+        results[name] = result
+        stages = " ".join(f"{result['stages_ms'][stage]:>11.1f}" for stage in STAGES)
+        print(f"{name[:44]:<44} {result['pages']:>5} {stages} {result['total_ms']:>9.1f} "
+              f"{result['ingest_ms']:>11.1f} {result['shards']:>5} {result['peak_rss_mb']:>7.0f}")
+        if not result["ingest_matches_stages"]:
+            print(f"{'':<44} PERINGATAN: hasil ingest_pdf berbeda dari ekstraksi bertahap")
+        if args.legacy:
+            locator_ms = result["stages_ms"]["locator"] + result["stages_ms"]["title"] + result["stages_ms"]["sections"]
+            legacy_ms = result["stages_ms"]["legacy_title"] + result["stages_ms"]["legacy_sections"]
+            section_count = len(result["legacy_matches"]) + len(result["legacy_mismatches"])
+            print(f"{'':<44} lama {legacy_ms:.1f} ms vs SectionLocator {locator_ms:.1f} ms, "
+                  f"hasil sama: {len(result['legacy_matches'])}/{section_count}")
+            if result["legacy_mismatches"]:
+                legacy_differs = True
+                print(f"{'':<44} PERINGATAN: hasil berbeda dari ekstraksi lama: {', '.join(result['legacy_mismatches'])}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({
+                "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+                "repeat": args.repeat,
+                "ingest_workers": args.ingest_workers,
+                "documents": results,
+            }, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        print(f"Baseline disimpan ke {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Dibandingkan dengan {args.baseline} ({baseline['machine']['platform']}, {baseline['machine']['cpus']} CPU):")
+        problems = compare(results, baseline, args.threshold, args.min_ms, not args.no_timing)
+        for problem in problems:
+            print(f"  REGRESI: {problem}")
+        if problems:
+            sys.exit(1)
+        print("  Tidak ada regresi.")
+
+    if legacy_differs:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
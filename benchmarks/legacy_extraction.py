@@ -0,0 +1,70 @@
+"""
+Implementasi lama ekstraksi judul & bagian proposal (sebelum `ingestion.SectionLocator`).
+
+Tidak dipakai di jalur produksi; hanya dijalankan oleh `ingest_bench.py --legacy` sebagai
+pembanding hasil dan waktu `SectionLocator`.
+"""
+
+
+def extract_title(full_text: str) -> str:
+    """Judul = baris uppercase terpanjang sebelum ABSTRAK (padanan `SectionLocator.title()`)."""
+    try:
+        end_pos = full_text.upper().find("ABSTRAK")
+        search_block = full_text[:end_pos] if end_pos != -1 else full_text[:2500]
+    except Exception:
+        search_block = full_text[:2500]
+    lines = [line.strip() for line in search_block.strip().split('\n') if line.strip()]
+    longest_line = ""; best_candidate = ""
+    for line in lines:
+        if len(line) < 10 or any(keyword in line.upper() for keyword in ["SKRIPSI", "TESIS", "TUGAS AKHIR", "UNIVERSITAS"]):
+            continue
+        if len(line) > len(longest_line): longest_line = line
+        if line.isupper() and len(line) > len(best_candidate): best_candidate = line
+    final_title = best_candidate if best_candidate else longest_line
+    return final_title if final_title else "Judul tidak ditemukan"
+
+def extract_section(full_text: str, start_keys: list[str], end_keys: list[str]) -> str:
+    """Bagian dari kata kunci awal hingga kata kunci akhir (padanan `SectionLocator.section()`)."""
+    text_upper = full_text.upper()
+    search_offset = 0
+
+    while True:
+        potential_start_index = -1
+        found_key = None
+
+        for key in start_keys:
+            pos = text_upper.find(key.upper(), search_offset)
+            if pos != -1 and (potential_start_index == -1 or pos < potential_start_index):
+                potential_start_index = pos
+                found_key = key
+
+        if potential_start_index == -1:
+            return ""
+
+        line_end_pos = text_upper.find('\n', potential_start_index)
+        if line_end_pos == -1: line_end_pos = len(text_upper)
+
+        line_snippet = full_text[potential_start_index:line_end_pos]
+
+        if '...' in line_snippet or line_snippet.count('.') > 10:
+            search_offset = line_end_pos
+            continue
+
+        start_index = potential_start_index
+        break
+
+    end_index = len(full_text)
+    search_area = text_upper[start_index + len(found_key):]
+
+    for end_key in end_keys:
+        pos = search_area.find(end_key.upper())
+        if pos != -1:
+            line_start_pos = search_area.rfind('\n', 0, pos)
+            if line_start_pos == -1: line_start_pos = 0
+
+            line_of_end_key = search_area[line_start_pos:pos + len(end_key)]
+            if any(char.isdigit() for char in line_of_end_key) or len(line_of_end_key.split()) < 5:
+                end_index = start_index + len(found_key) + line_start_pos
+                break
+
+    return full_text[start_index:end_index].strip()
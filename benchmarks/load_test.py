@@ -0,0 +1,251 @@
+"""
+Uji beban end-to-end tanpa jaringan: Gemini, Google TTS, dan GCS diganti provider tiruan
+(PROVIDER_BACKEND=fake) dengan latensi, jitter, dan tingkat error yang bisa diatur.
+
+Aplikasi dijalankan di dalam proses (uvicorn) dengan database SQLite sementara. Setiap
+pengguna simulasi:
+  1. mendaftar lewat /auth/register dan login,
+  2. mengunggah salah satu PDF di Data/ lewat /upload,
+  3. membuka /ws/session/{id} dan bercakap sebanyak --turns giliran,
+  4. memanggil /score lalu menunggu job penilaian selesai.
+
+Dilaporkan p50/p95/p99 untuk: upload, balasan pertama (transkrip terkirim -> teks dosen
+pertama), audio pertama (transkrip terkirim -> frame audio pertama), dan penilaian
+(POST /score -> job selesai). Untuk CI, --max-p95 dan --max-error-rate membuat skrip
+keluar dengan kode 1 saat batas terlampaui.
+
+Contoh:
+    python benchmarks/load_test.py --users 20 --turns 3 --stream
+    python benchmarks/load_test.py --users 10 --error-rate 0.02 --max-p95 first_reply=2000 --max-p95 scoring=8000
+"""
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import defaultdict
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--users", type=int, default=10, help="Jumlah pengguna/percakapan bersamaan")
+parser.add_argument("--turns", type=int, default=3, help="Jumlah transkrip yang dikirim per percakapan")
+parser.add_argument("--stream", action="store_true", help="Gunakan mode balasan streaming (stream=true)")
+parser.add_argument("--audio-format", default="ogg_opus")
+parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data"))
+parser.add_argument("--pdf-glob", default="*.pdf", help="Pola nama file PDF di --data-dir yang diunggah")
+parser.add_argument("--gemini-ms", type=float, default=800, help="Latensi dasar Gemini tiruan")
+parser.add_argument("--tts-ms", type=float, default=300, help="Latensi dasar TTS tiruan")
+parser.add_argument("--gcs-ms", type=float, default=50, help="Latensi dasar GCS tiruan")
+parser.add_argument("--jitter-ms", type=float, default=100)
+parser.add_argument("--error-rate", type=float, default=0.0, help="Peluang setiap panggilan provider gagal")
+parser.add_argument("--seed", default="42")
+parser.add_argument("--reply-timeout", type=float, default=30.0, help="Batas tunggu balasan/audio per giliran (detik)")
+parser.add_argument("--max-p95", action="append", default=[], metavar="METRIK=MS",
+                    help="Gagal (exit 1) jika p95 metrik melebihi batas; metrik: upload, first_reply, first_audio, scoring")
+parser.add_argument("--max-error-rate", type=float, default=None, help="Gagal (exit 1) jika rasio langkah gagal melebihi ini")
+parser.add_argument("--port", type=int, default=8766)
+args = parser.parse_args()
+
+# Konfigurasi harus di-set sebelum modul aplikasi di-import
+workdir = tempfile.mkdtemp(prefix="mentora-loadtest-")
+os.environ["PROVIDER_BACKEND"] = "fake"
+os.environ["FAKE_GEMINI_LATENCY_MS"] = str(args.gemini_ms)
+os.environ["FAKE_TTS_LATENCY_MS"] = str(args.tts_ms)
+os.environ["FAKE_GCS_LATENCY_MS"] = str(args.gcs_ms)
+os.environ["FAKE_PROVIDER_JITTER_MS"] = str(args.jitter_ms)
+os.environ["FAKE_PROVIDER_ERROR_RATE"] = str(args.error_rate)
+os.environ["FAKE_PROVIDER_SEED"] = args.seed
+os.environ["GCS_BUCKET_NAME"] = "mentora-loadtest"
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+os.environ["IMAGE_STORE_BACKEND"] = "local"
+os.environ["IMAGE_STORE_DIR"] = os.path.join(workdir, "image_store")
+os.environ.setdefault("SCORING_POLL_SECONDS", "0.5")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+import websockets
+
+import main
+
+METRICS = ["upload", "first_reply", "first_audio", "scoring"]
+TRANSCRIPTS = [
+    "Latar belakang penelitian saya berangkat dari rendahnya literasi digital di sekolah menengah.",
+    "Metode yang saya gunakan adalah kualitatif dengan wawancara mendalam kepada dua belas guru.",
+    "Kebaruan penelitian ini ada pada model pendampingan yang melibatkan orang tua siswa.",
+    "Data dianalisis secara tematik lalu divalidasi dengan triangulasi sumber.",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Persentil nearest-rank."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(list)
+        self.steps = 0
+
+    def ok(self, metric: str, seconds: float):
+        self.steps += 1
+        self.samples[metric].append(seconds * 1000)
+
+    def fail(self, step: str, reason: str):
+        self.steps += 1
+        self.errors[step].append(reason)
+
+
+async def converse(base_ws: str, session_id: str, token: str, recorder: Recorder) -> list[dict]:
+    url = f"{base_ws}/ws/session/{session_id}?token={token}&stream={str(args.stream).lower()}&audio_format={args.audio_format}"
+    transcript = []
+    async with websockets.connect(url, open_timeout=30, max_size=None) as ws:
+        async def receive():
+            return await asyncio.wait_for(ws.recv(), args.reply_timeout)
+
+        greeting = json.loads(await receive())
+        transcript.append({"speaker": "model", "text": greeting["text"]})
+        if await receive_audio(receive) is None:
+            recorder.fail("greeting_audio", "tidak ada audio salam pembuka")
+
+        for turn in range(args.turns):
+            text = TRANSCRIPTS[turn % len(TRANSCRIPTS)]
+            transcript.append({"speaker": "user", "text": text})
+            sent_at = time.perf_counter()
+            await ws.send(json.dumps({"type": "user_transcript", "text": text}))
+            reply_text, first_reply, first_audio = None, None, None
+            try:
+                while reply_text is None:
+                    message = await receive()
+                    if isinstance(message, bytes):
+                        first_audio = first_audio or time.perf_counter()
+                        continue
+                    data = json.loads(message)
+                    if data["type"] in ("dosen_reply_start", "dosen_reply_chunk"):
+                        first_reply = first_reply or time.perf_counter()
+                    if data["type"] == "dosen_reply_start":
+                        reply_text = data["text"]
+                        # Mode non-streaming: satu frame audio menyusul teks
+                        if await receive_audio(receive) is not None:
+                            first_audio = first_audio or time.perf_counter()
+                    elif data["type"] == "dosen_reply_end":
+                        reply_text = data["text"]
+            except asyncio.TimeoutError:
+                recorder.fail("reply", f"tidak ada balasan dalam {args.reply_timeout:.0f} detik")
+                break
+            transcript.append({"speaker": "model", "text": reply_text})
+            recorder.ok("first_reply", first_reply - sent_at)
+            if first_audio:
+                recorder.ok("first_audio", first_audio - sent_at)
+            else:
+                recorder.fail("first_audio", "balasan tanpa audio")
+    return transcript
+
+
+async def receive_audio(receive):
+    try:
+        message = await receive()
+    except asyncio.TimeoutError:
+        return None
+    return message if isinstance(message, bytes) else None
+
+
+async def simulate_user(index: int, pdf_path: str, base_url: str, recorder: Recorder):
+    email, password = f"load{index}@mentora.example.com", "kata-sandi-uji-beban"
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        response = await client.post("/auth/register", json={"email": email, "password": password})
+        if response.status_code != 200:
+            return recorder.fail("register", f"HTTP {response.status_code}")
+        response = await client.post("/auth/token", data={"username": email, "password": password})
+        if response.status_code != 200:
+            return recorder.fail("login", f"HTTP {response.status_code}")
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        started = time.perf_counter()
+        with open(pdf_path, "rb") as f:
+            response = await client.post("/upload", files={"file": (os.path.basename(pdf_path), f, "application/pdf")}, headers=headers)
+        if response.status_code != 200:
+            return recorder.fail("upload", f"HTTP {response.status_code}: {response.text[:120]}")
+        recorder.ok("upload", time.perf_counter() - started)
+        session_id = response.json()["session_id"]
+
+        try:
+            transcript = await converse(base_url.replace("http://", "ws://"), session_id, token, recorder)
+        except Exception as e:
+            return recorder.fail("websocket", f"{type(e).__name__}: {e}")
+
+        started = time.perf_counter()
+        response = await client.post("/score", json={"session_id": session_id, "full_transcript": transcript}, headers=headers)
+        if response.status_code != 202:
+            return recorder.fail("scoring", f"HTTP {response.status_code}")
+        job = response.json()
+        while job["status"] not in ("done", "failed"):
+            await asyncio.sleep(0.1)
+            job = (await client.get(f"/score/{job['job_id']}", headers=headers)).json()
+        if job["status"] == "failed":
+            return recorder.fail("scoring", job.get("error") or "failed")
+        recorder.ok("scoring", time.perf_counter() - started)
+
+
+async def main_async() -> int:
+    pdfs = sorted(glob.glob(os.path.join(args.data_dir, args.pdf_glob)))
+    if not pdfs:
+        raise SystemExit(f"Tidak ada PDF di {args.data_dir}")
+
+    config = uvicorn.Config(main.app, port=args.port, log_level="warning", ws_max_queue=64)
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            raise SystemExit(f"Server gagal dijalankan di port {args.port}")
+        await asyncio.sleep(0.05)
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    base_url = f"http://127.0.0.1:{args.port}"
+    await asyncio.gather(*(simulate_user(i, pdfs[i % len(pdfs)], base_url, recorder) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    server.should_exit = True
+    await server_task
+
+    print(f"{args.users} pengguna, {args.turns} giliran, stream={args.stream}, audio_format={args.audio_format}, "
+          f"latensi tiruan gemini/tts/gcs={args.gemini_ms:.0f}/{args.tts_ms:.0f}/{args.gcs_ms:.0f} ms ±{args.jitter_ms:.0f}, "
+          f"error_rate={args.error_rate} — selesai dalam {elapsed:.1f} s")
+    print(f"{'metrik':<12} {'n':>5} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    for metric in METRICS:
+        values = recorder.samples[metric]
+        if values:
+            print(f"{metric:<12} {len(values):>5} {percentile(values, 50):>10.0f} {percentile(values, 95):>10.0f} {percentile(values, 99):>10.0f}")
+        else:
+            print(f"{metric:<12} {0:>5} {'-':>10} {'-':>10} {'-':>10}")
+    failed = sum(len(reasons) for reasons in recorder.errors.values())
+    error_rate = failed / recorder.steps if recorder.steps else 0.0
+    print(f"Langkah gagal: {failed}/{recorder.steps} ({error_rate:.1%})")
+    for step, reasons in sorted(recorder.errors.items()):
+        print(f"  {step}: {len(reasons)}x, contoh: {reasons[0]}")
+
+    violations = []
+    for limit in args.max_p95:
+        metric, _, value = limit.partition("=")
+        if metric not in METRICS or not value:
+            raise SystemExit(f"--max-p95 tidak valid: {limit}")
+        values = recorder.samples[metric]
+        if not values or percentile(values, 95) > float(value):
+            violations.append(f"p95 {metric} {percentile(values, 95) if values else float('nan'):.0f} ms > {value} ms")
+    if args.max_error_rate is not None and error_rate > args.max_error_rate:
+        violations.append(f"rasio gagal {error_rate:.1%} > {args.max_error_rate:.1%}")
+    for violation in violations:
+        print(f"BATAS TERLAMPAUI: {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main_async()))
@@ -0,0 +1,79 @@
+"""
+Micro-benchmark pembuatan laporan PDF (tanpa upload GCS).
+
+Membandingkan renderer di report.py (font di-parse sekali, transkrip dipecah per baris)
+dengan cara lama (add_font di setiap laporan, seluruh transkrip lewat satu multi_cell),
+untuk transkrip 1k, 10k, dan 100k karakter.
+
+Contoh:
+    python benchmarks/report_render.py --seconds 5
+"""
+import os
+import sys
+import time
+import argparse
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF
+
+import report
+
+SIZES = [1_000, 10_000, 100_000]
+TURN = (
+    "model: Bisa Anda jelaskan metodologi penelitian yang digunakan?\n"
+    "user: Saya memakai metode kualitatif dengan wawancara mendalam kepada dua belas informan, "
+    "lalu datanya dianalisis secara tematik agar temuan dapat dipertanggungjawabkan.\n"
+)
+
+
+def legacy_render(session_id: str, results_data: dict) -> bytes:
+    """Salinan alur lama create_and_upload_report sebagai pembanding."""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.add_font('DejaVu', '', os.path.join(report.REPORT_FONT_DIR, "DejaVuSans.ttf"))
+    pdf.add_font('DejaVu', 'B', os.path.join(report.REPORT_FONT_DIR, "DejaVuSans-Bold.ttf"))
+    pdf.set_font('DejaVu', 'B', 18)
+    pdf.cell(0, 10, report.REPORT_TITLE, ln=True, align='C')
+    pdf.set_font('DejaVu', '', 10); pdf.cell(0, 8, f"ID Sesi: {session_id}", ln=True, align='C')
+    pdf.set_font('DejaVu', 'B', 14); pdf.cell(0, 10, f"SKOR AKHIR: {results_data['final_score']} / 100", ln=True)
+    pdf.set_font('DejaVu', '', 11); pdf.multi_cell(0, 5, results_data['feedback']); pdf.ln(5)
+    pdf.set_font('DejaVu', '', 10); pdf.multi_cell(0, 5, results_data['transcript'])
+    return bytes(pdf.output())
+
+
+def measure(render, results_data: dict, seconds: float) -> tuple[float, int]:
+    count, started = 0, time.perf_counter()
+    while True:
+        pdf_bytes = render("bench-session", results_data)
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return count / elapsed, len(pdf_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="Durasi pengukuran per kombinasi")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    # Pemanasan: parse font sekali, seperti setelah laporan pertama di server
+    report.render_report("warmup", {"final_score": 0, "feedback": "", "breakdown": {}, "transcript": ""})
+
+    print(f"{'transkrip':>10} | {'lama (laporan/s)':>16} | {'baru (laporan/s)':>16} | {'speedup':>7} | {'ukuran PDF':>10}")
+    for size in SIZES:
+        results_data = {
+            "final_score": 72.33,
+            "feedback": "Jawaban sudah relevan, namun metodologi perlu dijelaskan lebih spesifik.",
+            "breakdown": {"relevance": 80, "clarity": 70, "mastery": 67},
+            "transcript": (TURN * (size // len(TURN) + 1))[:size],
+        }
+        legacy_rate, _ = measure(legacy_render, results_data, args.seconds)
+        new_rate, pdf_size = measure(report.render_report, results_data, args.seconds)
+        print(f"{size:>10,} | {legacy_rate:>16.1f} | {new_rate:>16.1f} | {new_rate / legacy_rate:>6.1f}x | {pdf_size:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Peak memori server saat beberapa PDF besar diunggah bersamaan ke /upload.
+
+Server dijalankan sebagai proses uvicorn terpisah (PROVIDER_BACKEND=fake, SQLite sementara)
+agar RSS-nya bisa diukur dari luar. Selama upload, RSS proses server dan seluruh proses
+anaknya (worker ingestion) dibaca dari /proc setiap --sample-ms; yang dilaporkan adalah
+puncaknya dikurangi RSS saat idle (setelah satu upload pemanasan menyalakan seluruh process pool).
+
+PDF uji meniru proposal hasil scan: setiap halaman berisi satu gambar acak (tidak bisa
+dikompresi) sehingga ukuran file ~--size-mb. Skrip juga memeriksa bahwa file non-PDF
+ditolak (415) dan file di atas UPLOAD_MAX_MB ditolak (413).
+
+Contoh:
+    python benchmarks/upload_memory.py --size-mb 50 --concurrency 4
+Hanya berjalan di Linux (membaca /proc).
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_scanned_pdf(path: str, size_mb: float, page_mb: float = 1.0):
+    """PDF dengan satu gambar derau ~page_mb per halaman; halaman awal berisi teks abstrak & metodologi."""
+    import fitz
+    side = int((page_mb * 1024 * 1024 / 3) ** 0.5)
+    pages = max(2, int(size_mb / page_mb))
+    with fitz.open() as doc:
+        for page_num in range(pages):
+            page = doc.new_page()
+            if page_num == 0:
+                page.insert_text((72, 72), "PROPOSAL PENELITIAN UJI MEMORI UPLOAD\nABSTRAK\nDokumen sintetis hasil scan.")
+            elif page_num == 1:
+                page.insert_text((72, 72), "BAB III METODOLOGI PENELITIAN\nPenelitian ini menggunakan metode kuantitatif.")
+            pixmap = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), False)
+            page.insert_image(fitz.Rect(72, 120, 520, 568), pixmap=pixmap)
+        doc.save(path)
+    return pages
+
+
+def tree_rss_mb(root_pid: int) -> tuple[float, float, int]:
+    """RSS (MB) proses root_pid saja, RSS root_pid beserta seluruh turunannya, dan jumlah prosesnya."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    def rss(pid: int) -> float:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+
+    own = rss(root_pid)
+    total, stack, processes = own, list(children.get(root_pid, [])), 1
+    while stack:
+        pid = stack.pop()
+        total += rss(pid)
+        processes += 1
+        stack.extend(children.get(pid, []))
+    return own, total, processes
+
+
+class PeakSampler(threading.Thread):
+    def __init__(self, pid: int, interval: float):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_server = 0.0
+        self.peak_total = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            server, total, _ = tree_rss_mb(self.pid)
+            self.peak_server = max(self.peak_server, server)
+            self.peak_total = max(self.peak_total, total)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+async def upload(client: httpx.AsyncClient, token: str, name: str, content: bytes) -> int:
+    response = await client.post(
+        "/upload",
+        files={"file": (name, content, "application/pdf")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    return response.status_code
+
+
+async def run(args, server: subprocess.Popen, big_pdf: bytes, small_pdf: bytes):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=600) as client:
+        for _ in range(100):
+            try:
+                await client.get("/docs")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        email, password = "memori@mentora.example.com", "rahasia123"
+        await client.post("/auth/register", json={"email": email, "password": password})
+        response = await client.post("/auth/token", data={"username": email, "password": password})
+        token = response.json()["access_token"]
+
+        # Process pool menyalakan worker sesuai kebutuhan; pemanasan bersamaan agar semuanya sudah hidup sebelum diukur
+        warmup = await asyncio.gather(*(upload(client, token, "kecil.pdf", small_pdf) for _ in range(args.concurrency)))
+        print(f"pemanasan (PDF kecil): HTTP {warmup}")
+        print(f"bukan PDF: HTTP {await upload(client, token, 'palsu.pdf', b'bukan pdf' * 1000)}")
+        oversized = b"%PDF-1.7\n" + b"0" * int((args.max_mb + 1) * 1024 * 1024)
+        print(f"lebih dari {args.max_mb:g} MB: HTTP {await upload(client, token, 'besar.pdf', oversized)}")
+        del oversized
+        await asyncio.sleep(1)
+
+        idle_server, idle_total, idle_processes = tree_rss_mb(server.pid)
+        sampler = PeakSampler(server.pid, args.sample_ms / 1000)
+        sampler.start()
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(
+            upload(client, token, f"scan-{index}.pdf", big_pdf) for index in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+
+    print(f"{args.concurrency} upload bersamaan ({len(big_pdf) / 1024 / 1024:.1f} MB): HTTP {statuses}, {elapsed:.1f} detik")
+    print(f"{'':<22} {'idle MB':>9} {'puncak MB':>10} {'tambahan MB':>12}")
+    print(f"{'proses server':<22} {idle_server:>9.0f} {sampler.peak_server:>10.0f} {sampler.peak_server - idle_server:>12.0f}")
+    print(f"{f'server + {idle_processes - 1} anak':<22} {idle_total:>9.0f} {sampler.peak_total:>10.0f} {sampler.peak_total - idle_total:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=50, help="Ukuran PDF uji")
+    parser.add_argument("--concurrency", type=int, default=4, help="Jumlah upload bersamaan")
+    parser.add_argument("--max-mb", type=float, default=60, help="UPLOAD_MAX_MB untuk server")
+    parser.add_argument("--ingest-workers", type=int, default=4, help="INGEST_MAX_WORKERS untuk server")
+    parser.add_argument("--sample-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mentora-upload-mem-")
+    big_path, small_path = os.path.join(workdir, "scan.pdf"), os.path.join(workdir, "kecil.pdf")
+    pages = build_scanned_pdf(big_path, args.size_mb)
+    # Cukup banyak halaman agar dipecah ke beberapa shard
+    build_scanned_pdf(small_path, size_mb=0.5, page_mb=0.01)
+    with open(big_path, "rb") as f:
+        big_pdf = f.read()
+    with open(small_path, "rb") as f:
+        small_pdf = f.read()
+    print(f"PDF uji: {pages} halaman, {len(big_pdf) / 1024 / 1024:.1f} MB")
+
+    env = {
+        **os.environ,
+        "PROVIDER_BACKEND": "fake",
+        "GCS_BUCKET_NAME": "mentora-upload-mem",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts_cache"),
+        "TTS_WARMUP_FORMATS": "",
+        "IMAGE_STORE_BACKEND": "local",
+        "IMAGE_STORE_DIR": os.path.join(workdir, "image_store"),
+        "INGEST_MAX_WORKERS": str(args.ingest_workers),
+        "UPLOAD_MAX_MB": str(args.max_mb),
+        "UPLOAD_TMP_DIR": workdir,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    try:
+        asyncio.run(run(args, server, big_pdf, small_pdf))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
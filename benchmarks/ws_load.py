@@ -0,0 +1,143 @@
+"""
+Uji beban sesi WebSocket terhadap connection pool yang kecil.
+
+Menjalankan aplikasi di dalam proses (uvicorn) dengan database SQLite sementara,
+lalu membuka banyak sesi WebSocket mode demo secara bersamaan. Selama semua sesi
+terbuka, endpoint /history dipanggil berulang untuk memastikan request HTTP biasa
+tetap mendapat koneksi dari pool.
+
+Contoh:
+    python benchmarks/ws_load.py --sockets 200 --pool-size 2 --max-overflow 0 --hold 10
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--sockets", type=int, default=200, help="Jumlah sesi WebSocket bersamaan")
+parser.add_argument("--pool-size", type=int, default=2)
+parser.add_argument("--max-overflow", type=int, default=0)
+parser.add_argument("--hold", type=float, default=10.0, help="Detik setiap sesi dibiarkan terbuka")
+parser.add_argument("--port", type=int, default=8765)
+args = parser.parse_args()
+
+# Konfigurasi harus di-set sebelum modul aplikasi di-import
+workdir = tempfile.mkdtemp(prefix="mentora-load-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+os.environ["DB_POOL_SIZE"] = str(args.pool_size)
+os.environ["DB_MAX_OVERFLOW"] = str(args.max_overflow)
+os.environ["DB_POOL_TIMEOUT"] = "5"
+os.environ["TTS_CACHE_DIR"] = os.path.join(workdir, "tts_cache")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+import websockets
+
+import auth
+import main
+import models
+from database import SessionLocal, engine, async_engine
+
+# Suara fallback handler saat parameter `speaker` tidak diberikan
+DEMO_VOICE = "id-ID-Chirp3-HD-Achird"
+
+
+def seed() -> tuple[str, str]:
+    with SessionLocal() as db:
+        user = models.User(email="load@test.local", hashed_password=auth.get_password_hash("rahasia"))
+        db.add(user)
+        db.commit()
+        session = models.SimulationSession(
+            user_id=user.id, title="Uji Beban", filename="load.pdf",
+            context_data=json.dumps([{"type": "text", "content": "Judul: Uji Beban"}]),
+        )
+        db.add(session)
+        db.commit()
+        token = auth.create_access_token({"sub": user.email})
+        return token, session.id
+
+
+async def run_socket(url: str, hold: float, results: list):
+    started = time.perf_counter()
+    try:
+        async with websockets.connect(url, open_timeout=30) as ws:
+            greeting = json.loads(await ws.recv())
+            # Semua socket memakai sesi yang sama: hanya yang pertama mendapat salam pembuka
+            assert greeting["type"] in ("dosen_reply_start", "session_resumed")
+            await ws.send(json.dumps({"type": "user_transcript", "text": "Latar belakang penelitian saya adalah ..."}))
+            while True:
+                message = await ws.recv()
+                if isinstance(message, str) and json.loads(message)["type"] == "dosen_reply_start":
+                    break
+            await asyncio.sleep(hold)
+        results.append(("ok", time.perf_counter() - started))
+    except Exception as e:
+        results.append((f"error: {type(e).__name__}: {e}", time.perf_counter() - started))
+
+
+async def poll_history(base_url: str, token: str, stop: asyncio.Event, latencies: list, errors: list):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = await client.get("/history", headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+            await asyncio.sleep(0.2)
+
+
+async def main_async():
+    models.Base.metadata.create_all(bind=engine)
+    token, session_id = seed()
+    # Isi cache audio frasa tetap dengan audio hening agar uji beban tidak bergantung pada Google TTS
+    silence = b"\x00\x00" * main.TTS_SAMPLE_RATE
+    for text in main.FIXED_PHRASES:
+        await main.tts_cache.put(text, DEMO_VOICE, main.DEFAULT_AUDIO_FORMAT, silence)
+
+    config = uvicorn.Config(main.app, port=args.port, log_level="warning", ws_max_queue=64)
+    server = uvicorn.Server(config)
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            raise SystemExit(f"Server gagal dijalankan di port {args.port}")
+        await asyncio.sleep(0.05)
+
+    ws_url = f"ws://127.0.0.1:{args.port}/ws/session/{session_id}?token={token}&mode=demo"
+    results, latencies, errors = [], [], []
+    peak_checked_out = 0
+    stop = asyncio.Event()
+    poller = asyncio.create_task(poll_history(f"http://127.0.0.1:{args.port}", token, stop, latencies, errors))
+
+    sockets = [asyncio.create_task(run_socket(ws_url, args.hold, results)) for _ in range(args.sockets)]
+    while not all(task.done() for task in sockets):
+        peak_checked_out = max(peak_checked_out, engine.pool.checkedout() + async_engine.pool.checkedout())
+        await asyncio.sleep(0.05)
+    stop.set()
+    await poller
+
+    server.should_exit = True
+    await server_task
+
+    ok = sum(1 for status, _ in results if status == "ok")
+    print(f"Pool: pool_size={args.pool_size} max_overflow={args.max_overflow}")
+    print(f"Sesi WebSocket: {ok}/{args.sockets} berhasil")
+    for status in sorted({status for status, _ in results if status != "ok"}):
+        print(f"  {status}")
+    print(f"Puncak koneksi DB dipinjam: {peak_checked_out}")
+    if latencies:
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+        print(
+            f"/history selama beban: {len(latencies)} request, gagal {len(errors)}, "
+            f"median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
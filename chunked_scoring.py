@@ -0,0 +1,129 @@
+import os
+import re
+import asyncio
+import traceback
+from typing import Awaitable, Callable, Optional
+
+from prompt_cache import CHARS_PER_TOKEN
+
+# --- Konfigurasi Penilaian Bertahap (map-reduce) dari Environment Variable ---
+# Transkrip yang lebih panjang dari ini (perkiraan token) dinilai per potongan; yang lebih pendek tetap satu panggilan.
+SCORING_CHUNK_THRESHOLD_TOKENS = int(os.getenv("SCORING_CHUNK_THRESHOLD_TOKENS", 8000))
+# Anggaran token per potongan transkrip. Potongan selalu berakhir di batas giliran bicara.
+SCORING_CHUNK_TOKENS = int(os.getenv("SCORING_CHUNK_TOKENS", 4000))
+# Jumlah maksimum potongan yang dinilai Gemini bersamaan untuk satu job.
+SCORING_CHUNK_CONCURRENCY = int(os.getenv("SCORING_CHUNK_CONCURRENCY", 4))
+
+SCORE_KEYS = ("relevance", "clarity", "mastery")
+STUDENT_SPEAKER = "user"
+# Label pembicara yang dikirim frontend di POST /score (sama dengan role Gemini): mahasiswa & dosen
+SPEAKER_LABELS = (STUDENT_SPEAKER, "model")
+# Baris transkrip berformat "<speaker>: <teks>" (lihat POST /score). Hanya label yang dikenal yang
+# memulai giliran baru; baris lain (mis. "Hipotesis: ..." di tengah jawaban) adalah lanjutan giliran sebelumnya.
+_TURN_START = re.compile(rf"^({'|'.join(SPEAKER_LABELS)}): ?", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_turns(transcript: str) -> list[str]:
+    turns = []
+    for line in transcript.split("\n"):
+        if turns and not _TURN_START.match(line):
+            turns[-1] += "\n" + line
+        else:
+            turns.append(line)
+    return turns
+
+
+def chunk_transcript(transcript: str, max_tokens: int = SCORING_CHUNK_TOKENS) -> list[str]:
+    """
+    Memecah transkrip per giliran bicara menjadi potongan dengan anggaran `max_tokens`.
+    Satu giliran yang melebihi anggaran dipotong per karakter menjadi beberapa potongan sendiri.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks, current, current_chars = [], [], 0
+    for turn in split_turns(transcript):
+        if current and current_chars + len(turn) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_chars = [], 0
+        if len(turn) > max_chars:
+            chunks.extend(turn[start:start + max_chars] for start in range(0, len(turn), max_chars))
+            continue
+        current.append(turn)
+        current_chars += len(turn) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def student_chars(chunk: str) -> int:
+    """Panjang ucapan mahasiswa dalam potongan; dipakai sebagai bobot saat skor digabung."""
+    total = 0
+    for turn in split_turns(chunk):
+        match = _TURN_START.match(turn)
+        if match and match.group(1).lower() == STUDENT_SPEAKER:
+            total += len(turn) - match.end()
+    return total
+
+
+def merge_scores(chunks: list[str], results: list[Optional[dict]]) -> dict:
+    """
+    Rata-rata berbobot skor per potongan (bobot = panjang ucapan mahasiswa) untuk relevance,
+    clarity, dan mastery, dibulatkan ke bilangan bulat. Deterministik: hasil hanya bergantung
+    pada potongan & skornya. Potongan yang gagal dinilai (None) tidak ikut dihitung.
+    """
+    scored = [(student_chars(chunk), result) for chunk, result in zip(chunks, results) if result]
+    if not scored:
+        raise ValueError("Tidak ada potongan transkrip yang berhasil dinilai.")
+    # Tanpa ucapan mahasiswa sama sekali, semua potongan berbobot sama
+    if not any(weight for weight, _ in scored):
+        scored = [(1, result) for _, result in scored]
+    total_weight = sum(weight for weight, _ in scored)
+    return {
+        key: round(sum(weight * float(result.get(key, 0)) for weight, result in scored) / total_weight)
+        for key in SCORE_KEYS
+    }
+
+
+async def score_in_chunks(
+    transcript: str,
+    score_chunk: Callable[[str, int, int], Awaitable[Optional[dict]]],
+    synthesize_feedback: Callable[[dict, list[str]], Awaitable[Optional[str]]],
+    max_tokens: int = SCORING_CHUNK_TOKENS,
+    concurrency: int = SCORING_CHUNK_CONCURRENCY,
+) -> Optional[dict]:
+    """
+    Penilaian map-reduce: setiap potongan dinilai `score_chunk(potongan, nomor, jumlah)` secara paralel
+    (dibatasi `concurrency`), skor digabung dengan `merge_scores`, lalu satu panggilan
+    `synthesize_feedback(skor, umpan_balik_potongan)` menyusun umpan balik akhir.
+    Hasilnya berformat sama dengan penilaian satu panggilan: {relevance, clarity, mastery, feedback}.
+    """
+    chunks = chunk_transcript(transcript, max_tokens)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score(index: int, chunk: str) -> Optional[dict]:
+        async with semaphore:
+            try:
+                return await score_chunk(chunk, index + 1, len(chunks))
+            except Exception:
+                traceback.print_exc()
+                return None
+
+    results = await asyncio.gather(*(score(index, chunk) for index, chunk in enumerate(chunks)))
+    failed = sum(1 for result in results if not result)
+    if failed == len(chunks):
+        return None
+    if failed:
+        print(f"PERINGATAN: {failed} dari {len(chunks)} potongan transkrip gagal dinilai; skor digabung dari sisanya.")
+
+    scores = merge_scores(chunks, results)
+    chunk_feedback = [result.get("feedback", "") for result in results if result and result.get("feedback")]
+    try:
+        feedback = await synthesize_feedback(scores, chunk_feedback)
+    except Exception:
+        traceback.print_exc()
+        feedback = None
+    # Sintesis gagal: umpan balik per potongan tetap dikembalikan apa adanya
+    return {**scores, "feedback": feedback or "\n\n".join(chunk_feedback)}
@@ -0,0 +1,102 @@
+import os
+import threading
+import traceback
+from collections import Counter
+from typing import Optional
+
+import google.generativeai as genai
+from google.cloud import storage
+from google.cloud import texttospeech
+
+import fake_providers
+
+# --- Pilihan Provider dari Environment Variable ---
+# PROVIDER_BACKEND: 'google' (Gemini, Cloud TTS, GCS asli) atau 'fake' (tiruan lokal tanpa jaringan,
+# dengan latensi/jitter/error yang bisa diatur; lihat fake_providers.py) untuk uji beban & CI.
+PROVIDER_BACKEND = os.getenv("PROVIDER_BACKEND", "google").lower()
+if PROVIDER_BACKEND not in ("google", "fake"):
+    raise ValueError(f"PROVIDER_BACKEND tidak dikenal: {PROVIDER_BACKEND}")
+
+
+class ClientRegistry:
+    """
+    Klien layanan eksternal (Google TTS, GCS, Gemini) yang dibuat sekali per proses dan
+    dipakai bersama oleh semua request & sesi WebSocket. Dibuat saat startup aplikasi dan
+    ditutup saat shutdown, sehingga kredensial dan channel gRPC/HTTP tidak dibangun ulang
+    di setiap panggilan. `created` mencatat berapa kali tiap klien benar-benar dibuat.
+    Dengan backend 'fake', klien diganti tiruan lokal yang memiliki interface yang sama.
+    """
+
+    def __init__(self, backend: str = PROVIDER_BACKEND):
+        self.backend = backend
+        self.fake = backend == "fake"
+        self._lock = threading.Lock()
+        self._tts: Optional[texttospeech.TextToSpeechAsyncClient] = None
+        self._storage: Optional[storage.Client] = None
+        self._buckets: dict[str, storage.Bucket] = {}
+        self._models: dict[tuple, genai.GenerativeModel] = {}
+        self.created = Counter()
+
+    async def startup(self):
+        # Klien TTS async terikat ke event loop, jadi dibuat di dalam loop aplikasi.
+        try:
+            self.tts_client()
+        except Exception as e:
+            print(f"PERINGATAN: Gagal membuat klien Google TTS saat startup: {e}")
+        try:
+            self.storage_client()
+        except Exception as e:
+            print(f"PERINGATAN: Gagal membuat klien GCS saat startup: {e}")
+
+    async def shutdown(self):
+        tts_client, storage_client = self._tts, self._storage
+        self._tts, self._storage = None, None
+        self._buckets.clear()
+        self._models.clear()
+        try:
+            if tts_client is not None:
+                await tts_client.transport.close()
+            if storage_client is not None:
+                storage_client.close()
+        except Exception:
+            traceback.print_exc()
+
+    def tts_client(self) -> texttospeech.TextToSpeechAsyncClient:
+        if self._tts is None:
+            with self._lock:
+                if self._tts is None:
+                    self._tts = fake_providers.FakeTTSClient() if self.fake else texttospeech.TextToSpeechAsyncClient()
+                    self.created["tts"] += 1
+        return self._tts
+
+    def storage_client(self) -> storage.Client:
+        if self._storage is None:
+            with self._lock:
+                if self._storage is None:
+                    self._storage = fake_providers.FakeStorageClient() if self.fake else storage.Client()
+                    self.created["storage"] += 1
+        return self._storage
+
+    def bucket(self, bucket_name: str) -> storage.Bucket:
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            bucket = self._buckets.setdefault(bucket_name, self.storage_client().bucket(bucket_name))
+        return bucket
+
+    def generative_model(self, model_name: str, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+        key = (model_name, system_instruction)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    if self.fake:
+                        model = fake_providers.FakeGenerativeModel(model_name, system_instruction=system_instruction)
+                    else:
+                        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+                    self._models[key] = model
+                    self.created["gemini"] += 1
+        return model
+
+
+registry = ClientRegistry()
@@ -0,0 +1,85 @@
+import os
+import zlib
+import base64
+import asyncio
+import traceback
+
+from sqlalchemy import Text, bindparam, select, update
+from sqlalchemy.sql.expression import type_coerce
+from sqlalchemy.types import TypeDecorator
+
+# --- Konfigurasi Kompresi Teks Besar dari Environment Variable ---
+# Level zlib (1-9) saat menulis nilai baru.
+COMPRESSED_TEXT_LEVEL = int(os.getenv("COMPRESSED_TEXT_LEVEL", 6))
+# Jumlah baris lama yang dikompresi ulang per transaksi saat migrasi latar belakang.
+COMPRESSED_TEXT_MIGRATION_BATCH = int(os.getenv("COMPRESSED_TEXT_MIGRATION_BATCH", 200))
+
+# Penanda versi format di awal nilai tersimpan. Nilai tanpa penanda adalah data lama (teks mentah,
+# mis. JSON yang diawali '[' atau '{'), sehingga tetap terbaca tanpa migrasi.
+# Versi berikutnya (mis. zstd) cukup menambah penanda baru di decompress_text.
+FORMAT_ZLIB_V1 = "z1:"
+
+
+def compress_text(text: str, level: int = COMPRESSED_TEXT_LEVEL) -> str:
+    # Base64 agar tetap bisa disimpan di kolom Text (PostgreSQL menolak byte sembarang di TEXT)
+    return FORMAT_ZLIB_V1 + base64.b64encode(zlib.compress(text.encode("utf-8"), level)).decode("ascii")
+
+
+def decompress_text(value: str) -> str:
+    if value.startswith(FORMAT_ZLIB_V1):
+        return zlib.decompress(base64.b64decode(value[len(FORMAT_ZLIB_V1):])).decode("utf-8")
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Kolom Text yang isinya disimpan terkompresi zlib (+ penanda versi). Di Python nilainya tetap
+    string biasa; nilai lama yang belum terkompresi dibaca apa adanya.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decompress_text(value)
+
+
+async def compress_legacy_rows(session_factory, column, batch_size: int = COMPRESSED_TEXT_MIGRATION_BATCH) -> int:
+    """
+    Menulis ulang nilai lama (tanpa penanda versi) pada `column` dalam format terkompresi,
+    per batch agar tidak mengunci tabel lama. Aman dijalankan berulang atau bersamaan di
+    beberapa worker: hanya baris yang masih belum terkompresi yang diperbarui.
+    Mengembalikan jumlah baris yang dimigrasi.
+    """
+    table = column.table
+    (primary_key,) = table.primary_key.columns
+    # type_coerce ke Text: baca & bandingkan nilai mentah di database tanpa melewati CompressedText
+    raw = type_coerce(column, Text)
+    legacy = raw.not_like(f"{FORMAT_ZLIB_V1}%")
+    statement = update(table).where(primary_key == bindparam("_pk"), legacy).values({column.key: bindparam("_value")})
+
+    migrated = 0
+    while True:
+        async with session_factory() as db:
+            rows = (await db.execute(select(primary_key, raw).where(legacy).limit(batch_size))).all()
+            if not rows:
+                return migrated
+            # Kompresi dilakukan oleh CompressedText saat bind parameter
+            await db.execute(statement, [{"_pk": pk, "_value": value} for pk, value in rows])
+            await db.commit()
+        migrated += len(rows)
+        # Beri giliran ke request lain di antara batch
+        await asyncio.sleep(0)
+
+
+async def run_migration(session_factory, column):
+    try:
+        migrated = await compress_legacy_rows(session_factory, column)
+        if migrated:
+            print(f"Migrasi kompresi {column}: {migrated} baris lama dikompresi.")
+    except Exception:
+        print(f"PERINGATAN: Migrasi kompresi {column} gagal; baris lama tetap terbaca apa adanya.")
+        traceback.print_exc()
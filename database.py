@@ -1,5 +1,6 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -9,12 +10,57 @@ from sqlalchemy.orm import sessionmaker
 # Contoh untuk SQLite (development): "sqlite:///./test.db"
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mentora.db")
 
+# --- Konfigurasi Connection Pool dari Environment Variable ---
+# Default sama dengan bawaan SQLAlchemy (5 koneksi + 10 overflow).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# Detik menunggu koneksi bebas sebelum request gagal.
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+# Koneksi yang lebih tua dari ini (detik) dibuka ulang; -1 untuk menonaktifkan.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Cek koneksi sebelum dipakai agar koneksi yang diputus server tidak menyebabkan error.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
 engine = create_engine(
     DATABASE_URL,
     # connect_args diperlukan untuk SQLite, bisa dihapus untuk PostgreSQL/MySQL
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# --- Engine Async untuk endpoint `async def` & WebSocket ---
+# Driver async dipilih dari DATABASE_URL: asyncpg untuk PostgreSQL, aiosqlite untuk SQLite.
+# Bisa ditimpa langsung lewat ASYNC_DATABASE_URL.
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+# expire_on_commit=False: objek tetap bisa dibaca setelah commit tanpa query ulang (lazy load tidak tersedia di async)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
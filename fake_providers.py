@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from datetime import timedelta
+from typing import Any
+
+from google.cloud import texttospeech
+
+# --- Konfigurasi Provider Tiruan (PROVIDER_BACKEND=fake) dari Environment Variable ---
+# Latensi dasar tiap layanan (milidetik); setiap panggilan mendapat jitter acak ±FAKE_PROVIDER_JITTER_MS.
+FAKE_GEMINI_LATENCY_MS = float(os.getenv("FAKE_GEMINI_LATENCY_MS", 800))
+FAKE_TTS_LATENCY_MS = float(os.getenv("FAKE_TTS_LATENCY_MS", 300))
+FAKE_GCS_LATENCY_MS = float(os.getenv("FAKE_GCS_LATENCY_MS", 50))
+FAKE_PROVIDER_JITTER_MS = float(os.getenv("FAKE_PROVIDER_JITTER_MS", 100))
+# Peluang (0-1) sebuah panggilan gagal dengan FakeProviderError.
+FAKE_PROVIDER_ERROR_RATE = float(os.getenv("FAKE_PROVIDER_ERROR_RATE", 0))
+# Seed acak agar latensi & error bisa diulang persis sama antar run.
+FAKE_PROVIDER_SEED = os.getenv("FAKE_PROVIDER_SEED")
+
+# Perkiraan ukuran audio: PCM 16-bit 24 kHz, dan bitrate encoder terkompresi (lihat readme)
+FAKE_TTS_SAMPLE_RATE = 24000
+FAKE_TTS_CHARS_PER_SECOND = 15
+FAKE_COMPRESSED_BYTES_PER_SECOND = {
+    texttospeech.AudioEncoding.OGG_OPUS: 3000,
+    texttospeech.AudioEncoding.MP3: 4000,
+}
+
+FAKE_REPLIES = [
+    "Baik, saya paham poin Anda. Bagaimana Anda memastikan data yang dikumpulkan benar-benar valid?",
+    "Menarik sekali penjelasan Anda. Apa alasan Anda memilih metode tersebut dibandingkan alternatif lain?",
+    "Oke, jadi Anda berpendapat demikian. Bisa dijelaskan batasan penelitian Anda secara lebih spesifik?",
+    "Itu penjelasan yang jernih. Lalu, apa kontribusi utama penelitian ini bagi bidang Anda?",
+]
+
+
+class FakeProviderError(Exception):
+    """Error tiruan yang disuntikkan sesuai FAKE_PROVIDER_ERROR_RATE."""
+
+
+class FakeLatency:
+    """Latensi, jitter, dan error acak untuk satu layanan tiruan."""
+
+    _random = random.Random(FAKE_PROVIDER_SEED)
+
+    def __init__(self, service: str, latency_ms: float, jitter_ms: float = FAKE_PROVIDER_JITTER_MS, error_rate: float = FAKE_PROVIDER_ERROR_RATE):
+        self.service = service
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def _next(self, scale: float) -> float:
+        if self._random.random() < self.error_rate:
+            raise FakeProviderError(f"Error tiruan dari layanan {self.service}")
+        return max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) * scale / 1000
+
+    async def wait(self, scale: float = 1.0):
+        await asyncio.sleep(self._next(scale))
+
+    def wait_sync(self, scale: float = 1.0):
+        # Untuk API sinkron (GCS) yang dipanggil lewat asyncio.to_thread
+        time.sleep(self._next(scale))
+
+
+# --- Gemini ---
+
+class _FakeGeminiResponse:
+    def __init__(self, text: str, chunks: list[str] = None, latency: FakeLatency = None):
+        self.text = text
+        self._chunks = chunks or [text]
+        self._latency = latency
+
+    async def __aiter__(self):
+        # Mode stream=True: potongan pertama sudah ditunggu di generate_content_async,
+        # potongan berikutnya menyusul dengan sebagian kecil latensi dasar
+        for index, chunk in enumerate(self._chunks):
+            if index and self._latency:
+                await self._latency.wait(scale=0.1)
+            yield _FakeGeminiResponse(chunk)
+
+
+class FakeGenerativeModel:
+    """Pengganti genai.GenerativeModel untuk `generate_content_async` (biasa, streaming, dan JSON)."""
+
+    def __init__(self, model_name: str, system_instruction: str = None, latency: FakeLatency = None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency or FakeLatency("gemini", FAKE_GEMINI_LATENCY_MS)
+
+    async def generate_content_async(self, contents, generation_config=None, stream: bool = False, **kwargs):
+        await self.latency.wait()
+        # Balasan dipilih deterministik dari isi permintaan
+        seed = int(hashlib.sha256(repr(contents)[-2000:].encode("utf-8")).hexdigest(), 16)
+        if getattr(generation_config, "response_mime_type", None) == "application/json" or (
+            isinstance(generation_config, dict) and generation_config.get("response_mime_type") == "application/json"
+        ):
+            # Satu bentuk JSON memenuhi penilaian ({relevance, clarity, mastery, feedback}) maupun sintesis ({feedback})
+            scores = {key: 50 + (seed >> shift) % 40 for key, shift in (("relevance", 0), ("clarity", 8), ("mastery", 16))}
+            return _FakeGeminiResponse(json.dumps({**scores, "feedback": "Umpan balik tiruan: jelaskan metodologi secara lebih spesifik."}))
+        text = FAKE_REPLIES[seed % len(FAKE_REPLIES)]
+        if not stream:
+            return _FakeGeminiResponse(text)
+        words = text.split(" ")
+        step = max(1, len(words) // 4)
+        chunks = [" ".join(words[i:i + step]) + (" " if i + step < len(words) else "") for i in range(0, len(words), step)]
+        return _FakeGeminiResponse(text, chunks, self.latency)
+
+
+class FakePrefixBackend:
+    """Pengganti GeminiPrefixBackend (context caching) untuk PromptPrefixCache."""
+
+    def __init__(self, latency: FakeLatency = None):
+        self.latency = latency or FakeLatency("gemini-cache", FAKE_GEMINI_LATENCY_MS)
+
+    def upload(self, session_id: str, model_name: str, system_instruction: str, parts: list, ttl: timedelta) -> str:
+        self.latency.wait_sync()
+        return f"cachedContents/fake-{session_id}"
+
+    def model(self, handle: Any, generation_config=None):
+        return FakeGenerativeModel(handle)
+
+    def delete(self, handle: Any):
+        pass
+
+
+# --- Text-to-Speech ---
+
+class _FakeTTSResponse:
+    def __init__(self, audio_content: bytes):
+        self.audio_content = audio_content
+
+
+class _FakeTransport:
+    async def close(self):
+        pass
+
+
+class FakeTTSClient:
+    """Pengganti TextToSpeechAsyncClient: audio hening dengan durasi sebanding panjang teks."""
+
+    def __init__(self, latency: FakeLatency = None):
+        self.latency = latency or FakeLatency("tts", FAKE_TTS_LATENCY_MS)
+        self.transport = _FakeTransport()
+
+    async def synthesize_speech(self, input, voice, audio_config, **kwargs):
+        await self.latency.wait()
+        seconds = max(0.5, len(input.text) / FAKE_TTS_CHARS_PER_SECOND)
+        bytes_per_second = FAKE_COMPRESSED_BYTES_PER_SECOND.get(audio_config.audio_encoding)
+        if bytes_per_second is None:
+            # LINEAR16 tanpa header RIFF; synthesize_audio membungkusnya menjadi WAV
+            return _FakeTTSResponse(b"\x00\x00" * int(FAKE_TTS_SAMPLE_RATE * seconds))
+        return _FakeTTSResponse(b"\x00" * int(bytes_per_second * seconds))
+
+
+# --- Cloud Storage ---
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+
+    def upload_from_string(self, data, content_type: str = None, **kwargs):
+        self.bucket.client.latency.wait_sync()
+        self.bucket.objects[self.name] = data if isinstance(data, bytes) else data.encode("utf-8")
+
+    def exists(self) -> bool:
+        self.bucket.client.latency.wait_sync()
+        return self.name in self.bucket.objects
+
+    def download_as_bytes(self) -> bytes:
+        self.bucket.client.latency.wait_sync()
+        return self.bucket.objects[self.name]
+
+    def generate_signed_url(self, expiration: timedelta, **kwargs) -> str:
+        # Penandatanganan GCS dilakukan lokal (tanpa jaringan), jadi tanpa latensi tiruan
+        return f"https://fake-gcs.local/{self.bucket.name}/{self.name}?expires={int(expiration.total_seconds())}"
+
+
+class FakeBucket:
+    def __init__(self, client: "FakeStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.objects: dict[str, bytes] = {}
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+
+class FakeStorageClient:
+    """Pengganti storage.Client: objek disimpan di memori proses."""
+
+    def __init__(self, latency: FakeLatency = None):
+        self.latency = latency or FakeLatency("gcs", FAKE_GCS_LATENCY_MS)
+        self._buckets: dict[str, FakeBucket] = {}
+
+    def bucket(self, name: str) -> FakeBucket:
+        return self._buckets.setdefault(name, FakeBucket(self, name))
+
+    def close(self):
+        pass
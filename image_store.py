@@ -0,0 +1,127 @@
+import os
+import base64
+import hashlib
+import tempfile
+
+from google.api_core.exceptions import PreconditionFailed
+
+from clients import registry
+
+# --- Konfigurasi Penyimpanan Gambar dari Environment Variable ---
+# IMAGE_STORE_BACKEND: 'local' (filesystem) atau 'gcs' (Google Cloud Storage)
+IMAGE_STORE_BACKEND = os.getenv("IMAGE_STORE_BACKEND", "local").lower()
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "image_store")
+IMAGE_STORE_GCS_BUCKET = os.getenv("IMAGE_STORE_GCS_BUCKET") or os.getenv("GCS_BUCKET_NAME")
+IMAGE_STORE_GCS_PREFIX = os.getenv("IMAGE_STORE_GCS_PREFIX", "images").strip("/")
+
+REF_PREFIX = "sha256:"
+
+
+def image_ref(data: bytes) -> str:
+    """Referensi berbasis konten: gambar yang sama selalu menghasilkan ref yang sama."""
+    return REF_PREFIX + hashlib.sha256(data).hexdigest()
+
+def _digest(ref: str) -> str:
+    if not ref.startswith(REF_PREFIX):
+        raise ValueError(f"Referensi gambar tidak valid: {ref}")
+    digest = ref[len(REF_PREFIX):]
+    if len(digest) != 64 or any(char not in "0123456789abcdef" for char in digest):
+        raise ValueError(f"Referensi gambar tidak valid: {ref}")
+    return digest
+
+
+class ImageStore:
+    """Interface penyimpanan blob gambar yang dialamatkan dengan SHA-256 (deduplikasi otomatis)."""
+
+    def exists(self, ref: str) -> bool:
+        raise NotImplementedError
+
+    def get(self, ref: str) -> bytes:
+        raise NotImplementedError
+
+    def _write(self, ref: str, data: bytes, mime_type: str):
+        raise NotImplementedError
+
+    def save(self, ref: str, data: bytes, mime_type: str) -> str:
+        """Menyimpan blob dengan ref yang sudah dihitung; dilewati jika blob sudah ada."""
+        if not self.exists(ref):
+            self._write(ref, data, mime_type)
+        return ref
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        return self.save(image_ref(data), data, mime_type)
+
+
+class LocalImageStore(ImageStore):
+    def __init__(self, root: str = IMAGE_STORE_DIR):
+        self.root = root
+
+    def _path(self, ref: str) -> str:
+        digest = _digest(ref)
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, ref: str) -> bool:
+        return os.path.exists(self._path(ref))
+
+    def get(self, ref: str) -> bytes:
+        with open(self._path(ref), "rb") as f:
+            return f.read()
+
+    def _write(self, ref: str, data: bytes, mime_type: str):
+        path = self._path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Tulis ke file sementara lalu rename agar pembaca tidak pernah melihat file setengah jadi
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+
+class GCSImageStore(ImageStore):
+    def __init__(self, bucket_name: str = IMAGE_STORE_GCS_BUCKET, prefix: str = IMAGE_STORE_GCS_PREFIX):
+        if not bucket_name:
+            raise Exception("Nama bucket GCS untuk penyimpanan gambar tidak dikonfigurasi.")
+        self.bucket = registry.bucket(bucket_name)
+        self.prefix = prefix
+
+    def _blob(self, ref: str):
+        digest = _digest(ref)
+        return self.bucket.blob(f"{self.prefix}/{digest[:2]}/{digest}")
+
+    def exists(self, ref: str) -> bool:
+        return self._blob(ref).exists()
+
+    def get(self, ref: str) -> bytes:
+        return self._blob(ref).download_as_bytes()
+
+    def _write(self, ref: str, data: bytes, mime_type: str):
+        try:
+            # if_generation_match=0: hanya tulis jika blob belum ada (aman untuk upload paralel)
+            self._blob(ref).upload_from_string(data, content_type=mime_type, if_generation_match=0)
+        except PreconditionFailed:
+            pass
+
+
+_store: ImageStore | None = None
+
+def get_image_store() -> ImageStore:
+    global _store
+    if _store is None:
+        if IMAGE_STORE_BACKEND == "gcs":
+            _store = GCSImageStore()
+        elif IMAGE_STORE_BACKEND == "local":
+            _store = LocalImageStore()
+        else:
+            raise ValueError(f"IMAGE_STORE_BACKEND tidak dikenal: {IMAGE_STORE_BACKEND}")
+    return _store
+
+
+def load_image_bytes(block: dict) -> bytes:
+    """Mengambil bytes gambar dari blok konteks (format baru 'ref' maupun format lama base64 'data')."""
+    if "ref" in block:
+        return get_image_store().get(block["ref"])
+    return base64.b64decode(block["data"])
@@ -0,0 +1,261 @@
+import os
+import re
+import math
+import asyncio
+import multiprocessing
+from bisect import bisect_left
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from image_store import image_ref, get_image_store
+
+# --- Konfigurasi Ingestion PDF dari Environment Variable ---
+# INGEST_MAX_WORKERS: jumlah proses worker untuk parsing PDF.
+# INGEST_SHARD_MIN_PAGES: dokumen dengan jumlah halaman >= nilai ini dipecah per rentang halaman.
+INGEST_MAX_WORKERS = max(1, int(os.getenv("INGEST_MAX_WORKERS", min(4, os.cpu_count() or 1))))
+INGEST_SHARD_MIN_PAGES = max(1, int(os.getenv("INGEST_SHARD_MIN_PAGES", 40)))
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Mengembalikan process pool ingestion (dibuat saat pertama kali dibutuhkan)."""
+    global _pool
+    if _pool is None:
+        # 'spawn' agar worker tidak mewarisi event loop & koneksi dari proses server
+        _pool = ProcessPoolExecutor(
+            max_workers=INGEST_MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+# --- Kata kunci setiap bagian proposal: (kata kunci awal, kata kunci akhir) ---
+SECTION_KEYWORDS = {
+    "abstract": (["ABSTRAK", "ABSTRACT"], ["KATA KUNCI", "PENDAHULUAN", "BAB I", "I. PENDAHULUAN"]),
+    "rumusan_masalah": (["RUMUSAN MASALAH"], ["TUJUAN PENELITIAN", "BATASAN MASALAH"]),
+    "tujuan_penelitian": (["TUJUAN PENELITIAN"], ["MANFAAT PENELITIAN", "BATASAN MASALAH", "BAB II"]),
+    "metodologi": (["METODOLOGI PENELITIAN","METODE PENELITIAN", "BAB III", "III. METODE"], ["HASIL DAN PEMBAHASAN", "BAB IV"]),
+}
+TITLE_END_KEY = "ABSTRAK"
+TITLE_SKIP_KEYWORDS = ["SKRIPSI", "TESIS", "TUGAS AKHIR", "UNIVERSITAS"]
+
+
+@lru_cache(maxsize=8)
+def _keyword_pattern(keys: tuple[str, ...]) -> re.Pattern:
+    """Menyusun regex berbentuk trie dari kata kunci agar pemindaian tidak banyak backtracking."""
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        alternatives = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return re.compile(build(trie))
+
+
+class SectionLocator:
+    """
+    Mesin pencari bagian proposal. Teks di-uppercase satu kali, lalu posisi semua
+    kata kunci (awal & akhir, termasuk yang saling tumpang tindih seperti 'BAB I'
+    dan 'BAB III') dikumpulkan dalam satu kali pemindaian regex berbentuk trie.
+    Aturannya identik dengan implementasi lama `extract_title` / `extract_section`
+    (benchmarks/legacy_extraction.py), termasuk indeks yang dihitung pada teks uppercase.
+    """
+
+    def __init__(self, full_text: str, keywords: dict = SECTION_KEYWORDS):
+        self.full_text = full_text
+        self.text_upper = full_text.upper()
+
+        keys = {TITLE_END_KEY}
+        for start_keys, end_keys in keywords.values():
+            keys.update(key.upper() for key in start_keys + end_keys)
+        keys = sorted(keys)
+
+        self._positions = {key: [] for key in keys}
+        pattern = _keyword_pattern(tuple(keys))
+        pos = 0
+        while True:
+            match = pattern.search(self.text_upper, pos)
+            if match is None:
+                break
+            pos = match.start()
+            for key in keys:
+                if self.text_upper.startswith(key, pos):
+                    self._positions[key].append(pos)
+            # Lanjut dari karakter berikutnya agar kata kunci yang tumpang tindih tetap ditemukan
+            pos += 1
+
+    def find(self, key: str, start: int = 0) -> int:
+        """Setara `text_upper.find(key, start)` untuk kata kunci yang sudah dipindai."""
+        positions = self._positions[key.upper()]
+        i = bisect_left(positions, start)
+        return positions[i] if i < len(positions) else -1
+
+    def title(self) -> str:
+        end_pos = self.find(TITLE_END_KEY)
+        search_block = self.full_text[:end_pos] if end_pos != -1 else self.full_text[:2500]
+        lines = [line.strip() for line in search_block.strip().split('\n') if line.strip()]
+        longest_line = ""; best_candidate = ""
+        for line in lines:
+            if len(line) < 10 or any(keyword in line.upper() for keyword in TITLE_SKIP_KEYWORDS):
+                continue
+            if len(line) > len(longest_line): longest_line = line
+            if line.isupper() and len(line) > len(best_candidate): best_candidate = line
+        final_title = best_candidate if best_candidate else longest_line
+        return final_title if final_title else "Judul tidak ditemukan"
+
+    def section(self, start_keys: list[str], end_keys: list[str]) -> str:
+        full_text, text_upper = self.full_text, self.text_upper
+        search_offset = 0
+
+        while True:
+            start_index = -1
+            found_key = None
+            for key in start_keys:
+                pos = self.find(key, search_offset)
+                if pos != -1 and (start_index == -1 or pos < start_index):
+                    start_index = pos
+                    found_key = key
+
+            if start_index == -1:
+                return ""
+
+            line_end_pos = text_upper.find('\n', start_index)
+            if line_end_pos == -1: line_end_pos = len(text_upper)
+
+            # Lewati entri daftar isi (baris dengan '...' atau deretan titik)
+            line_snippet = full_text[start_index:line_end_pos]
+            if '...' in line_snippet or line_snippet.count('.') > 10:
+                search_offset = line_end_pos
+                continue
+            break
+
+        body_start = start_index + len(found_key)
+        end_index = len(full_text)
+        for end_key in end_keys:
+            pos = self.find(end_key, body_start)
+            if pos != -1:
+                line_start_pos = text_upper.rfind('\n', body_start, pos)
+                if line_start_pos == -1: line_start_pos = body_start
+
+                line_of_end_key = text_upper[line_start_pos:pos + len(end_key)]
+                if any(char.isdigit() for char in line_of_end_key) or len(line_of_end_key.split()) < 5:
+                    end_index = line_start_pos
+                    break
+
+        return full_text[start_index:end_index].strip()
+
+
+def extract_sections(full_text: str) -> dict:
+    """Mengekstrak judul dan bagian-bagian utama proposal dari teks lengkap."""
+    locator = SectionLocator(full_text)
+    sections = {"title": locator.title()}
+    for name, (start_keys, end_keys) in SECTION_KEYWORDS.items():
+        sections[name] = locator.section(start_keys, end_keys)
+    return sections
+
+
+# --- Fungsi worker (dijalankan di process pool, harus bisa di-pickle) ---
+
+# Worker menerima path file, bukan bytes: PDF tidak ikut di-pickle ke setiap shard, dan MuPDF
+# membaca halaman dari disk sesuai kebutuhan alih-alih menyalin seluruh dokumen ke memori.
+
+def _count_pages(pdf_path: str) -> int:
+    with fitz.open(pdf_path, filetype="pdf") as doc:
+        return len(doc)
+
+def _extract_page_range(pdf_path: str, start: int, stop: int) -> tuple[list[tuple[str, list[dict]]], dict]:
+    """
+    Membaca teks setiap halaman dalam rentang [start, stop) tepat satu kali.
+    Teks yang sama dipakai untuk ekstraksi bagian dan pemindaian gambar metodologi.
+    Gambar dikembalikan sebagai referensi SHA-256; bytes-nya hanya dikirim sekali per ref.
+    """
+    pages = []
+    blobs = {}
+    xref_refs = {}
+    with fitz.open(pdf_path, filetype="pdf") as doc:
+        for page_num in range(start, min(stop, len(doc))):
+            page = doc[page_num]
+            page_text = page.get_text()
+            images = []
+            page_text_lower = page_text.lower()
+            if "metodologi" in page_text_lower or "metode" in page_text_lower:
+                for img in page.get_images(full=True):
+                    xref = img[0]
+                    # Gambar yang dipakai ulang di banyak halaman (mis. logo) cukup diekstrak sekali
+                    if xref not in xref_refs:
+                        base_image = doc.extract_image(xref)
+                        image_bytes, mime_type = base_image["image"], f"image/{base_image['ext']}"
+                        ref = image_ref(image_bytes)
+                        blobs.setdefault(ref, (image_bytes, mime_type))
+                        xref_refs[xref] = (ref, mime_type)
+                    ref, mime_type = xref_refs[xref]
+                    images.append({"mime_type": mime_type, "ref": ref})
+            pages.append((page_text, images))
+    return pages, blobs
+
+
+def _page_ranges(page_count: int) -> list[tuple[int, int]]:
+    if page_count < INGEST_SHARD_MIN_PAGES or INGEST_MAX_WORKERS == 1:
+        return [(0, page_count)]
+    shard_size = math.ceil(page_count / INGEST_MAX_WORKERS)
+    return [(start, min(start + shard_size, page_count)) for start in range(0, page_count, shard_size)]
+
+
+async def ingest_pdf(pdf_path: str) -> dict:
+    """
+    Menjalankan seluruh parsing PDF (dari file di `pdf_path`) di process pool agar event loop tetap responsif.
+    Dokumen besar dipecah per rentang halaman lalu digabung kembali sesuai urutan halaman.
+    Mengembalikan hasil `extract_sections` ditambah 'context_blocks'.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+
+    page_count = await loop.run_in_executor(pool, _count_pages, pdf_path)
+    shards = await asyncio.gather(*(
+        loop.run_in_executor(pool, _extract_page_range, pdf_path, start, stop)
+        for start, stop in _page_ranges(page_count)
+    ))
+    pages = [page for shard_pages, _ in shards for page in shard_pages]
+    blobs = {ref: blob for _, shard_blobs in shards for ref, blob in shard_blobs.items()}
+
+    # Simpan bytes gambar unik ke image store; context_blocks hanya menyimpan referensinya
+    store = get_image_store()
+    await asyncio.gather(*(
+        asyncio.to_thread(store.save, ref, image_bytes, mime_type)
+        for ref, (image_bytes, mime_type) in blobs.items()
+    ))
+
+    full_text = "".join(page_text for page_text, _ in pages)
+    result = await loop.run_in_executor(pool, extract_sections, full_text)
+
+    context_blocks = [
+        {"type": "text", "content": f"[JUDUL]\n{result['title']}"},
+        {"type": "text", "content": f"[ABSTRAK]\n{result['abstract']}"},
+        {"type": "text", "content": f"[RUMUSAN MASALAH]\n{result['rumusan_masalah']}"},
+        {"type": "text", "content": f"[TUJUAN PENELITIAN]\n{result['tujuan_penelitian']}"},
+        {"type": "text", "content": f"[METODOLOGI]\n{result['metodologi']}"}
+    ]
+    for page_num, (_, images) in enumerate(pages):
+        for image in images:
+            context_blocks.append({"type": "image", **image, "caption": f"Gambar dari bab metodologi (Halaman {page_num + 1})"})
+
+    result["context_blocks"] = context_blocks
+    return result
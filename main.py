@@ -1,10 +1,11 @@
 import os
 import uuid
-import fitz  # PyMuPDF
 import json
-import base64
+import asyncio
 import traceback
 import io
+import base64
+from typing import Optional
 from datetime import datetime, timedelta, timezone
 
 # --- BARU: Impor dan panggil load_dotenv ---
@@ -14,19 +15,37 @@ load_dotenv() # Ini akan memuat variabel dari file .env
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, WebSocket, WebSocketDisconnect, Query
 from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from google.cloud import storage
+from sqlalchemy import select, update, tuple_, inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer, aliased
 
 # --- MODIFIKASI: Impor modul lokal ---
 import auth
 import models
 import schemas
-from database import SessionLocal, engine
-from auth import get_current_user
+import ingestion
+import image_store
+import chunked_scoring
+import compressed_text
+import uploads
+from database import AsyncSessionLocal, engine, async_engine
+from auth import get_current_user, get_async_db
+from cache import LRUCache
+from clients import registry
+from tts_cache import TTSCache
+from streaming import stream_reply_audio
+from prompt_cache import PromptPrefixCache, GeminiPrefixBackend
+from fake_providers import FakePrefixBackend
+from signed_urls import SignedUrlCache
+from session_state import get_session_state_store, close_session_state_store
+from scoring_jobs import ScoringQueue, JOB_DONE, JOB_FAILED
+from report import render_report
+import metrics
+from metrics import observe_stage
 
 # --- Impor Library AI (tetap sama) ---
 import google.generativeai as genai
-from fpdf import FPDF
+from google.generativeai.types import content_types
 from PIL import Image
 from google.cloud import texttospeech
 import soundfile as sf
@@ -34,6 +53,20 @@ import numpy as np
 
 # --- MODIFIKASI: Membuat tabel database saat startup ---
 models.Base.metadata.create_all(bind=engine)
+# create_all tidak menambahkan indeks baru ke tabel yang sudah ada; buat yang belum ada
+for table in models.Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+# ...begitu juga kolom baru; kolom nullable ditambahkan dengan ALTER TABLE
+with engine.begin() as conn:
+    for table in models.Base.metadata.sorted_tables:
+        existing_columns = {column["name"] for column in sa_inspect(conn).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns and column.nullable:
+                column_type = column.type.compile(dialect=conn.dialect)
+                quote = conn.dialect.identifier_preparer.quote
+                conn.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}")
+                print(f"Kolom {table.name}.{column.name} ditambahkan.")
 
 # --- Konfigurasi Aplikasi ---
 app = FastAPI(
@@ -42,6 +75,10 @@ app = FastAPI(
     description="Backend simulasi sempro dengan otentikasi, database, dan GCS.",
 )
 
+# --- Batas ukuran upload PDF: ditolak dari header Content-Length sebelum body dibaca ---
+# Ditambahkan sebelum CORS agar respons 413 tetap membawa header CORS.
+app.add_middleware(uploads.UploadSizeLimitMiddleware, path="/upload")
+
 # --- MODIFIKasi: Menambahkan CORS Middleware untuk frontend ---
 app.add_middleware(
     CORSMiddleware,
@@ -49,22 +86,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor halaman berikutnya /history dikirim lewat header
+    expose_headers=["X-Next-Cursor"],
 )
 
 # --- MODIFIKASI: Menggabungkan router otentikasi ---
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 
+# --- Metrik Prometheus (lihat metrics.py & readme) ---
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(async_engine.sync_engine)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        body, content_type = metrics.render_latest()
+        return Response(content=body, media_type=content_type)
+
+# --- Klien layanan eksternal dibuat sekali saat startup dan ditutup saat shutdown ---
+@app.on_event("startup")
+async def startup_clients():
+    await registry.startup()
+    await scoring_queue.start()
+    # Siapkan audio frasa tetap dosen di latar belakang agar startup tidak tertahan
+    _spawn_background(warm_fixed_phrase_audio())
+    # context_data lama (JSON mentah) dikompresi bertahap; selama itu tetap terbaca apa adanya
+    _spawn_background(compressed_text.run_migration(AsyncSessionLocal, models.SimulationSession.__table__.c.context_data))
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    for task in list(_background_tasks):
+        task.cancel()
+    await scoring_queue.stop()
+    ingestion.shutdown_pool()
+    await registry.shutdown()
+    await close_session_state_store()
+    await async_engine.dispose()
+
+# Referensi task latar belakang disimpan agar tidak dibersihkan garbage collector
+_background_tasks: set[asyncio.Task] = set()
+
+def _spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
 # --- Konfigurasi Kunci API & GCS dari Environment Variable ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
-else:
+elif not registry.fake:
     print("PERINGATAN: Kunci API 'GEMINI_API_KEY' tidak ditemukan.")
+# Provider tiruan (PROVIDER_BACKEND=fake) tidak membutuhkan kunci API
+GEMINI_ENABLED = bool(GEMINI_API_KEY) or registry.fake
 
 GCS_BUCKET_NAME = os.getenv("GCS_BUCKET_NAME")
 if not GCS_BUCKET_NAME:
     print("PERINGATAN: 'GCS_BUCKET_NAME' tidak ditemukan. Upload laporan akan gagal.")
 
+# Signed URL laporan dipakai bersama oleh /score dan /history
+signed_url_cache = SignedUrlCache(GCS_BUCKET_NAME)
+
 # --- PERBAIKAN FINAL: Menggunakan nama model suara Chirp HD yang benar ---
 # Format yang benar adalah 'id-ID-Chirp3-HD-<NamaPersona>'
 GOOGLE_TTS_VOICES = {
@@ -74,17 +157,16 @@ GOOGLE_TTS_VOICES = {
     "Wanita - Aoede (Chirp HD)": "id-ID-Chirp3-HD-Aoede",
 }
 
-# --- MODIFIKASI: Dependensi untuk mendapatkan sesi database ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 DEMO_RESPONSES = { "latar belakang": "Tentu, bisa Anda jelaskan lebih detail mengenai latar belakang masalah yang Anda angkat?", "metode": "Menarik. Coba uraikan metodologi penelitian yang akan Anda gunakan.", "kebaruan": "Apa aspek kebaruan atau orisinalitas utama dari penelitian yang Anda usulkan ini?"}
 DEFAULT_DEMO_RESPONSE = "Itu poin yang menarik. Bisa tolong dielaborasi lebih lanjut?"
 
+# Durasi satu sesi simulasi; state percakapan kedaluwarsa di akhir jendela ini
+SESSION_DURATION = timedelta(minutes=30)
+GREETING_TEXT = "Selamat datang di simulasi seminar proposal. Silakan mulai presentasi Anda kapan pun Anda siap."
+SESSION_ENDING_TEXT = "Baik, waktu sesi Anda hampir habis. Sesi ini akan segera berakhir."
+# Frasa tetap dosen: audionya disintesis sekali per suara lalu disajikan dari cache
+FIXED_PHRASES = [GREETING_TEXT, SESSION_ENDING_TEXT, *DEMO_RESPONSES.values(), DEFAULT_DEMO_RESPONSE]
+
 def get_demo_reply(transcript: str) -> str:
     """Memberikan jawaban berbasis skrip untuk Mode Demo."""
     lower_transcript = transcript.lower()
@@ -92,14 +174,72 @@ def get_demo_reply(transcript: str) -> str:
         if keyword in lower_transcript: return response
     return DEFAULT_DEMO_RESPONSE
 
-# --- PERBAIKAN KUNCI #2: Fungsi LLM Diperbarui ---
-# Fungsi ini sekarang menerima 'chat_history' untuk memberikan konteks percakapan.
-async def get_llm_reply(context_blocks: list, chat_history: list) -> str:
-    if not GEMINI_API_KEY: return "Kunci API Gemini belum dikonfigurasi."
+# --- Cache konteks proposal yang sudah disiapkan untuk Gemini (dipakai bersama semua koneksi) ---
+CONTEXT_CACHE_MAX_MB = int(os.getenv("CONTEXT_CACHE_MAX_MB", 256))
+# Format gambar yang dikirim apa adanya ke Gemini; format lain dikonversi sekali oleh SDK.
+GEMINI_INLINE_IMAGE_TYPES = {"image/png", "image/jpeg", "image/webp"}
+
+def _context_parts_size(parts: list) -> int:
+    size = 0
+    seen = set()
+    for part in parts:
+        if isinstance(part, str):
+            size += len(part.encode("utf-8"))
+        elif id(part) not in seen:
+            # Gambar yang sama di banyak halaman memakai objek part yang sama
+            seen.add(id(part))
+            size += len(part.inline_data.data)
+    return size
+
+prepared_context_cache = LRUCache(
+    max_bytes=CONTEXT_CACHE_MAX_MB * 1024 * 1024,
+    sizeof=_context_parts_size,
+    name="prepared_context",
+)
+
+def _prepare_image_part(image_bytes: bytes, mime_type: str):
+    img = Image.open(io.BytesIO(image_bytes))  # Validasi header gambar
+    if mime_type in GEMINI_INLINE_IMAGE_TYPES:
+        return genai.protos.Part(inline_data=genai.protos.Blob(mime_type=mime_type, data=image_bytes))
+    return content_types.to_part(img)
 
-    # --- PERBAIKAN KUNCI #1: System Prompt yang Lebih Cerdas & Kontekstual ---
-    # Prompt ini diubah untuk mendorong dialog, bukan interogasi.
-    system_prompt = """
+def build_context_parts(context_blocks: list) -> list:
+    """Membangun 'parts' Gemini (teks & gambar) dari blok konteks PDF. Berisi I/O, jalankan di thread."""
+    initial_parts = ["Berikut adalah konteks dari proposal skripsi mahasiswa untuk menjadi dasar diskusi:"]
+    image_parts = {}
+    for block in context_blocks:
+        if block["type"] == "text":
+            initial_parts.append(block["content"])
+        elif block["type"] == "image":
+            if block.get("caption"):
+                initial_parts.append(f"\nBerikut adalah gambar dengan keterangan: {block['caption']}")
+            try:
+                ref = block.get("ref")
+                if ref is None or ref not in image_parts:
+                    image_bytes = image_store.load_image_bytes(block)
+                    part = _prepare_image_part(image_bytes, block.get("mime_type"))
+                    if ref is not None: image_parts[ref] = part
+                else:
+                    part = image_parts[ref]
+                initial_parts.append(part)
+            except Exception as e:
+                print(f"Warning: Gagal memproses gambar untuk LLM. {e}")
+    return initial_parts
+
+async def get_prepared_context(session_id: str, context_data: str) -> list:
+    """Mengambil 'parts' konteks sesi dari cache, atau membangunnya sekali jika belum ada."""
+    initial_parts = prepared_context_cache.get(session_id)
+    if initial_parts is None:
+        initial_parts = await asyncio.to_thread(lambda: build_context_parts(json.loads(context_data)))
+        prepared_context_cache.put(session_id, initial_parts)
+    return initial_parts
+
+# --- Prefix prompt per sesi diunggah sekali ke context cache Gemini ---
+prompt_prefix_cache = PromptPrefixCache(FakePrefixBackend() if registry.fake else GeminiPrefixBackend())
+
+# --- PERBAIKAN KUNCI #1: System Prompt yang Lebih Cerdas & Kontekstual ---
+# Prompt ini diubah untuk mendorong dialog, bukan interogasi.
+DOSEN_SYSTEM_PROMPT = """
     Anda adalah AI Dosen Penguji bernama 'Mentora'. Peran Anda adalah sebagai mitra diskusi yang kritis namun suportif. Tujuan Anda bukan hanya menguji, tetapi membantu mahasiswa mengeksplorasi dan memperkuat argumen penelitiannya. Ciptakan alur diskusi yang alami dan dua arah.
 
     **Prinsip Utama: Pola "Dengar, Akui, Tanya"**
@@ -121,46 +261,72 @@ async def get_llm_reply(context_blocks: list, chat_history: list) -> str:
     -   **Output Wajib Teks Murni:** Jangan pernah gunakan Markdown (*, #, dll.). Ini penting untuk kompatibilitas Text-to-Speech (TTS).
     """
 
+LLM_ERROR_REPLY = "Maaf, terjadi gangguan pada sistem AI saya. Bisa tolong ulangi?"
+
+async def _build_llm_request(session_id: str, context_data: str, chat_history: list):
+    """Menyiapkan model dan 'contents' API untuk satu giliran dosen."""
     # --- PERBAIKAN: Memformat ulang 'contents' agar sesuai dengan struktur yang diharapkan API ---
-    # 1. Bangun daftar 'parts' (teks & gambar) dari konteks awal PDF.
-    initial_parts = ["Berikut adalah konteks dari proposal skripsi mahasiswa untuk menjadi dasar diskusi:"]
-    for block in context_blocks:
-        if block["type"] == "text":
-            initial_parts.append(block["content"])
-        elif block["type"] == "image":
-            if block.get("caption"):
-                initial_parts.append(f"\nBerikut adalah gambar dengan keterangan: {block['caption']}")
-            try:
-                image_bytes = base64.b64decode(block["data"])
-                img = Image.open(io.BytesIO(image_bytes))
-                initial_parts.append(img)
-            except Exception as e:
-                print(f"Warning: Gagal memproses gambar untuk LLM. {e}")
+    # 1. Ambil daftar 'parts' (teks & gambar) dari konteks awal PDF yang sudah disiapkan.
+    initial_parts = await get_prepared_context(session_id, context_data)
 
-    # 2. Buat daftar 'contents' API yang terstruktur dengan benar.
+    # 2. Jika prefix sesi (system prompt + konteks PDF) sudah tersimpan di context cache Gemini,
+    #    cukup kirim riwayat percakapan. Sesi yang terlalu kecil tetap memakai jalur lengkap.
+    prefix_handle = await prompt_prefix_cache.get(session_id, DOSEN_SYSTEM_PROMPT, initial_parts)
+    if prefix_handle is not None:
+        return prompt_prefix_cache.model(prefix_handle), list(chat_history)
+
+    # 3. Buat daftar 'contents' API yang terstruktur dengan benar.
     #    Turn pertama berisi semua konteks PDF, dianggap sebagai pesan dari 'user'.
     api_contents = [
         {"role": "user", "parts": initial_parts}
     ]
     #    Tambahkan sisa riwayat percakapan.
     api_contents.extend(chat_history)
+    # Menggunakan model yang konsisten dengan kode awal Anda
+    model = registry.generative_model('gemini-2.0-flash', system_instruction=DOSEN_SYSTEM_PROMPT)
+    return model, api_contents
+
+# --- PERBAIKAN KUNCI #2: Fungsi LLM Diperbarui ---
+# Fungsi ini sekarang menerima 'chat_history' untuk memberikan konteks percakapan.
+# Konteks PDF diambil dari cache per sesi, sehingga tidak dibangun ulang di setiap giliran.
+async def get_llm_reply(session_id: str, context_data: str, chat_history: list) -> str:
+    if not GEMINI_ENABLED: return "Kunci API Gemini belum dikonfigurasi."
 
     try:
-        # Menggunakan model yang konsisten dengan kode awal Anda
-        model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=system_prompt)
-        # Kirim 'api_contents' yang sudah terstruktur dengan benar.
-        response = await model.generate_content_async(api_contents)
-        return response.text
+        with observe_stage("llm_reply"):
+            model, api_contents = await _build_llm_request(session_id, context_data, chat_history)
+            # Kirim 'api_contents' yang sudah terstruktur dengan benar.
+            response = await model.generate_content_async(api_contents)
+            return response.text
     except Exception as e:
         print(f"Error saat memanggil Gemini API: {e}")
         traceback.print_exc()
-        return "Maaf, terjadi gangguan pada sistem AI saya. Bisa tolong ulangi?"
+        return LLM_ERROR_REPLY
 
-async def get_llm_score_and_feedback(full_transcript_str: str) -> dict:
-    # Fungsi ini tidak perlu diubah secara signifikan
-    if not GEMINI_API_KEY: return None
-    
-    system_prompt = """
+async def stream_llm_reply(session_id: str, context_data: str, chat_history: list):
+    """Versi streaming dari `get_llm_reply`: menghasilkan potongan teks begitu diterima dari Gemini."""
+    if not GEMINI_ENABLED:
+        yield "Kunci API Gemini belum dikonfigurasi."
+        return
+
+    received_text = False
+    try:
+        with observe_stage("llm_reply_stream"):
+            model, api_contents = await _build_llm_request(session_id, context_data, chat_history)
+            response = await model.generate_content_async(api_contents, stream=True)
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    received_text = True
+                    yield text
+    except Exception as e:
+        print(f"Error saat streaming dari Gemini API: {e}")
+        traceback.print_exc()
+        # Jika belum ada teks yang terkirim, beri tahu mahasiswa seperti pada mode non-streaming
+        if not received_text:
+            yield LLM_ERROR_REPLY
+
+SCORING_SYSTEM_PROMPT = """
     Anda adalah Dosen Penilai AI yang sangat kritis, tegas, namun adil. Tugas Anda adalah menganalisis transkrip jawaban mahasiswa secara dingin dan objektif, tanpa ada belas kasihan. Berikan penilaian kuantitatif dan kualitatif yang mencerminkan kualitas jawaban apa adanya berdasarkan rubrik yang ketat.
 
 **Rubrik Penilaian (Terapkan dengan Tegas):**
@@ -186,37 +352,85 @@ async def get_llm_score_and_feedback(full_transcript_str: str) -> dict:
     "feedback": "<umpan balik yang kritis, objektif, dan memberi solusi konkret>"
 }
 """
-    user_prompt = f"Analisislah HANYA bagian dari 'user' dari transkrip ini:\n--- TRANSKRIP ---\n{full_transcript_str}\n--- AKHIR TRANSKRIP ---\n\nBerikan skor dan umpan balik dalam format JSON."
-    
+
+SCORING_SYNTHESIS_PROMPT = """
+Anda adalah Dosen Penilai AI yang sangat kritis, tegas, namun adil. Sebuah transkrip sesi yang panjang telah dinilai per bagian. Tugas Anda adalah menyusun SATU umpan balik akhir untuk seluruh sesi dari umpan balik per bagian dan skor akhir yang sudah ditetapkan.
+
+**Aturan:**
+- Jangan mengubah atau menghitung ulang skor; skor hanya menjadi konteks.
+- Gabungkan kelemahan yang berulang, hilangkan duplikasi, dan urutkan dari yang paling penting.
+- Pertahankan prinsip umpan balik: tanpa pujian kosong, kelemahan spesifik, dan solusi atau contoh jawaban ideal.
+- Jangan menyebut "bagian" atau "potongan" transkrip; tulis seolah-olah Anda menilai seluruh sesi sekaligus.
+
+**Aturan Format Output:**
+- HANYA berikan respons dalam format JSON yang valid: {"feedback": "<umpan balik akhir>"}
+"""
+
+async def _generate_scoring_json(system_prompt: str, user_prompt: str) -> dict:
+    # Menggunakan model yang konsisten dengan kode awal Anda
+    model = registry.generative_model('gemini-2.0-flash', system_instruction=system_prompt)
+    config_gen = genai.types.GenerationConfig(response_mime_type="application/json")
+    response = await model.generate_content_async([user_prompt], generation_config=config_gen)
+    return json.loads(response.text)
+
+async def score_transcript_chunk(chunk: str, number: int, total: int) -> dict:
+    user_prompt = f"Transkrip sesi ini panjang dan dinilai per bagian. Ini adalah bagian {number} dari {total}. Analisislah HANYA bagian dari 'user' pada bagian ini:\n--- TRANSKRIP (BAGIAN {number}/{total}) ---\n{chunk}\n--- AKHIR BAGIAN ---\n\nBerikan skor dan umpan balik untuk bagian ini dalam format JSON."
+    return await _generate_scoring_json(SCORING_SYSTEM_PROMPT, user_prompt)
+
+async def synthesize_score_feedback(scores: dict, chunk_feedback: list[str]) -> str:
+    feedback_list = "\n\n".join(f"[Bagian {i}]\n{feedback}" for i, feedback in enumerate(chunk_feedback, 1))
+    user_prompt = f"Skor akhir: relevance {scores['relevance']}, clarity {scores['clarity']}, mastery {scores['mastery']}.\n--- UMPAN BALIK PER BAGIAN ---\n{feedback_list}\n--- AKHIR UMPAN BALIK ---\n\nSusun umpan balik akhir dalam format JSON."
+    return (await _generate_scoring_json(SCORING_SYNTHESIS_PROMPT, user_prompt)).get("feedback")
+
+async def get_llm_score_and_feedback(full_transcript_str: str) -> dict:
+    if not GEMINI_ENABLED: return None
+
     try:
-        # Menggunakan model yang konsisten dengan kode awal Anda
-        model = genai.GenerativeModel('gemini-2.0-flash', system_instruction=system_prompt)
-        config_gen = genai.types.GenerationConfig(response_mime_type="application/json")
-        response = await model.generate_content_async([user_prompt], generation_config=config_gen)
-        return json.loads(response.text)
+        with observe_stage("llm_score"):
+            # Transkrip panjang dinilai per potongan secara paralel lalu digabung (lihat chunked_scoring.py)
+            if chunked_scoring.estimate_tokens(full_transcript_str) > chunked_scoring.SCORING_CHUNK_THRESHOLD_TOKENS:
+                return await chunked_scoring.score_in_chunks(full_transcript_str, score_transcript_chunk, synthesize_score_feedback)
+
+            user_prompt = f"Analisislah HANYA bagian dari 'user' dari transkrip ini:\n--- TRANSKRIP ---\n{full_transcript_str}\n--- AKHIR TRANSKRIP ---\n\nBerikan skor dan umpan balik dalam format JSON."
+            return await _generate_scoring_json(SCORING_SYSTEM_PROMPT, user_prompt)
     except Exception as e:
         print(f"Error saat memanggil Gemini API untuk penilaian: {e}")
         return None
 
-async def synthesize_audio(text: str, speaker_id: str = "id-ID-Chirp3-HD-Achird") -> bytes:
+# --- Format audio yang bisa diminta klien lewat query ?audio_format= ---
+# Format terkompresi langsung dihasilkan encoder Google TTS, tanpa encode ulang di server.
+AUDIO_FORMATS = {
+    "wav": texttospeech.AudioEncoding.LINEAR16,
+    "ogg_opus": texttospeech.AudioEncoding.OGG_OPUS,
+    "mp3": texttospeech.AudioEncoding.MP3,
+}
+DEFAULT_AUDIO_FORMAT = "wav"
+TTS_SAMPLE_RATE = 24000
+
+async def synthesize_audio(text: str, speaker_id: str = "id-ID-Chirp3-HD-Achird", audio_format: str = DEFAULT_AUDIO_FORMAT) -> bytes:
     """
     Mensintesis teks menjadi audio menggunakan Google Cloud Text-to-Speech API.
     Kredensial diambil secara otomatis dari environment variable GOOGLE_APPLICATION_CREDENTIALS.
+    `audio_format`: 'wav' (PCM 16-bit), 'ogg_opus', atau 'mp3'.
     """
     try:
-        client = texttospeech.TextToSpeechAsyncClient()
+        client = registry.tts_client()
         synthesis_input = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(language_code="id-ID", name=speaker_id)
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-            sample_rate_hertz=24000
-        )
-        response = await client.synthesize_speech(
-            input=synthesis_input, voice=voice, audio_config=audio_config
+            audio_encoding=AUDIO_FORMATS[audio_format],
+            sample_rate_hertz=TTS_SAMPLE_RATE
         )
+        with observe_stage("tts"):
+            response = await client.synthesize_speech(
+                input=synthesis_input, voice=voice, audio_config=audio_config
+            )
+        # Google TTS sudah menyertakan header WAV untuk LINEAR16; bungkus ulang hanya jika tidak ada
+        if audio_format != "wav" or response.audio_content[:4] == b"RIFF":
+            return response.audio_content
         buffer = io.BytesIO()
         audio_array = np.frombuffer(response.audio_content, dtype=np.int16)
-        sf.write(buffer, audio_array, 24000, format='WAV', subtype='PCM_16')
+        sf.write(buffer, audio_array, TTS_SAMPLE_RATE, format='WAV', subtype='PCM_16')
         buffer.seek(0)
         return buffer.read()
     except Exception as e:
@@ -224,115 +438,51 @@ async def synthesize_audio(text: str, speaker_id: str = "id-ID-Chirp3-HD-Achird"
         traceback.print_exc()
         return b""
 
-def extract_title(full_text: str) -> str:
-    try:
-        end_pos = full_text.upper().find("ABSTRAK")
-        search_block = full_text[:end_pos] if end_pos != -1 else full_text[:2500]
-    except Exception:
-        search_block = full_text[:2500]
-    lines = [line.strip() for line in search_block.strip().split('\n') if line.strip()]
-    longest_line = ""; best_candidate = ""
-    for line in lines:
-        if len(line) < 10 or any(keyword in line.upper() for keyword in ["SKRIPSI", "TESIS", "TUGAS AKHIR", "UNIVERSITAS"]):
-            continue
-        if len(line) > len(longest_line): longest_line = line
-        if line.isupper() and len(line) > len(best_candidate): best_candidate = line
-    final_title = best_candidate if best_candidate else longest_line
-    return final_title if final_title else "Judul tidak ditemukan"
-
-def extract_section(full_text: str, start_keys: list[str], end_keys: list[str]) -> str:
-    text_upper = full_text.upper()
-    search_offset = 0
-
-    while True:
-        potential_start_index = -1
-        found_key = None
-        
-        for key in start_keys:
-            pos = text_upper.find(key.upper(), search_offset)
-            if pos != -1 and (potential_start_index == -1 or pos < potential_start_index):
-                potential_start_index = pos
-                found_key = key
-
-        if potential_start_index == -1:
-            return "" 
-
-        line_end_pos = text_upper.find('\n', potential_start_index)
-        if line_end_pos == -1: line_end_pos = len(text_upper)
-        
-        line_snippet = full_text[potential_start_index:line_end_pos]
-
-        if '...' in line_snippet or line_snippet.count('.') > 10:
-            search_offset = line_end_pos
-            continue 
-
-        start_index = potential_start_index
-        break
+# --- Cache audio untuk frasa tetap dosen (memori + disk) ---
+tts_cache = TTSCache()
+# Format yang disiapkan saat startup (default: semua format yang didukung)
+TTS_WARMUP_FORMATS = [f.strip() for f in os.getenv("TTS_WARMUP_FORMATS", ",".join(AUDIO_FORMATS)).split(",") if f.strip() in AUDIO_FORMATS]
+_fixed_phrase_set = set(FIXED_PHRASES)
 
-    end_index = len(full_text)
-    search_area = text_upper[start_index + len(found_key):]
-    
-    for end_key in end_keys:
-        pos = search_area.find(end_key.upper())
-        if pos != -1:
-            line_start_pos = search_area.rfind('\n', 0, pos)
-            if line_start_pos == -1: line_start_pos = 0
-            
-            line_of_end_key = search_area[line_start_pos:pos + len(end_key)]
-            if any(char.isdigit() for char in line_of_end_key) or len(line_of_end_key.split()) < 5:
-                end_index = start_index + len(found_key) + line_start_pos
-                break
-
-    return full_text[start_index:end_index].strip()
-
-
-def create_and_upload_report(session_id: str, user_id: int, results_data: dict) -> str:
-    """Membuat laporan PDF, mengunggahnya ke GCS, dan mengembalikan path GCS."""
-    pdf = FPDF()
-    pdf.add_page()
+async def warm_fixed_phrase_audio():
     try:
-        # PENTING: Pastikan folder 'assets' ada di root proyek Anda dengan font di dalamnya
-        font_path = "assets"
-        pdf.add_font('DejaVu', '', os.path.join(font_path, "DejaVuSans.ttf"), uni=True)
-        pdf.add_font('DejaVu', 'B', os.path.join(font_path, "DejaVuSans-Bold.ttf"), uni=True)
-        pdf.set_font('DejaVu', 'B', 18)
-    except RuntimeError:
-        print("PERINGATAN: Font DejaVu tidak ditemukan. Menggunakan Arial (mungkin ada masalah karakter).")
-        pdf.set_font('Arial', 'B', 18)
-    
-    pdf.cell(0, 10, "Laporan Hasil Simulasi Seminar Proposal", ln=True, align='C')
-    pdf.set_font('DejaVu', '', 10); pdf.cell(0, 8, f"ID Sesi: {session_id}", ln=True, align='C')
-    pdf.cell(0, 8, f"Tanggal: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True, align='C'); pdf.ln(10)
-    pdf.set_font('DejaVu', 'B', 14); pdf.cell(0, 10, f"SKOR AKHIR: {results_data.get('final_score', 'N/A')} / 100", ln=True)
-    pdf.line(pdf.get_x(), pdf.get_y(), pdf.get_x() + 190, pdf.get_y()); pdf.ln(5)
-    pdf.set_font('DejaVu', 'B', 12); pdf.cell(0, 10, "Umpan Balik dari AI Penilai:", ln=True)
-    
-    pdf.set_font('DejaVu', '', 11); pdf.multi_cell(0, 5, results_data.get('feedback', 'Tidak ada umpan balik.'))
-    pdf.ln(5)
-    
-    pdf.set_font('DejaVu', 'B', 12); pdf.cell(0, 10, "Rincian Penilaian:", ln=True)
-    pdf.set_font('DejaVu', '', 11)
-    bd = results_data.get('breakdown', {})
-    pdf.cell(0, 6, f"- Relevansi Jawaban: {bd.get('relevance', 'N/A')} / 100", ln=True)
-    pdf.cell(0, 6, f"- Kejelasan Penyampaian: {bd.get('clarity', 'N/A')} / 100", ln=True)
-    pdf.cell(0, 6, f"- Penguasaan Materi: {bd.get('mastery', 'N/A')} / 100", ln=True); pdf.ln(10)
-    pdf.set_font('DejaVu', 'B', 14); pdf.cell(0, 10, "Transkrip Lengkap", ln=True)
-    pdf.line(pdf.get_x(), pdf.get_y(), pdf.get_x() + 190, pdf.get_y()); pdf.ln(5)
-
-    pdf.set_font('DejaVu', '', 10); pdf.multi_cell(0, 5, results_data.get('transcript', 'Transkrip tidak tersedia.'))
-    
-    # --- PERBAIKAN: Konversi eksplisit dari bytearray ke bytes untuk kompatibilitas GCS ---
-    pdf_bytes = bytes(pdf.output())
+        registry.tts_client()
+    except Exception as e:
+        print(f"PERINGATAN: Pemanasan cache audio dilewati, klien TTS tidak tersedia: {e}")
+        return
+    await tts_cache.warm(FIXED_PHRASES, GOOGLE_TTS_VOICES.values(), TTS_WARMUP_FORMATS, synthesize_audio)
+
+async def get_reply_audio(text: str, voice_name: str, mode: str = "simulasi", audio_format: str = DEFAULT_AUDIO_FORMAT) -> bytes:
+    """
+    Audio balasan dosen. Frasa tetap diambil dari cache; mode demo tidak pernah menunggu
+    Google TTS (jika cache belum terisi, teks dikirim tanpa audio dan cache diisi di latar belakang).
+    """
+    if text not in _fixed_phrase_set:
+        return await synthesize_audio(text, speaker_id=voice_name, audio_format=audio_format)
+    if mode == "demo":
+        audio = await tts_cache.get(text, voice_name, audio_format)
+        if audio is None:
+            _spawn_background(tts_cache.get_or_synthesize(text, voice_name, audio_format, synthesize_audio))
+        return audio or b""
+    return await tts_cache.get_or_synthesize(text, voice_name, audio_format, synthesize_audio)
+
+def create_and_upload_report(session_id: str, user_id: int, job_id: str, results_data: dict) -> str:
+    """
+    Membuat laporan PDF, mengunggahnya ke GCS, dan mengembalikan path GCS. Object diberi nama per
+    job penilaian, sehingga penilaian ulang sesi yang sama tidak menimpa laporan job sebelumnya.
+    """
+    with observe_stage("report_render"):
+        pdf_bytes = render_report(session_id, results_data)
 
     if not GCS_BUCKET_NAME:
         raise Exception("Nama bucket GCS tidak dikonfigurasi.")
 
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        gcs_path = f"user_{user_id}/report_{session_id}.pdf"
+        bucket = registry.bucket(GCS_BUCKET_NAME)
+        gcs_path = f"user_{user_id}/report_{session_id}_{job_id}.pdf"
         blob = bucket.blob(gcs_path)
-        blob.upload_from_string(pdf_bytes, content_type='application/pdf')
+        with observe_stage("report_upload"):
+            blob.upload_from_string(pdf_bytes, content_type='application/pdf')
         print(f"Laporan berhasil diunggah ke: gs://{GCS_BUCKET_NAME}/{gcs_path}")
         return gcs_path
     except Exception as e:
@@ -345,42 +495,29 @@ def create_and_upload_report(session_id: str, user_id: int, results_data: dict)
 @app.post("/upload", response_model=schemas.UploadResponse)
 async def handle_file_upload(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Format file tidak didukung.")
     
-    doc = None
+    pdf_path = None
     try:
-        file_bytes = await file.read()
-        doc = fitz.open(stream=file_bytes, filetype="pdf")
-        full_text = "".join(page.get_text() for page in doc)
-
-        title = extract_title(full_text)
-        abstract = extract_section(full_text, ["ABSTRAK", "ABSTRACT"], ["KATA KUNCI", "PENDAHULUAN", "BAB I", "I. PENDAHULUAN"])
-        rumusan_masalah = extract_section(full_text, ["RUMUSAN MASALAH"], ["TUJUAN PENELITIAN", "BATASAN MASALAH"])
-        tujuan_penelitian = extract_section(full_text, ["TUJUAN PENELITIAN"], ["MANFAAT PENELITIAN", "BATASAN MASALAH", "BAB II"])
-        metodologi_text = extract_section(full_text, ["METODOLOGI PENELITIAN","METODE PENELITIAN", "BAB III", "III. METODE"], ["HASIL DAN PEMBAHASAN", "BAB IV"])
+        # PDF disalin per potongan ke file sementara (bukan dibaca utuh ke memori), lalu
+        # worker ingestion membukanya dari path tersebut
+        pdf_path = await asyncio.to_thread(uploads.spool_pdf_upload, file.file)
+        # Parsing PDF dijalankan di process pool agar tidak memblokir sesi WebSocket lain
+        with observe_stage("pdf_ingest"):
+            extracted = await ingestion.ingest_pdf(pdf_path)
+        title = extracted["title"]
+        abstract = extracted["abstract"]
+        rumusan_masalah = extracted["rumusan_masalah"]
+        tujuan_penelitian = extracted["tujuan_penelitian"]
+        metodologi_text = extracted["metodologi"]
 
         if not abstract and not metodologi_text: raise HTTPException(status_code=422, detail="Gagal mengekstrak konten utama.")
         
-        context_blocks = [
-            {"type": "text", "content": f"[JUDUL]\n{title}"},
-            {"type": "text", "content": f"[ABSTRAK]\n{abstract}"},
-            {"type": "text", "content": f"[RUMUSAN MASALAH]\n{rumusan_masalah}"},
-            {"type": "text", "content": f"[TUJUAN PENELITIAN]\n{tujuan_penelitian}"},
-            {"type": "text", "content": f"[METODOLOGI]\n{metodologi_text}"}
-        ]
-        
-        for page_num, page in enumerate(doc):
-            page_text_lower = page.get_text("text").lower()
-            if "metodologi" in page_text_lower or "metode" in page_text_lower:
-                for img in page.get_images(full=True):
-                    xref = img[0]; base_image = doc.extract_image(xref)
-                    image_bytes, image_ext = base_image["image"], base_image["ext"]
-                    b64_img = base64.b64encode(image_bytes).decode('utf-8')
-                    context_blocks.append({"type": "image", "mime_type": f"image/{image_ext}", "data": b64_img, "caption": f"Gambar dari bab metodologi (Halaman {page_num + 1})"})
+        context_blocks = extracted["context_blocks"]
         
         session_id = str(uuid.uuid4())
         db_session = models.SimulationSession(
@@ -391,8 +528,7 @@ async def handle_file_upload(
             filename=file.filename,
         )
         db.add(db_session)
-        db.commit()
-        db.refresh(db_session)
+        await db.commit()
         
         return schemas.UploadResponse(
             status="success",
@@ -404,127 +540,204 @@ async def handle_file_upload(
             tujuan_penelitian=tujuan_penelitian,
             metodologi=metodologi_text[:1000] + "..."
         )
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Terjadi kesalahan internal: {e}")
     finally:
-        if doc: doc.close()
-
-@app.post("/score", response_model=schemas.ScoreResponse)
-async def handle_scoring(
-    request: schemas.ScoreRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
-):
-    db_session = db.query(models.SimulationSession).filter(
-        models.SimulationSession.id == request.session_id,
-        models.SimulationSession.user_id == current_user.id
-    ).first()
+        if pdf_path:
+            os.remove(pdf_path)
 
-    if not db_session:
-        raise HTTPException(status_code=404, detail="Sesi tidak ditemukan atau bukan milik Anda.")
-
-    # --- FIX: Mengakses data dari Pydantic model menggunakan dot notation (objek), bukan dict ---
-    transcript_str = "\n".join([f"{entry.speaker}: {entry.text}" for entry in request.full_transcript])
-    score_data = await get_llm_score_and_feedback(transcript_str)
-    
+async def run_scoring_job(job: models.ScoringJob, set_stage) -> dict:
+    """Dijalankan worker antrian penilaian: penilaian Gemini, laporan PDF ke GCS, lalu simpan hasil ke sesi."""
+    await set_stage("scoring")
+    score_data = await get_llm_score_and_feedback(job.transcript)
     if not score_data:
-        raise HTTPException(status_code=500, detail="Gagal mendapatkan penilaian dari AI.")
+        raise Exception("Gagal mendapatkan penilaian dari AI.")
 
     final_score = round((score_data.get('relevance', 0) + score_data.get('clarity', 0) + score_data.get('mastery', 0)) / 3, 2)
     results_to_store = {
         "final_score": final_score, 
         "feedback": score_data.get('feedback', ''), 
         "breakdown": score_data, 
-        "transcript": transcript_str
+        "transcript": job.transcript
     }
-    
-    gcs_path = None
-    download_url = None
 
-    try:
-        gcs_path = create_and_upload_report(
-            session_id=request.session_id,
-            user_id=current_user.id,
-            results_data=results_to_store
-        )
-        db_session.final_score = final_score
-        db_session.feedback = score_data.get('feedback', '')
-        db_session.pdf_gcs_path = gcs_path
-        db_session.is_completed = True
-        db.commit()
+    # Pembuatan PDF (CPU) & upload GCS (I/O blocking) dijalankan di thread agar event loop tetap bebas
+    await set_stage("rendering_report")
+    gcs_path = await asyncio.to_thread(
+        create_and_upload_report,
+        session_id=job.session_id,
+        user_id=job.user_id,
+        job_id=job.id,
+        results_data=results_to_store
+    )
 
-        if gcs_path and GCS_BUCKET_NAME:
-            try:
-                storage_client = storage.Client()
-                bucket = storage_client.bucket(GCS_BUCKET_NAME)
-                blob = bucket.blob(gcs_path)
-                download_url = blob.generate_signed_url(expiration=timedelta(hours=1))
-            except Exception as e:
-                print(f"Gagal membuat signed URL setelah upload: {e}")
+    await set_stage("saving")
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.SimulationSession).where(
+            models.SimulationSession.id == job.session_id
+        ).values(
+            final_score=final_score,
+            feedback=score_data.get('feedback', ''),
+            pdf_gcs_path=gcs_path,
+            is_completed=True,
+        ))
+        await db.commit()
+
+    # Sesi sudah selesai: konteks & prefix Gemini-nya tidak dibutuhkan lagi
+    prepared_context_cache.pop(job.session_id)
+    await prompt_prefix_cache.release(job.session_id)
+
+    return {"final_score": final_score, "feedback": score_data.get('feedback', ''), "breakdown": score_data, "gcs_path": gcs_path}
+
+scoring_queue = ScoringQueue(run_scoring_job)
+
+async def build_score_job_status(job: models.ScoringJob) -> schemas.ScoreJobStatus:
+    result = None
+    if job.status == JOB_DONE and job.result:
+        data = json.loads(job.result)
+        # Laporan milik job ini, bukan laporan terakhir sesi (bisa berasal dari transkrip lain)
+        gcs_path = data.get("gcs_path")
+        if gcs_path is None:
+            # Hasil job lama belum menyimpan path laporan
+            async with AsyncSessionLocal() as db:
+                gcs_path = (await db.execute(select(models.SimulationSession.pdf_gcs_path).where(
+                    models.SimulationSession.id == job.session_id
+                ))).scalar()
+        result = schemas.ScoreResponse(
+            status="success",
+            final_score=data["final_score"],
+            feedback=data["feedback"],
+            breakdown=schemas.ScoreBreakdown(**data["breakdown"]),
+            # Signed URL dibuat saat diminta (dari cache), bukan disimpan bersama hasil job
+            download_url=await signed_url_cache.get(gcs_path),
+        )
+    return schemas.ScoreJobStatus(
+        job_id=job.id,
+        session_id=job.session_id,
+        status=job.status,
+        stage=job.stage,
+        attempts=job.attempts,
+        result=result,
+        error=job.error if job.status == JOB_FAILED else None,
+    )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Gagal menyimpan laporan: {e}")
+@app.post("/score", response_model=schemas.ScoreJobStatus, status_code=202)
+async def handle_scoring(
+    request: schemas.ScoreRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Mengantrikan penilaian sesi dan langsung mengembalikan job_id; pantau lewat GET /score/{job_id}."""
+    result = await db.execute(select(models.SimulationSession.id).where(
+        models.SimulationSession.id == request.session_id,
+        models.SimulationSession.user_id == current_user.id
+    ))
+    if result.scalar() is None:
+        raise HTTPException(status_code=404, detail="Sesi tidak ditemukan atau bukan milik Anda.")
 
-    breakdown_model = schemas.ScoreBreakdown(**score_data)
-    
-    return schemas.ScoreResponse(
-        status="success", 
-        final_score=final_score, 
-        feedback=score_data.get('feedback', ''), 
-        breakdown=breakdown_model,
-        download_url=download_url
-    )
+    # --- FIX: Mengakses data dari Pydantic model menggunakan dot notation (objek), bukan dict ---
+    transcript_str = "\n".join([f"{entry.speaker}: {entry.text}" for entry in request.full_transcript])
+    # Retry dengan transkrip yang sama mendapat job yang sama (hasil tersimpan + signed URL baru)
+    job, reused = await scoring_queue.enqueue_once(request.session_id, current_user.id, transcript_str)
+    if reused:
+        print(f"Penilaian sesi {request.session_id} memakai job {job.id} yang sudah ada ({job.status}).")
+    return await build_score_job_status(job)
+
+@app.get("/score/{job_id}", response_model=schemas.ScoreJobStatus)
+async def get_scoring_job(
+    job_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    job = await scoring_queue.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job penilaian tidak ditemukan.")
+    return await build_score_job_status(job)
 
 
 @app.get("/speakers")
 async def get_speakers():
     return {"speakers": list(GOOGLE_TTS_VOICES.keys())}
 
+# --- Paginasi /history ---
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 20))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv("HISTORY_MAX_PAGE_SIZE", 100))
+
+def encode_history_cursor(session_id: str) -> str:
+    return base64.urlsafe_b64encode(session_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_history_cursor(cursor: str) -> str:
+    try:
+        session_id = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        session_id = ""
+    if not session_id:
+        raise HTTPException(status_code=400, detail="Cursor tidak valid.")
+    return session_id
+
 @app.get("/history", response_model=list[schemas.SessionHistoryItem])
-def get_session_history(
-    db: Session = Depends(get_db),
+async def get_session_history(
+    response: Response,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    sessions = db.query(models.SimulationSession).filter(
+    """
+    Riwayat sesi selesai, terbaru lebih dulu, per halaman `limit` item. Jika masih ada halaman
+    berikutnya, header `X-Next-Cursor` berisi nilai `cursor` untuk request selanjutnya.
+    """
+    # Hanya kolom yang dibutuhkan SessionHistoryItem; urutan (created_at, id) sesuai indeks riwayat
+    query = select(
+        models.SimulationSession.id,
+        models.SimulationSession.title,
+        models.SimulationSession.filename,
+        models.SimulationSession.created_at,
+        models.SimulationSession.final_score,
+        models.SimulationSession.pdf_gcs_path,
+    ).where(
         models.SimulationSession.user_id == current_user.id,
         models.SimulationSession.is_completed == True
-    ).order_by(models.SimulationSession.created_at.desc()).all()
-    
-    history_items = []
-    
-    storage_client = None
-    bucket = None
-    if GCS_BUCKET_NAME:
-        try:
-            storage_client = storage.Client()
-            bucket = storage_client.bucket(GCS_BUCKET_NAME)
-        except Exception as e:
-            print(f"Error initializing GCS Client: {e}")
-
-    for session in sessions:
-        download_url = None
-        if session.pdf_gcs_path and bucket:
-            try:
-                blob = bucket.blob(session.pdf_gcs_path)
-                if blob.exists():
-                    download_url = blob.generate_signed_url(expiration=timedelta(hours=1))
-                else:
-                    print(f"Warning: Blob not found for path: {session.pdf_gcs_path}")
-            except Exception as e:
-                print(f"Gagal membuat signed URL untuk {session.pdf_gcs_path}: {e}")
-        
-        history_items.append(
-            schemas.SessionHistoryItem(
-                session_id=session.id,
-                title=session.title,
-                filename=session.filename,
-                created_at=session.created_at,
-                final_score=session.final_score,
-                download_url=download_url
-            )
+    ).order_by(models.SimulationSession.created_at.desc(), models.SimulationSession.id.desc()).limit(limit + 1)
+
+    if cursor:
+        # Keyset pagination: lanjut setelah sesi terakhir halaman sebelumnya. Sesi acuan harus milik
+        # pengguna ini; cursor dari sesi lain (atau yang sudah dihapus) ditolak, bukan halaman kosong.
+        after_id = decode_history_cursor(cursor)
+        anchor = aliased(models.SimulationSession)
+        anchor_created_at = select(anchor.created_at).where(
+            anchor.id == after_id, anchor.user_id == current_user.id
+        )
+        if (await db.execute(anchor_created_at)).first() is None:
+            raise HTTPException(status_code=400, detail="Cursor tidak valid.")
+        # created_at acuan dibaca langsung di SQL agar tidak bergantung pada format penyimpanan
+        # tanggal di database (mis. CURRENT_TIMESTAMP SQLite tanpa mikrodetik).
+        query = query.where(
+            tuple_(models.SimulationSession.created_at, models.SimulationSession.id)
+            < tuple_(anchor_created_at.scalar_subquery(), after_id)
         )
-    return history_items
+
+    sessions = (await db.execute(query)).all()
+    if len(sessions) > limit:
+        sessions = sessions[:limit]
+        response.headers["X-Next-Cursor"] = encode_history_cursor(sessions[-1].id)
+
+    # pdf_gcs_path hanya diisi setelah upload laporan berhasil, jadi tidak perlu blob.exists() per baris
+    download_urls = await signed_url_cache.get_many(session.pdf_gcs_path for session in sessions)
+
+    return [
+        schemas.SessionHistoryItem(
+            session_id=session.id,
+            title=session.title,
+            filename=session.filename,
+            created_at=session.created_at,
+            final_score=session.final_score,
+            download_url=download_url
+        )
+        for session, download_url in zip(sessions, download_urls)
+    ]
 
 @app.websocket("/ws/session/{session_id}")
 async def websocket_session_handler(
@@ -533,78 +746,168 @@ async def websocket_session_handler(
     token: str = Query(...),
     mode: str = "simulasi",
     speaker: str = None,
+    stream: bool = False,
+    audio_format: str = DEFAULT_AUDIO_FORMAT,
 ):
     await websocket.accept()
-    db: Session = SessionLocal()
+    if audio_format not in AUDIO_FORMATS:
+        await websocket.close(code=1008, reason=f"audio_format tidak didukung. Pilihan: {', '.join(AUDIO_FORMATS)}")
+        return
     
+    # Byte yang dikirim ke klien dihitung per sesi untuk metrik
+    websocket = metrics.MeteredWebSocket(websocket)
+    metrics.websocket_session_opened()
     try:
-        user = auth.get_current_user_from_token(db, token)
-        if not user:
-            await websocket.close(code=4001, reason="Token tidak valid atau kedaluwarsa")
-            return
-
-        db_session = db.query(models.SimulationSession).filter(
-            models.SimulationSession.id == session_id,
-            models.SimulationSession.user_id == user.id
-        ).first()
-
-        if not db_session:
-            await websocket.close(code=1008, reason="Sesi tidak valid atau bukan milik Anda.")
-            return
-        
-        context = json.loads(db_session.context_data)
+        # Koneksi DB hanya dipinjam untuk memuat snapshot user & sesi, lalu langsung
+        # dikembalikan ke pool; sesi WebSocket bisa berlangsung hingga 30 menit.
+        async with AsyncSessionLocal() as db:
+            user = await auth.get_current_user_from_token(db, token)
+            if not user:
+                await websocket.close(code=4001, reason="Token tidak valid atau kedaluwarsa")
+                return
+
+            # context_data di-defer secara default; hanya jalur WebSocket yang memuatnya
+            result = await db.execute(select(models.SimulationSession).options(
+                undefer(models.SimulationSession.context_data)
+            ).where(
+                models.SimulationSession.id == session_id,
+                models.SimulationSession.user_id == user.id
+            ))
+            db_session = result.scalars().first()
+
+            if not db_session:
+                await websocket.close(code=1008, reason="Sesi tidak valid atau bukan milik Anda.")
+                return
+
+            session_created_at = db_session.created_at
+            context_data = db_session.context_data
+
+        if mode != "demo":
+            # Siapkan konteks lebih awal; koneksi ulang ke sesi yang sama memakai cache
+            await get_prepared_context(session_id, context_data)
+        # --- State percakapan (riwayat, salam, suara) disimpan di luar proses ---
+        # Klien yang tersambung ulang, ke worker mana pun, melanjutkan dialog yang sama.
+        session_store = get_session_state_store()
+        session_expires_at = session_created_at.replace(tzinfo=timezone.utc) + SESSION_DURATION
+        state = await session_store.load(session_id)
+
         # --- PERBAIKAN FINAL: Mengubah fallback default ke suara Chirp yang valid ---
-        voice_name = GOOGLE_TTS_VOICES.get(speaker, "id-ID-Chirp3-HD-Achird")
+        voice_name = GOOGLE_TTS_VOICES.get(speaker) or state.voice or "id-ID-Chirp3-HD-Achird"
+        if voice_name != state.voice:
+            await session_store.set_meta(session_id, session_expires_at, voice=voice_name)
 
         # --- PERUBAIKAN KUNCI #4: Inisialisasi Sejarah Percakapan ---
-        chat_history = []
-
-        greeting = "Selamat datang di simulasi seminar proposal. Silakan mulai presentasi Anda kapan pun Anda siap."
-        await websocket.send_json({"type": "dosen_reply_start", "text": greeting})
-        greeting_audio = await synthesize_audio(greeting, speaker_id=voice_name)
-        if greeting_audio: await websocket.send_bytes(greeting_audio)
-        
-        chat_history.append({"role": "model", "parts": [{"text": greeting}]})
-        
-        while True:
-            raw = await websocket.receive_text()
-            data = json.loads(raw)
+        chat_history = state.history
 
-            if data.get("type") == "user_transcript":
-                transcript = data.get("text", "").strip()
-                if not transcript: continue
-                
+        async def remember(role: str, text: str):
+            # State gagal disimpan (mis. Redis tidak tersedia): dialog tetap berjalan dari riwayat lokal
+            try:
+                await session_store.append(session_id, role, text, session_expires_at)
+            except Exception as e:
+                print(f"PERINGATAN: Gagal menyimpan state sesi {session_id}: {e}")
+
+        if state.greeted:
+            await websocket.send_json({"type": "session_resumed", "turns": len(chat_history)})
+        else:
+            greeting = GREETING_TEXT
+            await websocket.send_json({"type": "dosen_reply_start", "text": greeting})
+            greeting_audio = await get_reply_audio(greeting, voice_name, mode, audio_format)
+            if greeting_audio: await websocket.send_bytes(greeting_audio)
+
+            chat_history.append({"role": "model", "parts": [{"text": greeting}]})
+            await remember("model", greeting)
+            await session_store.set_meta(session_id, session_expires_at, greeted=True)
+        reply_task: asyncio.Task | None = None
+        # True setelah balasan terakhir terkirim utuh ke klien (sisa task hanya mencatat riwayat)
+        reply_sent = False
+
+        def log_reply_error(task: asyncio.Task):
+            # Error balasan langsung dicatat, tidak menunggu transkrip berikutnya
+            if not task.cancelled() and task.exception() is not None:
+                print(f"Error saat membuat balasan sesi {session_id}: {task.exception()}")
+                traceback.print_exception(task.exception())
+
+        async def respond(transcript: str):
+            """Menghasilkan dan mengirim satu balasan dosen. Bisa dibatalkan oleh transkrip yang lebih baru."""
+            nonlocal reply_sent
+            reply_sent = False
+            # Transkrip yang menyusul balasan yang dibatalkan digabung ke giliran user sebelumnya
+            if chat_history and chat_history[-1]["role"] == "user":
+                chat_history[-1]["parts"].append({"text": transcript})
+            else:
                 chat_history.append({"role": "user", "parts": [{"text": transcript}]})
+            await remember("user", transcript)
 
-                start_time_utc = db_session.created_at.replace(tzinfo=timezone.utc)
-                now_utc = datetime.now(timezone.utc)
-                remaining_seconds = (timedelta(minutes=30) - (now_utc - start_time_utc)).total_seconds()
-                is_session_ending = remaining_seconds <= 30
-                
+            now_utc = datetime.now(timezone.utc)
+            remaining_seconds = (session_expires_at - now_utc).total_seconds()
+            is_session_ending = remaining_seconds <= 30
+            
+            reply_streamed = False
+            if is_session_ending:
+                reply_text = SESSION_ENDING_TEXT
+            elif mode == "demo":
+                reply_text = get_demo_reply(transcript)
+            elif stream:
+                # Mode streaming: token Gemini dipotong per kalimat dan audio dikirim per kalimat
+                reply_text = await stream_reply_audio(
+                    websocket,
+                    stream_llm_reply(session_id, context_data, chat_history),
+                    lambda sentence: synthesize_audio(sentence, speaker_id=voice_name, audio_format=audio_format),
+                )
+                reply_streamed = True
+            else:
+                reply_text = await get_llm_reply(session_id, context_data, chat_history)
+            
+            if reply_text:
                 if is_session_ending:
-                    reply_text = "Baik, waktu sesi Anda hampir habis. Sesi ini akan segera berakhir."
-                elif mode == "demo":
-                    reply_text = get_demo_reply(transcript)
-                else:
-                    reply_text = await get_llm_reply(context, chat_history)
+                    await websocket.send_json({"type": "session_ending"})
                 
-                if reply_text:
-                    chat_history.append({"role": "model", "parts": [{"text": reply_text}]})
-                    
-                    if len(chat_history) > 20:
-                        chat_history = chat_history[-20:]
-
-                    if is_session_ending:
-                        await websocket.send_json({"type": "session_ending"})
-                    
+                if not reply_streamed:
                     await websocket.send_json({"type": "dosen_reply_start", "text": reply_text})
-                    audio_bytes = await synthesize_audio(reply_text, speaker_id=voice_name)
+                    audio_bytes = await get_reply_audio(reply_text, voice_name, mode, audio_format)
                     if audio_bytes:
                         await websocket.send_bytes(audio_bytes)
-                    
-                    if is_session_ending:
-                        await websocket.close(code=1000)
-                        break
+                reply_sent = True
+
+                # Balasan baru masuk riwayat setelah terkirim utuh; balasan yang dibatalkan tidak dicatat
+                chat_history.append({"role": "model", "parts": [{"text": reply_text}]})
+                await remember("model", reply_text)
+                if len(chat_history) > 20:
+                    del chat_history[:-20]
+                
+                if is_session_ending:
+                    await websocket.close(code=1000)
+
+        # --- Barge-in: penerimaan pesan dipisah dari pembuatan balasan ---
+        # Transkrip baru membatalkan balasan (LLM & TTS) yang sedang berjalan.
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                data = json.loads(raw)
+
+                if data.get("type") == "user_transcript":
+                    transcript = data.get("text", "").strip()
+                    if not transcript: continue
+
+                    if reply_task and not reply_task.done():
+                        if reply_sent:
+                            # Balasan sudah diterima klien utuh: biarkan riwayatnya selesai dicatat
+                            await reply_task
+                        else:
+                            reply_task.cancel()
+                            try:
+                                await reply_task
+                            except asyncio.CancelledError:
+                                pass
+                            await websocket.send_json({"type": "dosen_reply_cancelled"})
+                    elif reply_task and reply_task.exception():
+                        raise reply_task.exception()
+
+                    reply_task = asyncio.create_task(respond(transcript))
+                    reply_task.add_done_callback(log_reply_error)
+        finally:
+            if reply_task and not reply_task.done():
+                reply_task.cancel()
 
     except WebSocketDisconnect:
         print(f"Klien terputus dari sesi: {session_id}")
@@ -616,5 +919,5 @@ async def websocket_session_handler(
         except Exception:
             pass
     finally:
-        db.close()
+        metrics.websocket_session_closed(websocket)
 
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import asyncio
+from contextlib import contextmanager
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+
+# --- Konfigurasi Metrik dari Environment Variable ---
+# METRICS_ENABLED=false menonaktifkan endpoint /metrics dan pencatatan waktu query DB.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Latensi layanan eksternal & CPU berada di kisaran milidetik hingga puluhan detik
+STAGE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+SESSION_BYTES_BUCKETS = (1e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8)
+
+STAGE_DURATION = Histogram(
+    "mentora_stage_duration_seconds",
+    "Durasi tahap pemrosesan per panggilan",
+    ["stage", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "mentora_db_query_duration_seconds",
+    "Durasi eksekusi query database",
+    ["operation"],
+    buckets=DB_BUCKETS,
+)
+WEBSOCKET_SESSIONS_ACTIVE = Gauge(
+    "mentora_websocket_sessions_active",
+    "Jumlah sesi WebSocket yang sedang terbuka",
+)
+WEBSOCKET_BYTES_SENT = Counter(
+    "mentora_websocket_bytes_sent_total",
+    "Total byte yang dikirim ke klien WebSocket",
+    ["kind"],
+)
+WEBSOCKET_SESSION_BYTES = Histogram(
+    "mentora_websocket_session_bytes_sent",
+    "Byte yang dikirim per sesi WebSocket (dicatat saat sesi ditutup)",
+    buckets=SESSION_BYTES_BUCKETS,
+)
+
+# Label `operation` dibatasi ke kata pertama SQL yang dikenal agar kardinalitas tetap kecil
+DB_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """
+    Mencatat durasi satu tahap. `outcome`: 'ok', 'error' jika blok melempar exception, atau
+    'cancelled' jika dibatalkan (mis. balasan yang dipotong barge-in).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    finally:
+        STAGE_DURATION.labels(stage, outcome).observe(time.perf_counter() - started)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Disimpan di execution context (satu per eksekusi), jadi query yang gagal tidak meninggalkan sisa
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    words = statement[:16].split(None, 1)
+    operation = words[0].upper() if words else ""
+    DB_QUERY_DURATION.labels(operation if operation in DB_OPERATIONS else "OTHER").observe(
+        time.perf_counter() - context._metrics_started
+    )
+
+def instrument_engine(engine):
+    """Memasang pencatat waktu query pada engine sync (atau `async_engine.sync_engine`)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MeteredWebSocket:
+    """
+    Pembungkus WebSocket yang menghitung byte terkirim per sesi (`bytes_sent`) dan totalnya
+    per jenis frame. Atribut & method lain diteruskan ke WebSocket aslinya.
+    """
+
+    def __init__(self, websocket):
+        self._websocket = websocket
+        self.bytes_sent = 0
+
+    def __getattr__(self, name):
+        return getattr(self._websocket, name)
+
+    def _count(self, kind: str, size: int):
+        self.bytes_sent += size
+        WEBSOCKET_BYTES_SENT.labels(kind).inc(size)
+
+    async def send_json(self, data, mode: str = "text"):
+        # Serialisasi sama dengan Starlette, sehingga ukurannya bisa dihitung tanpa encode dua kali
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        if mode == "binary":
+            payload = text.encode("utf-8")
+            await self._websocket.send_bytes(payload)
+            self._count("json", len(payload))
+        else:
+            await self._websocket.send_text(text)
+            self._count("json", len(text.encode("utf-8")))
+
+    async def send_text(self, data: str):
+        await self._websocket.send_text(data)
+        self._count("text", len(data.encode("utf-8")))
+
+    async def send_bytes(self, data: bytes):
+        await self._websocket.send_bytes(data)
+        self._count("audio", len(data))
+
+
+def websocket_session_opened():
+    WEBSOCKET_SESSIONS_ACTIVE.inc()
+
+def websocket_session_closed(websocket: MeteredWebSocket):
+    WEBSOCKET_SESSIONS_ACTIVE.dec()
+    WEBSOCKET_SESSION_BYTES.observe(websocket.bytes_sent)
+
+
+def render_latest() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, Index
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 
 from database import Base
+from compressed_text import CompressedText
 
 class User(Base):
     __tablename__ = "users"
@@ -18,6 +19,11 @@ class User(Base):
 
 class SimulationSession(Base):
     __tablename__ = "simulation_sessions"
+    __table_args__ = (
+        # /history: filter user_id & is_completed, urut created_at DESC. `id` ikut di indeks sebagai
+        # pemutus urutan untuk keyset pagination (created_at bisa sama persis, mis. resolusi detik di SQLite).
+        Index("ix_simulation_sessions_history", "user_id", "is_completed", "created_at", "id"),
+    )
 
     # Menggunakan String untuk UUID agar kompatibel dengan semua DB
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -25,7 +31,10 @@ class SimulationSession(Base):
     
     title = Column(String, nullable=True)
     filename = Column(String, nullable=True) # FIX: Menambahkan kolom filename
-    context_data = Column(Text, nullable=False) # Menyimpan JSON dari context_blocks
+    # JSON dari context_blocks, disimpan terkompresi. Tidak ikut dimuat bersama baris sesi
+    # (/history, /score tidak membutuhkannya); muat eksplisit dengan undefer() (raiseload mencegah
+    # lazy load diam-diam yang tidak didukung AsyncSession).
+    context_data = deferred(Column(CompressedText, nullable=False), raiseload=True)
     final_score = Column(Float, nullable=True) # Diubah ke Float agar konsisten dengan schema
     feedback = Column(Text, nullable=True)
     pdf_gcs_path = Column(String, nullable=True) # Path ke file di GCS
@@ -35,3 +44,41 @@ class SimulationSession(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     owner = relationship("User", back_populates="sessions")
+
+
+class ScoringJob(Base):
+    """Job penilaian /score yang dikerjakan worker latar belakang (lihat scoring_jobs.py)."""
+    __tablename__ = "scoring_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id = Column(String, ForeignKey("simulation_sessions.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    status = Column(String, nullable=False, default="queued", index=True) # queued, running, done, failed
+    stage = Column(String, nullable=True) # Tahap yang sedang dikerjakan saat status 'running'
+    attempts = Column(Integer, nullable=False, default=0)
+    transcript = Column(Text, nullable=False)
+    result = Column(Text, nullable=True) # JSON hasil penilaian saat status 'done'
+    error = Column(Text, nullable=True)
+    # Batas lease worker yang sedang mengerjakan job; diperpanjang berkala selama job berjalan.
+    # Job 'running' dengan lease kedaluwarsa dianggap ditinggalkan dan boleh diklaim ulang.
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Job 'queued' hasil percobaan yang gagal baru boleh diklaim setelah waktu ini (backoff)
+    retry_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class ScoringCacheEntry(Base):
+    """
+    Penilaian yang sudah pernah diminta, per sesi & hash transkrip (lihat scoring_jobs.py).
+    Primary key yang sama menjamin satu job untuk permintaan /score yang terduplikasi.
+    Disimpan di tabel terpisah agar tabel scoring_jobs yang sudah ada tidak perlu diubah.
+    """
+    __tablename__ = "scoring_cache"
+
+    key = Column(String, primary_key=True) # "{session_id}:{sha256 transkrip ternormalisasi}"
+    session_id = Column(String, ForeignKey("simulation_sessions.id"), nullable=False, index=True)
+    job_id = Column(String, ForeignKey("scoring_jobs.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+from datetime import timedelta
+from typing import Any, Optional
+
+import google.generativeai as genai
+from google.generativeai import caching
+
+# --- Konfigurasi Context Caching Gemini dari Environment Variable ---
+# Prefix statis sesi (system prompt + konteks proposal) diunggah sekali sebagai
+# CachedContent, lalu giliran berikutnya hanya mengirim riwayat percakapan.
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "true").lower() == "true"
+# Context caching hanya berlaku untuk model dengan versi eksplisit (mis. '-001').
+PROMPT_CACHE_MODEL = os.getenv("PROMPT_CACHE_MODEL", "gemini-2.0-flash-001")
+# Prefix yang lebih kecil dari ini tidak di-cache (ditolak API / tidak menguntungkan).
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", 4096))
+# Sedikit lebih lama dari durasi sesi 30 menit.
+PROMPT_CACHE_TTL_MINUTES = int(os.getenv("PROMPT_CACHE_TTL_MINUTES", 35))
+
+# Perkiraan kasar: ~4 karakter per token teks, 258 token per gambar.
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+# Prefix dianggap kedaluwarsa sedikit lebih awal agar tidak dipakai tepat saat dihapus server.
+EXPIRY_MARGIN_SECONDS = 60
+
+
+def estimate_tokens(system_instruction: str, parts: list) -> int:
+    chars = len(system_instruction)
+    images = 0
+    for part in parts:
+        if isinstance(part, str):
+            chars += len(part)
+        else:
+            images += 1
+    return chars // CHARS_PER_TOKEN + images * IMAGE_TOKENS
+
+
+class GeminiPrefixBackend:
+    """Backend produksi: menyimpan prefix lewat context caching Gemini (genai.caching)."""
+
+    def upload(self, session_id: str, model_name: str, system_instruction: str, parts: list, ttl: timedelta) -> Any:
+        return caching.CachedContent.create(
+            model=model_name,
+            display_name=f"mentora-session-{session_id}",
+            system_instruction=system_instruction,
+            contents=[{"role": "user", "parts": parts}],
+            ttl=ttl,
+        )
+
+    def model(self, handle: Any, generation_config=None):
+        return genai.GenerativeModel.from_cached_content(cached_content=handle, generation_config=generation_config)
+
+    def delete(self, handle: Any):
+        handle.delete()
+
+
+class PromptPrefixCache:
+    """Mencatat prefix yang sudah diunggah per sesi, sehingga tiap sesi hanya mengunggahnya sekali."""
+
+    def __init__(
+        self,
+        backend,
+        model_name: str = PROMPT_CACHE_MODEL,
+        min_tokens: int = PROMPT_CACHE_MIN_TOKENS,
+        ttl_minutes: int = PROMPT_CACHE_TTL_MINUTES,
+        enabled: bool = PROMPT_CACHE_ENABLED,
+    ):
+        self.backend = backend
+        self.model_name = model_name
+        self.min_tokens = min_tokens
+        self.ttl = timedelta(minutes=ttl_minutes)
+        self.enabled = enabled
+        # session_id -> (handle atau None jika tidak di-cache, waktu kedaluwarsa monotonic)
+        self._entries: dict[str, tuple[Optional[Any], float]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _prune(self, now: float):
+        for session_id in [sid for sid, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[session_id]
+            self._locks.pop(session_id, None)
+
+    def _lookup(self, session_id: str, now: float):
+        entry = self._entries.get(session_id)
+        if entry and entry[1] > now:
+            return entry
+        return None
+
+    async def get(self, session_id: str, system_instruction: str, parts: list) -> Optional[Any]:
+        """
+        Mengembalikan handle prefix sesi, mengunggahnya jika belum ada.
+        None berarti pemanggil harus mengirim konteks lengkap seperti biasa (fallback).
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        entry = self._lookup(session_id, now)
+        if entry:
+            return entry[0]
+        if estimate_tokens(system_instruction, parts) < self.min_tokens:
+            return None
+
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            entry = self._lookup(session_id, now)
+            if entry:
+                return entry[0]
+            self._prune(now)
+            expires_at = now + self.ttl.total_seconds() - EXPIRY_MARGIN_SECONDS
+            try:
+                handle = await asyncio.to_thread(
+                    self.backend.upload, session_id, self.model_name, system_instruction, parts, self.ttl
+                )
+            except Exception as e:
+                # Jangan coba lagi di setiap giliran; sesi ini memakai jalur tanpa cache.
+                print(f"Warning: Gagal membuat context cache Gemini untuk sesi {session_id}: {e}")
+                handle = None
+            self._entries[session_id] = (handle, expires_at)
+            self._locks[session_id] = lock
+            return handle
+
+    def model(self, handle: Any, generation_config=None):
+        return self.backend.model(handle, generation_config=generation_config)
+
+    async def release(self, session_id: str):
+        """Menghapus prefix sesi lebih awal (mis. setelah sesi dinilai)."""
+        entry = self._entries.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        if entry and entry[0] is not None:
+            try:
+                await asyncio.to_thread(self.backend.delete, entry[0])
+            except Exception as e:
+                print(f"Warning: Gagal menghapus context cache Gemini untuk sesi {session_id}: {e}")
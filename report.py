@@ -0,0 +1,157 @@
+import io
+import os
+import copy
+import threading
+from datetime import datetime
+from typing import Iterator
+
+from fontTools import ttLib
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+from fpdf.fonts import SubsetMap, TTFFont
+
+# --- Konfigurasi Laporan PDF ---
+# PENTING: Pastikan folder 'assets' ada di root proyek Anda dengan font di dalamnya
+REPORT_FONT_DIR = os.getenv("REPORT_FONT_DIR", "assets")
+FONT_FAMILY = "DejaVu"
+FONT_FILES = {"": "DejaVuSans.ttf", "B": "DejaVuSans-Bold.ttf"}
+FALLBACK_FAMILY = "Helvetica"
+
+# --- Tata letak statis laporan ---
+REPORT_TITLE = "Laporan Hasil Simulasi Seminar Proposal"
+BREAKDOWN_ROWS = [
+    ("relevance", "Relevansi Jawaban"),
+    ("clarity", "Kejelasan Penyampaian"),
+    ("mastery", "Penguasaan Materi"),
+]
+LINE_HEIGHT_TRANSCRIPT = 5
+
+
+class _FontCache:
+    """
+    Font TTF di-parse sekali per proses. Sebelumnya setiap laporan memanggil `FPDF.add_font`
+    (parse seluruh file TTF). Di sini tiap dokumen mendapat salinan ringan dari hasil parse
+    dengan TTFont lazy baru atas seluruh glyph font; fpdf tetap men-subset font ke karakter
+    yang benar-benar dipakai dokumen saat output (in-place, karena itu TTFont tidak dibagi).
+    Memakai internal fpdf (TTFFont, SubsetMap), sehingga versi fpdf2 di-pin di requirements.txt.
+    """
+
+    def __init__(self, font_dir: str = REPORT_FONT_DIR):
+        self.font_dir = font_dir
+        self._lock = threading.Lock()
+        self._prototypes = None  # style -> (TTFFont hasil parse, bytes file font)
+
+    def _load(self) -> dict:
+        if self._prototypes is None:
+            with self._lock:
+                if self._prototypes is None:
+                    loader = FPDF()
+                    prototypes = {}
+                    for style, filename in FONT_FILES.items():
+                        with open(os.path.join(self.font_dir, filename), "rb") as f:
+                            data = f.read()
+                        fontkey = f"{FONT_FAMILY.lower()}{style}"
+                        prototypes[style] = (TTFFont(loader, io.BytesIO(data), fontkey, style), data)
+                    self._prototypes = prototypes
+        return self._prototypes
+
+    def attach(self, pdf: FPDF):
+        """Mendaftarkan font DejaVu ke dokumen tanpa mem-parse ulang file TTF."""
+        for style, (prototype, data) in self._load().items():
+            font = copy.copy(prototype)
+            font.i = len(pdf.fonts) + 1
+            font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+            font.cw = copy.copy(prototype.cw)
+            font.missing_glyphs = []
+            font.biggest_size_pt = 0
+            font._hbfont = None
+            font.subset = SubsetMap(font)
+            pdf.fonts[font.fontkey] = font
+
+
+_font_cache = _FontCache()
+
+
+def _new_document() -> tuple[FPDF, str]:
+    pdf = FPDF()
+    family = FONT_FAMILY
+    try:
+        _font_cache.attach(pdf)
+    except OSError as e:
+        print(f"PERINGATAN: Font DejaVu tidak ditemukan ({e}). Menggunakan {FALLBACK_FAMILY} (mungkin ada masalah karakter).")
+        family = FALLBACK_FAMILY
+    except Exception as e:
+        # Internal fpdf berubah (mis. versi baru): kembali ke add_font biasa per laporan
+        print(f"PERINGATAN: Cache font laporan tidak bisa dipakai, memuat font langsung: {e}")
+        pdf = FPDF()
+        for style, filename in FONT_FILES.items():
+            pdf.add_font(FONT_FAMILY, style, os.path.join(REPORT_FONT_DIR, filename))
+    pdf.add_page()
+    return pdf, family
+
+
+def _wrap_lines(pdf: FPDF, text: str, width: float) -> Iterator[str]:
+    """
+    Memecah teks menjadi baris yang muat dalam `width`, per paragraf dan per kata.
+    Lebar tiap kata dihitung sekali, sehingga biayanya linear terhadap panjang teks
+    (line breaking `multi_cell` menghitung ulang lebar seluruh baris di setiap karakter).
+    """
+    space_width = pdf.get_string_width(" ")
+    for paragraph in io.StringIO(text):
+        words = paragraph.rstrip("\n").split(" ")
+        line, line_width = [], 0.0
+        for word in words:
+            word_width = pdf.get_string_width(word)
+            if line and line_width + space_width + word_width > width:
+                yield " ".join(line)
+                line, line_width = [], 0.0
+            if word_width > width:
+                # Kata yang lebih panjang dari satu baris (mis. URL) dipotong per karakter
+                chunk = ""
+                for char in word:
+                    if chunk and pdf.get_string_width(chunk + char) > width:
+                        yield chunk
+                        chunk = ""
+                    chunk += char
+                word, word_width = chunk, pdf.get_string_width(chunk)
+            line.append(word)
+            line_width = word_width if len(line) == 1 else line_width + space_width + word_width
+        yield " ".join(line)
+
+
+def _section_heading(pdf: FPDF, family: str, text: str, size: int = 12, rule: bool = False):
+    pdf.set_font(family, 'B', size); pdf.cell(0, 10, text, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    if rule:
+        pdf.line(pdf.get_x(), pdf.get_y(), pdf.get_x() + 190, pdf.get_y()); pdf.ln(5)
+
+
+def render_report(session_id: str, results_data: dict) -> bytes:
+    """Membuat laporan PDF hasil penilaian dan mengembalikan bytes-nya."""
+    pdf, family = _new_document()
+
+    pdf.set_font(family, 'B', 18)
+    pdf.cell(0, 10, REPORT_TITLE, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.set_font(family, '', 10); pdf.cell(0, 8, f"ID Sesi: {session_id}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.cell(0, 8, f"Tanggal: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C'); pdf.ln(10)
+    _section_heading(pdf, family, f"SKOR AKHIR: {results_data.get('final_score', 'N/A')} / 100", size=14, rule=True)
+
+    _section_heading(pdf, family, "Umpan Balik dari AI Penilai:")
+    pdf.set_font(family, '', 11); pdf.multi_cell(0, 5, results_data.get('feedback', 'Tidak ada umpan balik.'))
+    pdf.ln(5)
+
+    _section_heading(pdf, family, "Rincian Penilaian:")
+    pdf.set_font(family, '', 11)
+    bd = results_data.get('breakdown', {})
+    for key, label in BREAKDOWN_ROWS:
+        pdf.cell(0, 6, f"- {label}: {bd.get(key, 'N/A')} / 100", new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    pdf.ln(10)
+
+    _section_heading(pdf, family, "Transkrip Lengkap", size=14, rule=True)
+    pdf.set_font(family, '', 10)
+    # Transkrip bisa sangat panjang: dipecah sendiri per baris lalu ditulis baris demi baris
+    width = pdf.w - pdf.l_margin - pdf.r_margin - 2 * pdf.c_margin
+    for line in _wrap_lines(pdf, results_data.get('transcript', 'Transkrip tidak tersedia.'), width):
+        pdf.cell(0, LINE_HEIGHT_TRANSCRIPT, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    # --- PERBAIKAN: Konversi eksplisit dari bytearray ke bytes untuk kompatibilitas GCS ---
+    return bytes(pdf.output())
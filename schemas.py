@@ -47,6 +47,15 @@ class ScoreResponse(BaseModel):
     breakdown: ScoreBreakdown
     download_url: Optional[str] = None
 
+class ScoreJobStatus(BaseModel):
+    job_id: str
+    session_id: str
+    status: str # queued, running, done, failed
+    stage: Optional[str] = None # scoring, rendering_report, saving (saat status 'running')
+    attempts: int = 0
+    result: Optional[ScoreResponse] = None # Terisi saat status 'done'
+    error: Optional[str] = None
+
 # --- Schemas for File Upload ---
 
 class UploadResponse(BaseModel):
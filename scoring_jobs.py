@@ -0,0 +1,247 @@
+import os
+import json
+import uuid
+import asyncio
+import hashlib
+import unicodedata
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import AsyncSessionLocal
+
+# --- Konfigurasi Antrian Penilaian dari Environment Variable ---
+# Jumlah job penilaian yang dikerjakan bersamaan per proses.
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", 2))
+# Interval worker memeriksa tabel job saat tidak ada notifikasi job baru (detik).
+SCORING_POLL_SECONDS = float(os.getenv("SCORING_POLL_SECONDS", 5))
+# Job yang gagal dicoba ulang sampai jumlah percobaan ini, lalu ditandai 'failed'.
+SCORING_MAX_ATTEMPTS = int(os.getenv("SCORING_MAX_ATTEMPTS", 3))
+# Lama lease job yang sedang dikerjakan (detik). Worker memperpanjangnya setiap sepertiga lease;
+# job 'running' yang lease-nya habis (worker/proses mati) diklaim ulang oleh worker lain.
+SCORING_LEASE_SECONDS = float(os.getenv("SCORING_LEASE_SECONDS", 60))
+# Jeda sebelum percobaan ulang job yang gagal (detik), berlipat dua setiap percobaan.
+SCORING_RETRY_BACKOFF_SECONDS = float(os.getenv("SCORING_RETRY_BACKOFF_SECONDS", 10))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def transcript_key(session_id: str, transcript: str) -> str:
+    """
+    Kunci cache penilaian: sesi + SHA-256 transkrip yang dinormalisasi (Unicode NFC,
+    spasi berlebih dan baris kosong diabaikan), sehingga retry dari frontend dengan
+    transkrip yang sama menghasilkan kunci yang sama.
+    """
+    lines = (" ".join(line.split()) for line in unicodedata.normalize("NFC", transcript).splitlines())
+    normalized = "\n".join(line for line in lines if line)
+    return f"{session_id}:{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}"
+
+
+class ScoringQueue:
+    """
+    Antrian job penilaian yang disimpan di tabel `scoring_jobs`, sehingga job tidak hilang saat
+    server restart. Worker mengambil job dengan klaim atomik (UPDATE ... WHERE status='queued'),
+    lalu menjalankan `handler(job, set_stage)` yang mengembalikan hasil penilaian (dict JSON).
+    Job yang diklaim memegang lease yang diperpanjang selama berjalan, sehingga beberapa proses
+    server bisa berbagi satu database: hanya job yang lease-nya habis yang diklaim ulang.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[models.ScoringJob, Callable[[str], Awaitable[None]]], Awaitable[dict]],
+        workers: int = SCORING_WORKERS,
+        poll_seconds: float = SCORING_POLL_SECONDS,
+        max_attempts: int = SCORING_MAX_ATTEMPTS,
+        lease_seconds: float = SCORING_LEASE_SECONDS,
+        retry_backoff_seconds: float = SCORING_RETRY_BACKOFF_SECONDS,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        # Job 'running' yang ditinggalkan worker yang berhenti di tengah jalan diklaim ulang oleh
+        # _claim setelah lease-nya habis; job milik proses lain yang masih hidup tidak disentuh.
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, session_id: str, user_id: int, transcript: str) -> models.ScoringJob:
+        job = models.ScoringJob(
+            id=str(uuid.uuid4()), session_id=session_id, user_id=user_id,
+            transcript=transcript, status=JOB_QUEUED, attempts=0,
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(job)
+            await db.commit()
+        self._wakeup.set()
+        return job
+
+    async def enqueue_once(self, session_id: str, user_id: int, transcript: str) -> tuple[models.ScoringJob, bool]:
+        """
+        Seperti `enqueue`, tetapi idempoten per (session_id, hash transkrip): permintaan ulang
+        mendapat job yang sama (masih berjalan atau sudah selesai) tanpa penilaian LLM, render
+        laporan, maupun upload baru. Job yang gagal diantrikan ulang. Mengembalikan (job, dipakai_ulang).
+        """
+        key = transcript_key(session_id, transcript)
+        while True:
+            async with AsyncSessionLocal() as db:
+                job = (await db.execute(
+                    select(models.ScoringJob)
+                    .join(models.ScoringCacheEntry, models.ScoringCacheEntry.job_id == models.ScoringJob.id)
+                    .where(models.ScoringCacheEntry.key == key)
+                )).scalars().first()
+                if job is not None:
+                    if job.status != JOB_FAILED:
+                        return job, True
+                    result = await db.execute(
+                        update(models.ScoringJob)
+                        .where(models.ScoringJob.id == job.id, models.ScoringJob.status == JOB_FAILED)
+                        .values(status=JOB_QUEUED, stage=None, attempts=0, error=None, retry_at=None)
+                    )
+                    await db.commit()
+                    if result.rowcount == 1:
+                        self._wakeup.set()
+                        await db.refresh(job)
+                        return job, False
+                    continue  # Permintaan lain sudah mengantrikan ulang job ini
+
+                job = models.ScoringJob(
+                    id=str(uuid.uuid4()), session_id=session_id, user_id=user_id,
+                    transcript=transcript, status=JOB_QUEUED, attempts=0,
+                )
+                db.add(job)
+                db.add(models.ScoringCacheEntry(key=key, session_id=session_id, job_id=job.id))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    # Permintaan duplikat yang bersamaan sudah membuat job lebih dulu: pakai job tersebut
+                    await db.rollback()
+                    continue
+            self._wakeup.set()
+            return job, False
+
+    async def get(self, job_id: str, user_id: int) -> Optional[models.ScoringJob]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(models.ScoringJob).where(
+                models.ScoringJob.id == job_id,
+                models.ScoringJob.user_id == user_id
+            ))
+            return result.scalars().first()
+
+    async def _update(self, job_id: str, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(models.ScoringJob).where(models.ScoringJob.id == job_id).values(**values))
+            await db.commit()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        job = models.ScoringJob
+        return or_(
+            # Job baru, atau percobaan ulang yang jeda backoff-nya sudah lewat
+            and_(job.status == JOB_QUEUED, or_(job.retry_at.is_(None), job.retry_at <= now)),
+            # Job yang worker-nya berhenti tanpa memperpanjang lease (lease NULL: diklaim versi lama)
+            and_(job.status == JOB_RUNNING, or_(job.lease_expires_at.is_(None), job.lease_expires_at < now)),
+        )
+
+    async def _claim(self) -> Optional[models.ScoringJob]:
+        async with AsyncSessionLocal() as db:
+            while True:
+                now = datetime.now(timezone.utc)
+                job_id = (await db.execute(
+                    select(models.ScoringJob.id)
+                    .where(self._claimable(now))
+                    .order_by(models.ScoringJob.created_at)
+                    .limit(1)
+                )).scalar()
+                if job_id is None:
+                    return None
+                result = await db.execute(
+                    update(models.ScoringJob)
+                    .where(models.ScoringJob.id == job_id, self._claimable(now))
+                    .values(
+                        status=JOB_RUNNING, stage=None, retry_at=None,
+                        attempts=models.ScoringJob.attempts + 1,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                    )
+                )
+                await db.commit()
+                # rowcount 0: job sudah diklaim worker lain lebih dulu, coba job berikutnya
+                if result.rowcount == 1:
+                    job = await db.get(models.ScoringJob, job_id)
+                    if job.attempts > self.max_attempts:
+                        # Lease habis berulang kali (mis. job membuat proses crash): jangan diulang terus
+                        await self._update(job.id, status=JOB_FAILED, stage=None, lease_expires_at=None,
+                                           error="Worker berhenti sebelum job selesai.")
+                        continue
+                    return job
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._update(
+                    job_id, lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+                )
+            except Exception:
+                traceback.print_exc()
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception:
+                # Gagal mencatat status job; job tetap 'running' dan diklaim ulang setelah lease habis
+                traceback.print_exc()
+
+    async def _run(self, job: models.ScoringJob):
+        async def set_stage(stage: str):
+            await self._update(job.id, stage=stage)
+
+        renew = asyncio.create_task(self._renew_lease(job.id))
+        try:
+            result = await self.handler(job, set_stage)
+        except Exception as e:
+            traceback.print_exc()
+            print(f"Job penilaian {job.id} gagal (percobaan {job.attempts}/{self.max_attempts}): {e}")
+            if job.attempts < self.max_attempts:
+                # Backoff eksponensial: _claim melewati job ini sampai retry_at
+                delay = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                await self._update(job.id, status=JOB_QUEUED, stage=None, error=str(e),
+                                   lease_expires_at=None, retry_at=retry_at)
+            else:
+                await self._update(job.id, status=JOB_FAILED, stage=None, error=str(e), lease_expires_at=None)
+            return
+        finally:
+            renew.cancel()
+        await self._update(job.id, status=JOB_DONE, stage=None, error=None, lease_expires_at=None,
+                           result=json.dumps(result))
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# --- Konfigurasi State Sesi WebSocket dari Environment Variable ---
+# SESSION_STATE_BACKEND: 'memory' (per proses) atau 'redis' (dibagi antar worker/node)
+SESSION_STATE_BACKEND = os.getenv("SESSION_STATE_BACKEND", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_STATE_PREFIX = os.getenv("SESSION_STATE_PREFIX", "mentora:session")
+# Jumlah pesan terakhir yang disimpan per sesi (sama dengan batas riwayat yang dikirim ke Gemini).
+SESSION_HISTORY_MAX_MESSAGES = int(os.getenv("SESSION_HISTORY_MAX_MESSAGES", 20))
+
+
+class SessionState(NamedTuple):
+    history: list[dict]  # format riwayat Gemini: [{"role": ..., "parts": [{"text": ...}]}]
+    greeted: bool
+    voice: Optional[str]
+
+
+def build_history(messages: list[tuple[str, str]]) -> list[dict]:
+    """Menyusun riwayat Gemini dari pesan mentah; pesan berurutan dengan role sama digabung satu giliran."""
+    history = []
+    for role, text in messages:
+        if history and history[-1]["role"] == role:
+            history[-1]["parts"].append({"text": text})
+        else:
+            history.append({"role": role, "parts": [{"text": text}]})
+    return history
+
+
+class SessionStateStore:
+    """
+    Interface state percakapan sesi WebSocket: riwayat pesan, penanda salam pembuka sudah
+    dikirim, dan pilihan suara. Setiap pesan disimpan saat itu juga (append), sehingga klien
+    yang tersambung ulang ke worker mana pun bisa melanjutkan dialog. State kedaluwarsa
+    bersama jendela sesi (`expires_at`).
+    """
+
+    async def load(self, session_id: str) -> SessionState:
+        raise NotImplementedError
+
+    async def append(self, session_id: str, role: str, text: str, expires_at: datetime):
+        raise NotImplementedError
+
+    async def set_meta(self, session_id: str, expires_at: datetime, greeted: Optional[bool] = None, voice: Optional[str] = None):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class MemorySessionStateStore(SessionStateStore):
+    """State di memori proses: cukup untuk satu worker, hilang saat server restart."""
+
+    def __init__(self, max_messages: int = SESSION_HISTORY_MAX_MESSAGES):
+        self.max_messages = max_messages
+        # session_id -> {"messages": [(role, text)], "greeted": bool, "voice": str|None, "expires_at": float}
+        self._sessions: dict[str, dict] = {}
+
+    def _entry(self, session_id: str, expires_at: Optional[datetime] = None) -> dict:
+        now = time.time()
+        # Bersihkan state sesi lain yang sudah kedaluwarsa (setara EXPIREAT di Redis)
+        for key in [key for key, entry in self._sessions.items() if entry["expires_at"] <= now]:
+            del self._sessions[key]
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = {"messages": [], "greeted": False, "voice": None, "expires_at": now}
+            if expires_at is not None:
+                self._sessions[session_id] = entry
+        if expires_at is not None:
+            entry["expires_at"] = expires_at.timestamp()
+        return entry
+
+    async def load(self, session_id: str) -> SessionState:
+        entry = self._entry(session_id)
+        return SessionState(build_history(entry["messages"]), entry["greeted"], entry["voice"])
+
+    async def append(self, session_id: str, role: str, text: str, expires_at: datetime):
+        messages = self._entry(session_id, expires_at)["messages"]
+        messages.append((role, text))
+        del messages[:-self.max_messages]
+
+    async def set_meta(self, session_id: str, expires_at: datetime, greeted: Optional[bool] = None, voice: Optional[str] = None):
+        entry = self._entry(session_id, expires_at)
+        if greeted is not None: entry["greeted"] = greeted
+        if voice is not None: entry["voice"] = voice
+
+
+class RedisSessionStateStore(SessionStateStore):
+    """
+    State di Redis. Per sesi ada dua key:
+    - `{prefix}:{id}:messages` (list JSON `[role, text]`): RPUSH + LTRIM per pesan, O(1)
+    - `{prefix}:{id}:meta` (hash): `greeted`, `voice`
+    Keduanya diberi EXPIREAT ke akhir jendela sesi di setiap penulisan.
+    `client` bisa diisi klien lain yang kompatibel, mis. `fakeredis.aioredis.FakeRedis()` untuk pengujian lokal.
+    """
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = SESSION_STATE_PREFIX,
+                 max_messages: int = SESSION_HISTORY_MAX_MESSAGES, client=None):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.max_messages = max_messages
+
+    def _key(self, session_id: str, name: str) -> str:
+        return f"{self.prefix}:{session_id}:{name}"
+
+    async def load(self, session_id: str) -> SessionState:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrange(self._key(session_id, "messages"), 0, -1)
+        pipe.hgetall(self._key(session_id, "meta"))
+        raw_messages, meta = await pipe.execute()
+        messages = [tuple(json.loads(raw)) for raw in raw_messages]
+        return SessionState(build_history(messages), meta.get("greeted") == "1", meta.get("voice"))
+
+    async def append(self, session_id: str, role: str, text: str, expires_at: datetime):
+        key = self._key(session_id, "messages")
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rpush(key, json.dumps([role, text]))
+        pipe.ltrim(key, -self.max_messages, -1)
+        pipe.expireat(key, int(expires_at.timestamp()))
+        await pipe.execute()
+
+    async def set_meta(self, session_id: str, expires_at: datetime, greeted: Optional[bool] = None, voice: Optional[str] = None):
+        fields = {}
+        if greeted is not None: fields["greeted"] = "1" if greeted else "0"
+        if voice is not None: fields["voice"] = voice
+        if not fields:
+            return
+        key = self._key(session_id, "meta")
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping=fields)
+        pipe.expireat(key, int(expires_at.timestamp()))
+        await pipe.execute()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_store: SessionStateStore | None = None
+
+def get_session_state_store() -> SessionStateStore:
+    global _store
+    if _store is None:
+        if SESSION_STATE_BACKEND == "redis":
+            _store = RedisSessionStateStore()
+        elif SESSION_STATE_BACKEND == "memory":
+            _store = MemorySessionStateStore()
+        else:
+            raise ValueError(f"SESSION_STATE_BACKEND tidak dikenal: {SESSION_STATE_BACKEND}")
+    return _store
+
+async def close_session_state_store():
+    global _store
+    if _store is not None:
+        store, _store = _store, None
+        await store.close()
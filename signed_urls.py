@@ -0,0 +1,63 @@
+import os
+import time
+import asyncio
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from cache import LRUCache
+from clients import registry
+
+# --- Konfigurasi Signed URL Laporan dari Environment Variable ---
+SIGNED_URL_EXPIRY_MINUTES = int(os.getenv("SIGNED_URL_EXPIRY_MINUTES", 60))
+# URL di cache dibuat ulang jika sisa masa berlakunya kurang dari ini.
+SIGNED_URL_REFRESH_MINUTES = int(os.getenv("SIGNED_URL_REFRESH_MINUTES", 10))
+SIGNED_URL_CACHE_MAX_MB = int(os.getenv("SIGNED_URL_CACHE_MAX_MB", 16))
+# Jumlah maksimum penandatanganan URL yang berjalan bersamaan di thread pool.
+SIGNED_URL_CONCURRENCY = int(os.getenv("SIGNED_URL_CONCURRENCY", 8))
+
+
+class SignedUrlCache:
+    """
+    Signed URL untuk laporan PDF di GCS, di-cache per path sampai mendekati kedaluwarsa.
+    Path diambil dari database (`pdf_gcs_path` hanya diisi setelah upload berhasil), jadi
+    tidak ada pengecekan `blob.exists()` per baris. Penandatanganan dijalankan di thread pool.
+    """
+
+    def __init__(
+        self,
+        bucket_name: Optional[str],
+        expiry_minutes: int = SIGNED_URL_EXPIRY_MINUTES,
+        refresh_minutes: int = SIGNED_URL_REFRESH_MINUTES,
+        max_bytes: int = SIGNED_URL_CACHE_MAX_MB * 1024 * 1024,
+        concurrency: int = SIGNED_URL_CONCURRENCY,
+    ):
+        self.bucket_name = bucket_name
+        self.expiry = timedelta(minutes=expiry_minutes)
+        self.refresh_seconds = refresh_minutes * 60
+        # path -> (url, waktu kedaluwarsa monotonic)
+        self.memory = LRUCache(max_bytes, sizeof=lambda entry: len(entry[0]), name="signed_urls")
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def _sign(self, gcs_path: str) -> tuple[str, float]:
+        expires_at = time.monotonic() + self.expiry.total_seconds()
+        blob = registry.bucket(self.bucket_name).blob(gcs_path)
+        return blob.generate_signed_url(expiration=self.expiry), expires_at
+
+    async def get(self, gcs_path: Optional[str]) -> Optional[str]:
+        if not gcs_path or not self.bucket_name:
+            return None
+        entry = self.memory.get(gcs_path)
+        if entry and entry[1] - time.monotonic() > self.refresh_seconds:
+            return entry[0]
+        async with self._semaphore:
+            try:
+                entry = await asyncio.to_thread(self._sign, gcs_path)
+            except Exception as e:
+                print(f"Gagal membuat signed URL untuk {gcs_path}: {e}")
+                return None
+        self.memory.put(gcs_path, entry)
+        return entry[0]
+
+    async def get_many(self, gcs_paths: Iterable[Optional[str]]) -> list[Optional[str]]:
+        """Signed URL untuk banyak path sekaligus (paralel), urutannya sama dengan input."""
+        return await asyncio.gather(*(self.get(gcs_path) for gcs_path in gcs_paths))
@@ -0,0 +1,104 @@
+import os
+import re
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable
+
+from fastapi import WebSocket
+
+# --- Konfigurasi Streaming Balasan Dosen dari Environment Variable ---
+# Kalimat yang lebih pendek dari ini digabung dengan kalimat berikutnya sebelum disintesis.
+STREAM_MIN_SENTENCE_CHARS = int(os.getenv("STREAM_MIN_SENTENCE_CHARS", 20))
+# Jumlah maksimum kalimat yang disintesis bersamaan dalam satu balasan.
+STREAM_TTS_CONCURRENCY = int(os.getenv("STREAM_TTS_CONCURRENCY", 3))
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+class SentenceChunker:
+    """Memotong aliran token menjadi kalimat utuh untuk disintesis satu per satu."""
+
+    def __init__(self, min_chars: int = STREAM_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list[str]:
+        self._buffer += text
+        pieces = _SENTENCE_END.split(self._buffer)
+        # Potongan terakhir belum tentu kalimat lengkap; simpan di buffer
+        self._buffer = pieces.pop()
+        sentences = []
+        pending = ""
+        for piece in pieces:
+            pending = f"{pending} {piece}" if pending else piece
+            if len(pending) >= self.min_chars:
+                sentences.append(pending.strip())
+                pending = ""
+        if pending:
+            self._buffer = f"{pending} {self._buffer}" if self._buffer else pending
+        return sentences
+
+    def flush(self) -> list[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+async def stream_reply_audio(
+    websocket: WebSocket,
+    text_stream: AsyncIterator[str],
+    synthesize: Callable[[str], Awaitable[bytes]],
+) -> str:
+    """
+    Mengirim balasan dosen per kalimat: setiap kalimat disintesis begitu lengkap, lalu dikirim
+    berurutan sebagai pesan `dosen_reply_chunk` (dengan `seq`) diikuti bytes audionya.
+    Diakhiri dengan `dosen_reply_end` berisi teks lengkap. Mengembalikan teks lengkap balasan.
+    """
+    semaphore = asyncio.Semaphore(STREAM_TTS_CONCURRENCY)
+    # Antrian terurut (seq, kalimat, task TTS); ukurannya ikut membatasi kalimat yang menunggu dikirim
+    queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_TTS_CONCURRENCY * 2)
+    parts: list[str] = []
+
+    async def synthesize_limited(sentence: str) -> bytes:
+        async with semaphore:
+            return await synthesize(sentence)
+
+    async def produce():
+        chunker = SentenceChunker()
+        seq = 0
+        try:
+            async for text in text_stream:
+                parts.append(text)
+                for sentence in chunker.feed(text):
+                    await queue.put((seq, sentence, asyncio.create_task(synthesize_limited(sentence))))
+                    seq += 1
+            for sentence in chunker.flush():
+                await queue.put((seq, sentence, asyncio.create_task(synthesize_limited(sentence))))
+                seq += 1
+        except Exception:
+            await queue.put(None)
+            raise
+        await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    pending_tasks = []
+    try:
+        while (item := await queue.get()) is not None:
+            seq, sentence, tts_task = item
+            pending_tasks.append(tts_task)
+            audio = await tts_task
+            await websocket.send_json({"type": "dosen_reply_chunk", "seq": seq, "text": sentence})
+            if audio:
+                await websocket.send_bytes(audio)
+        await producer
+    finally:
+        # Jika pengiriman gagal/dibatalkan, hentikan juga streaming LLM dan TTS yang tersisa
+        producer.cancel()
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None:
+                pending_tasks.append(item[2])
+        for task in pending_tasks:
+            task.cancel()
+
+    full_text = "".join(parts).strip()
+    await websocket.send_json({"type": "dosen_reply_end", "text": full_text})
+    return full_text
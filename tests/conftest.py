@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import uuid
+import tempfile
+
+import pytest
+
+# Konfigurasi harus di-set sebelum modul aplikasi di-import (sama seperti skrip di benchmarks/)
+workdir = tempfile.mkdtemp(prefix="mentora-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'tests.db')}")
+os.environ.setdefault("PROVIDER_BACKEND", "fake")
+os.environ.setdefault("FAKE_GCS_LATENCY_MS", "0")
+os.environ.setdefault("GCS_BUCKET_NAME", "mentora-tests")
+os.environ.setdefault("TTS_CACHE_DIR", os.path.join(workdir, "tts_cache"))
+os.environ.setdefault("TTS_WARMUP_FORMATS", "")
+os.environ.setdefault("IMAGE_STORE_BACKEND", "local")
+os.environ.setdefault("IMAGE_STORE_DIR", os.path.join(workdir, "image_store"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def seed_sessions():
+    """Membuat satu pengguna baru beserta `count` sesi; mengembalikan (token, daftar id sesi)."""
+    import auth
+    import models
+    from database import SessionLocal
+
+    def seed(count: int = 1) -> tuple[str, list[str]]:
+        with SessionLocal() as db:
+            user = models.User(email=f"uji-{uuid.uuid4().hex[:8]}@mentora.example.com", hashed_password=auth.get_password_hash("rahasia123"))
+            db.add(user)
+            db.flush()
+            sessions = [
+                models.SimulationSession(
+                    user_id=user.id, title="Proposal Uji", filename="uji.pdf",
+                    context_data=json.dumps([{"type": "text", "content": "[JUDUL]\nProposal Uji"}]),
+                )
+                for _ in range(count)
+            ]
+            db.add_all(sessions)
+            db.commit()
+            return auth.create_access_token({"sub": user.email}), [session.id for session in sessions]
+
+    return seed
@@ -0,0 +1,33 @@
+from chunked_scoring import chunk_transcript, split_turns, student_chars
+
+TRANSCRIPT = "\n".join([
+    "model: Silakan jelaskan hipotesis penelitian Anda.",
+    "user: Ada dua hipotesis.",
+    "Hipotesis: literasi data berpengaruh terhadap kinerja.",
+    "H0: tidak ada pengaruh yang signifikan.",
+    "model: Bagaimana Anda mengujinya?",
+    "user: Dengan regresi linear.",
+])
+
+
+def test_only_known_speaker_labels_start_a_turn():
+    assert split_turns(TRANSCRIPT) == [
+        "model: Silakan jelaskan hipotesis penelitian Anda.",
+        "user: Ada dua hipotesis.\nHipotesis: literasi data berpengaruh terhadap kinerja.\nH0: tidak ada pengaruh yang signifikan.",
+        "model: Bagaimana Anda mengujinya?",
+        "user: Dengan regresi linear.",
+    ]
+
+
+def test_student_chars_counts_continuation_lines():
+    answer = "Ada dua hipotesis.\nHipotesis: literasi data berpengaruh terhadap kinerja.\nH0: tidak ada pengaruh yang signifikan."
+    assert student_chars(TRANSCRIPT) == len(answer) + len("Dengan regresi linear.")
+
+
+def test_chunks_end_at_turn_boundaries():
+    turns = split_turns(TRANSCRIPT)
+    # Anggaran cukup untuk dua giliran pertama saja
+    max_tokens = (len(turns[0]) + len(turns[1]) + 2) // 4 + 1
+    chunks = chunk_transcript(TRANSCRIPT, max_tokens=max_tokens)
+    assert chunks[0] == "\n".join(turns[:2])
+    assert "\n".join(chunks) == TRANSCRIPT
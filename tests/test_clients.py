@@ -0,0 +1,50 @@
+import json
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+import main
+from clients import ClientRegistry
+
+SESSIONS = 5
+
+
+def receive_until(ws, message_type: str):
+    while True:
+        message = ws.receive()
+        if message.get("text") and json.loads(message["text"])["type"] == message_type:
+            return
+
+
+def test_clients_created_once_under_concurrent_lookups():
+    registry = ClientRegistry(backend="fake")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        for _ in pool.map(lambda _: (registry.tts_client(), registry.bucket("mentora"), registry.generative_model("gemini-uji")), range(64)):
+            pass
+    assert registry.created == {"tts": 1, "storage": 1, "gemini": 1}
+
+
+def test_concurrent_sessions_reuse_registry_clients(seed_sessions):
+    token, session_ids = seed_sessions(SESSIONS)
+    with TestClient(main.app) as client:
+        with ExitStack() as stack:
+            # Semua sesi dibuka dulu, lalu dipakai bersamaan
+            sockets = [
+                stack.enter_context(client.websocket_connect(f"/ws/session/{session_id}?token={token}&stream=true"))
+                for session_id in session_ids
+            ]
+            for ws in sockets:
+                # Salam pembuka: teks lalu audio
+                receive_until(ws, "dosen_reply_start")
+                ws.receive_bytes()
+            for ws in sockets:
+                ws.send_text(json.dumps({"type": "user_transcript", "text": "Latar belakang penelitian saya adalah ..."}))
+            for ws in sockets:
+                receive_until(ws, "dosen_reply_end")
+        created = dict(main.registry.created)
+
+    assert created["tts"] == 1
+    assert created["storage"] == 1
+    # Satu model Gemini per (nama model, system instruction), bukan per sesi
+    assert created["gemini"] == 1
@@ -0,0 +1,39 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+import main
+import models
+from database import SessionLocal
+
+
+def seed_completed(seed_sessions, count: int) -> tuple[dict, list[str]]:
+    token, session_ids = seed_sessions(count)
+    with SessionLocal() as db:
+        db.execute(update(models.SimulationSession).where(models.SimulationSession.id.in_(session_ids)).values(is_completed=True))
+        db.commit()
+    return {"Authorization": f"Bearer {token}"}, session_ids
+
+
+def test_history_pages_cover_every_session_once(seed_sessions):
+    headers, session_ids = seed_completed(seed_sessions, 5)
+    seen = []
+    params = {"limit": 2}
+    with TestClient(main.app) as client:
+        while True:
+            response = client.get("/history", params=params, headers=headers)
+            assert response.status_code == 200
+            seen += [item["session_id"] for item in response.json()]
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+    assert sorted(seen) == sorted(session_ids)
+
+
+def test_history_rejects_cursor_of_other_user(seed_sessions):
+    headers, _ = seed_completed(seed_sessions, 2)
+    _, (foreign_id,) = seed_completed(seed_sessions, 1)
+    with TestClient(main.app) as client:
+        for session_id in [foreign_id, "sesi-tidak-ada"]:
+            response = client.get("/history", params={"cursor": main.encode_history_cursor(session_id)}, headers=headers)
+            assert response.status_code == 400
+            assert response.json() == {"detail": "Cursor tidak valid."}
@@ -0,0 +1,109 @@
+import asyncio
+from collections import Counter
+
+from prompt_cache import PromptPrefixCache
+
+SYSTEM_INSTRUCTION = "Anda adalah dosen penguji seminar proposal."
+# Cukup besar untuk melewati min_tokens yang dipakai test
+PROPOSAL_PARTS = ["[JUDUL]\nProposal Uji Cache", "Isi proposal. " * 200]
+
+
+class StubPrefixBackend:
+    """Backend tiruan: mencatat unggahan prefix per sesi dan isi setiap permintaan generate."""
+
+    class _Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    class _Model:
+        def __init__(self, backend: "StubPrefixBackend", handle: str):
+            self.backend = backend
+            self.handle = handle
+
+        async def generate_content_async(self, contents, **kwargs):
+            self.backend.requests.append((self.handle, contents))
+            return StubPrefixBackend._Response("Baik, bisa dijelaskan lebih lanjut?")
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.uploads = Counter()
+        self.requests = []
+        self.deleted = []
+
+    def upload(self, session_id, model_name, system_instruction, parts, ttl):
+        self.uploads[session_id] += 1
+        if self.fail:
+            raise RuntimeError("kuota context cache habis")
+        return f"cachedContents/stub-{session_id}-{self.uploads[session_id]}"
+
+    def model(self, handle, generation_config=None):
+        return StubPrefixBackend._Model(self, handle)
+
+    def delete(self, handle):
+        self.deleted.append(handle)
+
+
+def new_cache(backend: StubPrefixBackend) -> PromptPrefixCache:
+    return PromptPrefixCache(backend, model_name="gemini-uji-001", min_tokens=100, ttl_minutes=35, enabled=True)
+
+
+async def run_turns(cache: PromptPrefixCache, session_id: str, turns: int):
+    history = []
+    for turn in range(turns):
+        history.append({"role": "user", "parts": [{"text": f"Jawaban mahasiswa {turn}"}]})
+        handle = await cache.get(session_id, SYSTEM_INSTRUCTION, PROPOSAL_PARTS)
+        response = await cache.model(handle).generate_content_async(history)
+        history.append({"role": "model", "parts": [{"text": response.text}]})
+
+
+def test_prefix_uploaded_once_per_session():
+    async def scenario():
+        backend = StubPrefixBackend()
+        cache = new_cache(backend)
+        # Dua sesi berjalan bersamaan, masing-masing beberapa giliran
+        await asyncio.gather(run_turns(cache, "s1", 5), run_turns(cache, "s2", 5))
+
+        assert backend.uploads == {"s1": 1, "s2": 1}
+        assert len(backend.requests) == 10
+        handles = {handle for handle, _ in backend.requests}
+        assert handles == {"cachedContents/stub-s1-1", "cachedContents/stub-s2-1"}
+        # Giliran berikutnya hanya mengirim riwayat percakapan, bukan konteks proposal
+        assert all(PROPOSAL_PARTS[1] not in str(contents) for _, contents in backend.requests)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_first_turns_share_one_upload():
+    async def scenario():
+        backend = StubPrefixBackend()
+        cache = new_cache(backend)
+        handles = await asyncio.gather(*(cache.get("s1", SYSTEM_INSTRUCTION, PROPOSAL_PARTS) for _ in range(10)))
+        assert backend.uploads == {"s1": 1}
+        assert set(handles) == {"cachedContents/stub-s1-1"}
+
+    asyncio.run(scenario())
+
+
+def test_release_deletes_prefix_and_small_prefix_is_not_uploaded():
+    async def scenario():
+        backend = StubPrefixBackend()
+        cache = new_cache(backend)
+        await run_turns(cache, "s1", 2)
+        await cache.release("s1")
+        assert backend.deleted == ["cachedContents/stub-s1-1"]
+
+        assert await cache.get("s2", SYSTEM_INSTRUCTION, ["Proposal singkat."]) is None
+        assert "s2" not in backend.uploads
+
+    asyncio.run(scenario())
+
+
+def test_failed_upload_is_not_retried_every_turn():
+    async def scenario():
+        backend = StubPrefixBackend(fail=True)
+        cache = new_cache(backend)
+        for _ in range(3):
+            assert await cache.get("s1", SYSTEM_INSTRUCTION, PROPOSAL_PARTS) is None
+        assert backend.uploads == {"s1": 1}
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import os
+from datetime import datetime
+
+import pymupdf
+import pytest
+
+import report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS = {
+    "final_score": 81.5,
+    "feedback": "Penjelasan jelas; uji hipotesis α = 0,05 sudah tepat. ✓",
+    "breakdown": {"relevance": 80, "clarity": 85, "mastery": 79},
+    "transcript": "\n".join([
+        "model: Silakan jelaskan metode Anda.",
+        "user: Saya memakai regresi dengan β₁ ≈ 0,42 dan uji χ² (p < 0,05).",
+        "user: Kutipan: «Привет мир» — ünïcödé, “kutip”, 10 € ≤ 20 €.",
+    ] * 40),
+}
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 2, 3, 4, 5)
+
+
+def layout(pdf_bytes: bytes) -> tuple[list, list]:
+    """Posisi setiap kata per halaman dan isi file font yang di-embed."""
+    with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+        words = [[tuple(round(v, 2) for v in word[:4]) + (word[4],) for word in page.get_text("words")] for page in doc]
+        fonts = sorted(
+            (font[3], doc.extract_font(font[0])[3])
+            for font in {font for page in doc for font in page.get_fonts()}
+        )
+    return words, fonts
+
+
+@pytest.fixture
+def render(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(report, "datetime", FixedDatetime)
+    return lambda: report.render_report("sesi-uji", RESULTS)
+
+
+def test_cached_font_matches_add_font(render, monkeypatch):
+    """
+    Cache font menyalin state internal TTFFont fpdf2 (lihat versi yang di-pin di requirements.txt).
+    Jika fpdf2 dinaikkan dan internalnya berubah, hasil render harus tetap sama dengan add_font biasa.
+    """
+    cached = render()
+
+    def no_cache(pdf):
+        raise RuntimeError("cache font dimatikan untuk pembanding")
+
+    monkeypatch.setattr(report._font_cache, "attach", no_cache)
+    uncached = render()
+
+    cached_words, cached_fonts = layout(cached)
+    uncached_words, uncached_fonts = layout(uncached)
+    assert cached_words == uncached_words
+    assert [name for name, _ in cached_fonts] == [name for name, _ in uncached_fonts]
+    assert cached_fonts == uncached_fonts
+
+
+def test_report_keeps_non_latin_glyphs(render):
+    with pymupdf.open(stream=render(), filetype="pdf") as doc:
+        text = "".join(page.get_text() for page in doc)
+    for expected in ["α = 0,05", "β₁ ≈ 0,42", "χ²", "Привет мир", "10 € ≤ 20 €", "✓"]:
+        assert expected in text
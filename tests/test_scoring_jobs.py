@@ -0,0 +1,102 @@
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete
+
+import models
+from database import AsyncSessionLocal, async_engine, engine
+from scoring_jobs import ScoringQueue, JOB_QUEUED, JOB_RUNNING, JOB_FAILED
+
+models.Base.metadata.create_all(bind=engine)
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            # Koneksi aiosqlite terikat ke event loop yang dibuat asyncio.run
+            await async_engine.dispose()
+    return asyncio.run(main())
+
+
+async def add_job(**values) -> str:
+    values = {"attempts": 0, **values}
+    job = models.ScoringJob(id=str(uuid.uuid4()), session_id="sesi-uji", user_id=1, transcript="user: halo", **values)
+    async with AsyncSessionLocal() as db:
+        db.add(job)
+        await db.commit()
+    return job.id
+
+
+async def get_job(job_id: str) -> models.ScoringJob:
+    async with AsyncSessionLocal() as db:
+        return await db.get(models.ScoringJob, job_id)
+
+
+async def clear_jobs():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.ScoringJob))
+        await db.commit()
+
+
+async def failing_handler(job, set_stage):
+    raise RuntimeError("LLM tidak tersedia")
+
+
+def test_claim_skips_running_job_with_live_lease():
+    async def scenario():
+        await clear_jobs()
+        now = datetime.now(timezone.utc)
+        live = await add_job(status=JOB_RUNNING, attempts=1, lease_expires_at=now + timedelta(minutes=5))
+        expired = await add_job(status=JOB_RUNNING, attempts=1, lease_expires_at=now - timedelta(seconds=1))
+        queue = ScoringQueue(failing_handler, workers=1, lease_seconds=30)
+
+        claimed = await queue._claim()
+        assert claimed.id == expired
+        assert claimed.attempts == 2
+        assert claimed.lease_expires_at is not None
+        # Lease job lain masih berlaku: tidak ada lagi yang bisa diklaim
+        assert await queue._claim() is None
+        assert (await get_job(live)).attempts == 1
+
+    run(scenario())
+
+
+def test_expired_lease_past_max_attempts_is_failed():
+    async def scenario():
+        await clear_jobs()
+        job_id = await add_job(status=JOB_RUNNING, attempts=3, lease_expires_at=None)
+        queue = ScoringQueue(failing_handler, workers=1, max_attempts=3)
+
+        assert await queue._claim() is None
+        assert (await get_job(job_id)).status == JOB_FAILED
+
+    run(scenario())
+
+
+def test_failed_attempt_waits_for_backoff():
+    async def scenario():
+        await clear_jobs()
+        job_id = await add_job(status=JOB_QUEUED)
+        queue = ScoringQueue(failing_handler, workers=1, max_attempts=3, retry_backoff_seconds=0.3)
+
+        await queue._run(await queue._claim())
+        job = await get_job(job_id)
+        assert job.status == JOB_QUEUED
+        assert job.retry_at is not None and job.lease_expires_at is None
+        # Belum lewat jeda backoff: job tidak langsung diklaim ulang
+        assert await queue._claim() is None
+
+        await asyncio.sleep(0.4)
+        retried = await queue._claim()
+        assert retried.id == job_id and retried.attempts == 2
+        await queue._run(retried)
+        # Percobaan kedua menunggu dua kali lebih lama
+        await asyncio.sleep(0.4)
+        assert await queue._claim() is None
+        await asyncio.sleep(0.3)
+        assert (await queue._claim()).attempts == 3
+
+    run(scenario())
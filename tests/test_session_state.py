@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import fakeredis.aioredis
+
+from session_state import RedisSessionStateStore, build_history
+
+# Sama dengan SESSION_DURATION di main.py: state kedaluwarsa bersama jendela sesi 30 menit
+SESSION_SECONDS = 1800
+
+
+def new_store(**kwargs) -> RedisSessionStateStore:
+    return RedisSessionStateStore(client=fakeredis.aioredis.FakeRedis(decode_responses=True), prefix="uji", **kwargs)
+
+
+def expires_in(seconds: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+
+def test_append_and_load():
+    async def scenario():
+        store = new_store()
+        expires_at = expires_in(SESSION_SECONDS)
+        await store.append("s1", "model", "Selamat datang.", expires_at)
+        await store.append("s1", "user", "Terima kasih, Pak.", expires_at)
+        await store.set_meta("s1", expires_at, greeted=True, voice="id-ID-Chirp3-HD-Achird")
+
+        state = await store.load("s1")
+        assert state.history == [
+            {"role": "model", "parts": [{"text": "Selamat datang."}]},
+            {"role": "user", "parts": [{"text": "Terima kasih, Pak."}]},
+        ]
+        assert state.greeted is True
+        assert state.voice == "id-ID-Chirp3-HD-Achird"
+        # Sesi lain tidak terpengaruh
+        assert await store.load("s2") == ([], False, None)
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_history_is_trimmed_to_max_messages():
+    async def scenario():
+        store = new_store()
+        assert store.max_messages == 20
+        expires_at = expires_in(SESSION_SECONDS)
+        for index in range(25):
+            await store.append("s1", "user" if index % 2 else "model", f"pesan {index}", expires_at)
+
+        assert await store.client.llen("uji:s1:messages") == 20
+        history = (await store.load("s1")).history
+        assert history[0]["parts"] == [{"text": "pesan 5"}]
+        assert history[-1]["parts"] == [{"text": "pesan 24"}]
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_state_expires_with_session_window():
+    async def scenario():
+        store = new_store()
+        expires_at = expires_in(SESSION_SECONDS)
+        await store.append("s1", "user", "halo", expires_at)
+        await store.set_meta("s1", expires_at, greeted=True)
+        for name in ("messages", "meta"):
+            ttl = await store.client.ttl(f"uji:s1:{name}")
+            assert SESSION_SECONDS - 5 <= ttl <= SESSION_SECONDS
+
+        await store.append("s2", "user", "halo", expires_in(1))
+        await store.set_meta("s2", expires_in(1), greeted=True)
+        await asyncio.sleep(2.1)
+        assert await store.load("s2") == ([], False, None)
+        assert (await store.load("s1")).greeted is True
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_build_history_merges_consecutive_roles():
+    messages = [
+        ("model", "Silakan jelaskan latar belakang."),
+        ("user", "Latar belakang penelitian saya"),
+        ("user", "adalah rendahnya literasi data."),
+        ("model", "Apa metode yang Anda pakai?"),
+    ]
+    assert build_history(messages) == [
+        {"role": "model", "parts": [{"text": "Silakan jelaskan latar belakang."}]},
+        {"role": "user", "parts": [{"text": "Latar belakang penelitian saya"}, {"text": "adalah rendahnya literasi data."}]},
+        {"role": "model", "parts": [{"text": "Apa metode yang Anda pakai?"}]},
+    ]
+    assert build_history([]) == []
@@ -0,0 +1,85 @@
+import io
+import os
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+
+import uploads
+
+MAX_BYTES = 4096
+BOUNDARY = "mentora-uji"
+
+
+def multipart(content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="proposal.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def limited_app(received: list) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(uploads.UploadSizeLimitMiddleware, path="/upload", max_bytes=MAX_BYTES)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        received.append(len(await file.read()))
+        return {"ok": True}
+
+    return app
+
+
+async def post(app: FastAPI, body: bytes, chunked: bool) -> httpx.Response:
+    async def chunks():
+        for start in range(0, len(body), 1024):
+            yield body[start:start + 1024]
+
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mentora") as client:
+        # Body berupa generator dikirim tanpa Content-Length (chunked)
+        return await client.post("/upload", content=chunks() if chunked else body, headers=headers)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_middleware_rejects_oversized_body(chunked):
+    received = []
+    oversized = multipart(b"%PDF-1.7\n" + b"0" * (MAX_BYTES + uploads.MULTIPART_OVERHEAD_BYTES))
+    response = asyncio.run(post(limited_app(received), oversized, chunked))
+    assert response.status_code == 413
+    assert response.json() == {"detail": uploads.too_large_detail()}
+    assert received == []
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_middleware_passes_body_within_limit(chunked):
+    received = []
+    response = asyncio.run(post(limited_app(received), multipart(b"%PDF-1.7\n" + b"0" * 1000), chunked))
+    assert response.status_code == 200
+    assert received == [1009]
+
+
+def test_spool_copies_pdf_to_temp_file():
+    content = b"%PDF-1.7\n" + os.urandom(3 * uploads.UPLOAD_CHUNK_BYTES)
+    path = uploads.spool_pdf_upload(io.BytesIO(content), max_bytes=len(content))
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == content
+    finally:
+        os.remove(path)
+
+
+def test_spool_rejects_non_pdf_and_oversized(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_TMP_DIR", str(tmp_path))
+    with pytest.raises(HTTPException) as error:
+        uploads.spool_pdf_upload(io.BytesIO(b"bukan pdf" * 100))
+    assert error.value.status_code == 415
+
+    oversized = b"%PDF-1.7\n" + b"0" * (2 * uploads.UPLOAD_CHUNK_BYTES)
+    with pytest.raises(HTTPException) as error:
+        uploads.spool_pdf_upload(io.BytesIO(oversized), max_bytes=uploads.UPLOAD_CHUNK_BYTES)
+    assert error.value.status_code == 413
+    # File sementara yang terpotong dihapus
+    assert list(tmp_path.iterdir()) == []
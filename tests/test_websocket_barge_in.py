@@ -0,0 +1,94 @@
+import json
+import time
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from session_state import MemorySessionStateStore
+
+
+def next_text(ws) -> dict:
+    """Pesan JSON berikutnya; bytes audio dilewati."""
+    while True:
+        message = ws.receive()
+        if message.get("text"):
+            return json.loads(message["text"])
+
+
+def receive_greeting(ws):
+    assert next_text(ws)["type"] == "dosen_reply_start"
+    ws.receive_bytes()
+
+
+def send_transcript(ws, text: str):
+    ws.send_text(json.dumps({"type": "user_transcript", "text": text}))
+
+
+def test_new_transcript_cancels_reply_in_progress(monkeypatch, seed_sessions):
+    calls = []
+
+    async def slow_first_reply(session_id, context_data, chat_history):
+        calls.append(chat_history[-1]["parts"][-1]["text"])
+        if len(calls) == 1:
+            await asyncio.sleep(30)
+        return "Balasan kedua."
+
+    monkeypatch.setattr(main, "get_llm_reply", slow_first_reply)
+    token, (session_id,) = seed_sessions()
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws/session/{session_id}?token={token}") as ws:
+            receive_greeting(ws)
+            send_transcript(ws, "Jawaban pertama")
+            time.sleep(0.2)
+            send_transcript(ws, "Jawaban kedua")
+            assert next_text(ws)["type"] == "dosen_reply_cancelled"
+            assert next_text(ws) == {"type": "dosen_reply_start", "text": "Balasan kedua."}
+
+
+def test_reply_already_sent_is_not_reported_cancelled(monkeypatch, seed_sessions):
+    replies = iter(["Balasan pertama.", "Balasan kedua."])
+
+    async def reply(session_id, context_data, chat_history):
+        return next(replies)
+
+    original_append = MemorySessionStateStore.append
+
+    async def slow_model_append(self, session_id, role, text, expires_at):
+        # Balasan sudah terkirim ke klien, tetapi masih dicatat ke state sesi
+        if text == "Balasan pertama.":
+            await asyncio.sleep(0.5)
+        await original_append(self, session_id, role, text, expires_at)
+
+    monkeypatch.setattr(main, "get_llm_reply", reply)
+    monkeypatch.setattr(MemorySessionStateStore, "append", slow_model_append)
+    token, (session_id,) = seed_sessions()
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws/session/{session_id}?token={token}") as ws:
+            receive_greeting(ws)
+            send_transcript(ws, "Jawaban pertama")
+            assert next_text(ws) == {"type": "dosen_reply_start", "text": "Balasan pertama."}
+            ws.receive_bytes()
+            send_transcript(ws, "Jawaban kedua")
+            assert next_text(ws) == {"type": "dosen_reply_start", "text": "Balasan kedua."}
+            ws.receive_bytes()
+
+        # Balasan pertama tetap tersimpan: salam, jawaban, balasan, jawaban, balasan
+        with client.websocket_connect(f"/ws/session/{session_id}?token={token}") as ws:
+            assert next_text(ws) == {"type": "session_resumed", "turns": 5}
+
+
+def test_reply_error_is_logged_immediately(monkeypatch, seed_sessions, capsys):
+    async def failing_reply(session_id, context_data, chat_history):
+        raise RuntimeError("Gemini tidak tersedia")
+
+    monkeypatch.setattr(main, "get_llm_reply", failing_reply)
+    token, (session_id,) = seed_sessions()
+    with TestClient(main.app) as client:
+        with client.websocket_connect(f"/ws/session/{session_id}?token={token}") as ws:
+            receive_greeting(ws)
+            send_transcript(ws, "Jawaban pertama")
+            deadline = time.monotonic() + 5
+            while "Gemini tidak tersedia" not in capsys.readouterr().out and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert time.monotonic() < deadline, "error balasan tidak langsung dicatat"
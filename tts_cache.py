@@ -0,0 +1,116 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+import traceback
+from typing import Awaitable, Callable, Iterable, Optional
+
+from cache import LRUCache
+
+# --- Konfigurasi Cache Audio TTS dari Environment Variable ---
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", 64))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_WARMUP_CONCURRENCY = int(os.getenv("TTS_WARMUP_CONCURRENCY", 4))
+
+
+class TTSCache:
+    """
+    Cache hasil sintesis TTS dua tingkat, dengan kunci (teks, nama suara, format audio):
+    memori (LRU dengan batas byte) lalu disk, sehingga frasa tetap dosen
+    tetap tersedia setelah restart tanpa memanggil Google TTS lagi.
+    """
+
+    def __init__(self, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024, cache_dir: Optional[str] = TTS_CACHE_DIR):
+        self.memory = LRUCache(max_bytes, name="tts_audio")
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(text: str, voice_name: str, audio_format: str) -> str:
+        return hashlib.sha256(f"{audio_format}\n{voice_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.audio")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+    def get_cached(self, text: str, voice_name: str, audio_format: str) -> Optional[bytes]:
+        """Hanya memeriksa tingkat memori (tanpa I/O)."""
+        return self.memory.get(self.key(text, voice_name, audio_format))
+
+    async def get(self, text: str, voice_name: str, audio_format: str) -> Optional[bytes]:
+        key = self.key(text, voice_name, audio_format)
+        audio = self.memory.get(key)
+        if audio is None:
+            audio = await asyncio.to_thread(self._read_disk, key)
+            if audio:
+                self.memory.put(key, audio)
+        return audio
+
+    async def put(self, text: str, voice_name: str, audio_format: str, audio: bytes):
+        key = self.key(text, voice_name, audio_format)
+        self.memory.put(key, audio)
+        try:
+            await asyncio.to_thread(self._write_disk, key, audio)
+        except Exception as e:
+            print(f"Warning: Gagal menyimpan cache audio ke disk: {e}")
+
+    async def get_or_synthesize(
+        self, text: str, voice_name: str, audio_format: str, synthesize: Callable[[str, str, str], Awaitable[bytes]]
+    ) -> bytes:
+        audio = await self.get(text, voice_name, audio_format)
+        if audio is None:
+            audio = await synthesize(text, voice_name, audio_format)
+            # Hasil kosong berarti sintesis gagal; jangan di-cache.
+            if audio:
+                await self.put(text, voice_name, audio_format, audio)
+        return audio or b""
+
+    async def warm(
+        self,
+        phrases: Iterable[str],
+        voice_names: Iterable[str],
+        audio_formats: Iterable[str],
+        synthesize: Callable[[str, str, str], Awaitable[bytes]],
+        concurrency: int = TTS_WARMUP_CONCURRENCY,
+    ):
+        """Mengisi cache untuk setiap kombinasi frasa x suara x format (dari disk bila ada, selain itu sintesis)."""
+        semaphore = asyncio.Semaphore(concurrency)
+        voice_names = list(voice_names)
+        audio_formats = list(audio_formats)
+
+        async def warm_one(text: str, voice_name: str, audio_format: str):
+            async with semaphore:
+                await self.get_or_synthesize(text, voice_name, audio_format, synthesize)
+
+        jobs = [
+            warm_one(text, voice_name, audio_format)
+            for text in dict.fromkeys(phrases)
+            for voice_name in voice_names
+            for audio_format in audio_formats
+        ]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                traceback.print_exception(result)
+        print(f"Cache audio TTS siap: {self.memory.stats()}")
@@ -0,0 +1,96 @@
+import os
+import json
+import tempfile
+from typing import BinaryIO
+
+from fastapi import HTTPException
+
+# --- Konfigurasi Upload PDF dari Environment Variable ---
+# Ukuran maksimum file PDF yang diterima /upload (MB).
+UPLOAD_MAX_MB = float(os.getenv("UPLOAD_MAX_MB", 50))
+# Folder file sementara hasil upload; kosong = folder temp sistem. Worker ingestion membaca PDF dari sini.
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+UPLOAD_MAX_BYTES = int(UPLOAD_MAX_MB * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Header multipart (boundary, nama field, content-type) di luar isi file
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Spesifikasi PDF mengizinkan header '%PDF-' muncul di 1024 byte pertama
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+
+def too_large_detail() -> str:
+    return f"Ukuran file melebihi batas {UPLOAD_MAX_MB:g} MB."
+
+
+def spool_pdf_upload(source: BinaryIO, max_bytes: int = UPLOAD_MAX_BYTES) -> str:
+    """
+    Menyalin file upload per potongan ke file sementara di disk dan mengembalikan path-nya.
+    Header PDF diperiksa dari potongan pertama sebelum sisanya disalin, dan penyalinan berhenti
+    begitu ukuran file melewati `max_bytes`. Body request sendiri dibatasi lebih awal oleh
+    `UploadSizeLimitMiddleware`. Pemanggil wajib menghapus file setelah selesai.
+    Dijalankan di thread (I/O file blocking).
+    """
+    first_chunk = source.read(UPLOAD_CHUNK_BYTES)
+    if PDF_MAGIC not in first_chunk[:PDF_MAGIC_WINDOW]:
+        raise HTTPException(status_code=415, detail="File bukan PDF yang valid.")
+
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="mentora-upload-", dir=UPLOAD_TMP_DIR)
+    try:
+        size = 0
+        with os.fdopen(fd, "wb") as target:
+            chunk = first_chunk
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=too_large_detail())
+                target.write(chunk)
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+        return path
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Membatasi ukuran body request ke `path`. Content-Length di atas batas langsung ditolak (413)
+    sebelum body dibaca, sehingga upload yang terlalu besar tidak sempat di-spool ke disk.
+    Body tanpa Content-Length (chunked) dihitung saat diterima: begitu melewati batas, pembacaan
+    dihentikan dengan HTTPException 413 (diteruskan FastAPI sebagai respons 413 biasa).
+    """
+
+    def __init__(self, app, path: str = "/upload", max_bytes: int = UPLOAD_MAX_BYTES):
+        self.app = app
+        self.path = path
+        self.max_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            body = json.dumps({"detail": too_large_detail()}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=too_large_detail())
+            return message
+
+        await self.app(scope, limited_receive, send)